@@ -6,32 +6,169 @@ Generates visual storyboards from any user prompt, automatically featuring the K
 from flask import Flask, render_template, request, jsonify, send_from_directory, Response, send_file
 import os
 import json
+import uuid
 from datetime import datetime
 import config
-from storyboard_generator import StoryboardGenerator
-from pdf_exporter import export_to_pdf
-import config
+import metrics
+from artifact_store import get_export_store
+from static_server import serve_static_file
+from retention import get_retention_collector
+from storyboard_generator import StoryboardGenerator, serialize_frame
+from job_queue import JobQueue, QueueFullError
+from model_manager import get_model_manager, host_rss_bytes, accelerator_memory_bytes
+from warmup import ModelWarmer
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'static/generated'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
-# Ensure output directories exist
-os.makedirs('static/generated', exist_ok=True)
-os.makedirs('static/exports', exist_ok=True)
-os.makedirs('static/css', exist_ok=True)
-os.makedirs('static/js', exist_ok=True)
-os.makedirs('templates', exist_ok=True)
+# Ensure output directories exist and report missing keys / reference images
+config.ensure_directories()
+config.report_config_issues()
 
 # Initialize the storyboard generator
-# Use local SDXL for image generation
+# Use local SDXL for image generation (torch/diffusers are imported on the first request)
 generator = StoryboardGenerator(use_local=True)
 
+# Optional warmup: load SDXL and run one tiny generation before reporting ready
+warmer = ModelWarmer(generator)
+if config.ENABLE_STARTUP_WARMUP:
+    warmer.start()
+
 
 @app.route('/')
 def index():
     """Render the main page"""
-    return render_template('index.html')
+    return render_template('index.html', previews_default=config.ENABLE_LATENT_PREVIEWS)
+
+
+def run_storyboard_job(job):
+    """
+    Job handler executed on the inference worker thread
+
+    'stream' jobs emit story/frame events as each frame finishes;
+    'full' jobs run the complete pipeline (with quality validation) and
+    then emit the finished storyboard.
+    """
+    if job.mode == 'full':
+        result = generator.generate(job.prompt, cancel_token=job.cancel_token, request_id=job.id)
+        storyboard = [serialize_frame(frame) for frame in result['storyboard']]
+        job.result = {'storyboard': storyboard, 'metadata': result['metadata']}
+
+        job.emit({
+            "type": "story",
+            "aldar_story": result['metadata']['aldar_story'],
+            "total_frames": len(storyboard)
+        })
+        for idx, frame in enumerate(storyboard):
+            job.emit({"type": "frame", "frame": frame, "index": idx, "total": len(storyboard)})
+        job.emit({"type": "stats", "timings": result['metadata'].get('timings')})
+        job.emit({"type": "complete", "success": True})
+        return
+
+    previews = bool(job.options.get('previews', False))
+    events = generator.generate_events(job.prompt, previews=previews, cancel_token=job.cancel_token, request_id=job.id)
+    for event in events:
+        if event.get('type') == 'frame':
+            event = {**event, 'frame': serialize_frame(event['frame'])}
+        job.emit(event)
+
+
+# Single shared queue: every generation request goes through the same worker(s)
+job_queue = JobQueue(run_storyboard_job)
+
+# Old images/PDFs are collected in the background; files used by live jobs are kept
+retention = get_retention_collector()
+retention.add_reference_provider(job_queue.referenced_paths)
+if config.ENABLE_RETENTION:
+    retention.start()
+
+# Gauges are sampled when /metrics is scraped
+metrics.QUEUE_DEPTH.set_function(job_queue.depth)
+metrics.ACTIVE_JOBS.set_function(job_queue.active_count)
+metrics.MODEL_LOADED.set_function(lambda: 1 if get_model_manager().is_loaded else 0)
+metrics.HOST_MEMORY_BYTES.set_function(host_rss_bytes)
+metrics.ACCELERATOR_MEMORY_BYTES.set_function(accelerator_memory_bytes)
+
+
+def queue_full_response(error: QueueFullError, ndjson: bool = False):
+    """429 with Retry-After so clients back off instead of piling up work"""
+    if ndjson:
+        resp = Response(
+            json.dumps({"type": "error", "message": str(error), "retry_after": error.retry_after}) + "\n",
+            mimetype='application/x-ndjson',
+            status=429
+        )
+    else:
+        resp = jsonify({'success': False, 'error': str(error), 'retry_after': error.retry_after})
+        resp.status_code = 429
+    resp.headers['Retry-After'] = str(error.retry_after)
+    return resp
+
+
+def disconnect_grace(job):
+    """Seconds to wait for a reconnect before cancelling an abandoned job (None = never)"""
+    if job.options.get('cancel_on_disconnect'):
+        return config.CANCEL_ON_DISCONNECT_GRACE
+    return None
+
+
+# WSGI environ key set on job stream responses; the ASGI entry point (asgi.py)
+# serves the stream itself from its event loop instead of iterating it on a thread
+JOB_STREAM_ENVIRON_KEY = 'storyboard.job_stream'
+
+
+def encode_job_event(event, fmt: str = 'ndjson') -> str:
+    """One job event (None = keep-alive) as an NDJSON line or an SSE message"""
+    if fmt == 'sse':
+        if event is None:
+            return ": keep-alive\n\n"
+        return f"id: {event['id']}\nevent: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+    if event is None:
+        # Keep-alive: blank lines are ignored by NDJSON readers
+        return "\n"
+    return json.dumps(event) + "\n"
+
+
+def job_stream_response(job, after: int = 0, fmt: str = 'ndjson'):
+    """
+    Stream a job's events as NDJSON or Server-Sent Events, starting after the given event ID
+
+    Browsers resume SSE via Last-Event-ID; NDJSON clients pass ?after=.
+    """
+
+    def event_stream():
+        # The server closes this generator when a write to the client fails,
+        # which is how a closed tab is detected (heartbeats bound the delay)
+        job.attach()
+        try:
+            for event in job.iter_events(after=after):
+                yield encode_job_event(event, fmt)
+        finally:
+            job.detach(cancel_after=disconnect_grace(job))
+
+    request.environ[JOB_STREAM_ENVIRON_KEY] = (job, after, fmt)
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    resp = Response(event_stream(), mimetype=mimetype)
+    # Disable proxy buffering where applicable and allow CORS from same origin
+    resp.headers['X-Accel-Buffering'] = 'no'
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['Connection'] = 'keep-alive'
+    resp.headers['X-Job-Id'] = job.id
+    return resp
+
+
+def submit_stream_job(user_prompt: str, options: dict):
+    """Queue a streaming job whose first event tells the client how to resume it"""
+    def announce(job):
+        # Emitted before the job is queued so no worker event can precede it
+        job.emit({
+            "type": "job",
+            "job_id": job.id,
+            "resume_url": f"/api/jobs/{job.id}/stream"
+        })
+
+    return job_queue.submit(user_prompt, mode='stream', options=options, on_created=announce)
 
 
 @app.route('/api/generate', methods=['POST'])
@@ -48,13 +185,26 @@ def generate_storyboard():
         if not user_prompt:
             return jsonify({'error': 'Prompt cannot be empty'}), 400
 
-        # Generate storyboard (automatically includes Aldar Köse)
-        result = generator.generate(user_prompt)
+        # Generate storyboard (automatically includes Aldar Köse) on the inference worker
+        try:
+            job = job_queue.submit(user_prompt, mode='full')
+        except QueueFullError as e:
+            return queue_full_response(e)
+
+        if not job.wait(timeout=config.JOB_SYNC_TIMEOUT):
+            return jsonify({
+                'success': False,
+                'error': 'Generation is still running',
+                'job_id': job.id
+            }), 504
+
+        if job.error:
+            raise RuntimeError(job.error)
 
         return jsonify({
             'success': True,
-            'storyboard': result['storyboard'],
-            'metadata': result['metadata']
+            'storyboard': job.result['storyboard'],
+            'metadata': job.result['metadata']
         })
 
     except Exception as e:
@@ -70,11 +220,20 @@ def generate_storyboard_stream():
     Stream storyboard generation as NDJSON events so the UI can render
     each frame immediately when it's ready.
 
-    Events (one JSON object per line):
+    Events (one JSON object per line, each with a monotonic "id"):
+      {"type":"job", "job_id": str, "resume_url": str}
       {"type":"story", "aldar_story": str, "total_frames": int}
+      {"type":"preview", "index": i, "step": s, "total_steps": n, "image": data-url}  (if "previews": true)
       {"type":"frame", "frame": {..frame data..}, "index": i, "total": n}
+      {"type":"frame_variants", "index": i, "image_variants": {..}, "image_variant_paths": {..}}  (thumb/preview/print, once encoded)
+      {"type":"stats", "timings": {..stage timeline, see timeline.py..}}
       {"type":"complete", "success": true}
+      {"type":"cancelled", "reason": str}
+      {"type":"gap", "after": int, "message": str}  (resumed after the replay buffer was released)
       {"type":"error", "message": str}
+
+    The job is cancelled if every client stays disconnected for
+    CANCEL_ON_DISCONNECT_GRACE seconds (resuming within that window keeps it alive).
     """
     try:
         data = request.get_json(silent=True) or {}
@@ -88,105 +247,12 @@ def generate_storyboard_stream():
                 headers={"X-Accel-Buffering": "no"}
             )
 
-        def ndjson_stream():
-            try:
-                # Step 1: story
-                aldar_story = generator._create_aldar_story(user_prompt)
-                # Step 2: frames (structure only)
-                frames = generator._generate_frames(aldar_story)
-
-                yield json.dumps({
-                    "type": "story",
-                    "aldar_story": aldar_story,
-                    "total_frames": len(frames)
-                }) + "\n"
-
-                # Step 3: images per-frame
-                # Check if identity lock is enabled in config
-                local_gen = None
-                ref_img = None
-                
-                if config.USE_IDENTITY_LOCK:
-                    try:
-                        # Try to import and initialize the local generator on-demand
-                        from local_image_generator import LocalImageGenerator as _LocalGen
-                        # Reuse existing if available; else create a fresh instance for this request
-                        local_gen = getattr(generator, 'local_generator', None) or _LocalGen()
-
-                        # Load reference image from project root (PNG files provided)
-                        from PIL import Image as _Image
-                        ref_path = os.path.join(os.getcwd(), config.IDENTITY_REFERENCE_IMAGE)
-                        if os.path.exists(ref_path):
-                            try:
-                                ref_img = _Image.open(ref_path).convert('RGB')
-                                print(f"✓ Using identity lock with {config.IDENTITY_REFERENCE_IMAGE} (scale={config.IP_ADAPTER_SCALE})")
-                            except Exception as _e:
-                                print(f"Failed to load reference image {ref_path}: {_e}")
-                        else:
-                            print(f"Reference image not found: {ref_path}")
-                    except Exception as _e:
-                        # Local stack not available; will fall back to API path below
-                        print(f"Identity lock requested, but local generator unavailable: {_e}")
-
-                for idx, frame in enumerate(frames):
-                    frame_number = idx + 1
-
-                    # Prefer local generation if identity lock is enabled and local generator is ready
-                    if local_gen is not None:
-                        # Local SDXL generation (LoRA will be applied automatically if present)
-                        from datetime import datetime as _dt
-                        
-                        # Build base prompt
-                        base_prompt = generator._build_image_prompt(frame)
-                        
-                        # Enhance prompt to fit within 75 token limit
-                        # Use the enhancer to properly condense the prompt
-                        enhanced_prompt = local_gen.enhancer.enhance(frame)
-                        
-                        # Generate with enhanced prompt
-                        img = local_gen.generate_single(
-                            prompt=enhanced_prompt,
-                            ref_image=ref_img,
-                            ip_adapter_scale=config.IP_ADAPTER_SCALE if ref_img is not None else None
-                        )
-
-                        # Save image
-                        output_dir = 'static/generated'
-                        os.makedirs(output_dir, exist_ok=True)
-                        ts = _dt.now().strftime('%Y%m%d_%H%M%S')
-                        filename = f'frame_{frame_number:03d}_{ts}.png'
-                        image_path = os.path.join(output_dir, filename)
-                        try:
-                            img.save(image_path, 'PNG', optimize=True)
-                        except Exception:
-                            # Fallback save without optimize if pillow complains
-                            img.save(image_path, 'PNG')
-                    else:
-                        # DALL·E (or placeholder) path
-                        image_prompt = generator._build_image_prompt(frame)
-                        image_path = generator._generate_single_image(image_prompt, frame_number)
-
-                    # Emit event
-                    frame['image_url'] = f"/static/generated/{os.path.basename(image_path)}"
-                    frame['frame_number'] = frame_number
-
-                    yield json.dumps({
-                        "type": "frame",
-                        "frame": frame,
-                        "index": idx,
-                        "total": len(frames)
-                    }) + "\n"
-
-                yield json.dumps({"type": "complete", "success": True}) + "\n"
-            except Exception as e:
-                yield json.dumps({"type": "error", "message": str(e)}) + "\n"
-
-        resp = Response(ndjson_stream(), mimetype='application/x-ndjson')
-        # Disable proxy buffering where applicable and allow CORS from same origin
-        resp.headers['X-Accel-Buffering'] = 'no'
-        resp.headers['Cache-Control'] = 'no-cache'
-        resp.headers['Connection'] = 'keep-alive'
-        return resp
+        previews = bool(data.get('previews', config.ENABLE_LATENT_PREVIEWS))
+        try:
+            job = submit_stream_job(user_prompt, {'previews': previews, 'cancel_on_disconnect': True})
+        except QueueFullError as e:
+            return queue_full_response(e, ndjson=True)
+        return job_stream_response(job)
 
     except Exception as e:
         # As a last resort, return a one-line error
@@ -197,6 +263,89 @@ def generate_storyboard_stream():
         )
 
 
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a storyboard generation job and return its ID immediately
+    Expects JSON: {"prompt": "user's story idea", "mode": "stream" | "full", "previews": bool}
+    """
+    data = request.get_json(silent=True) or {}
+    user_prompt = (data.get('prompt') or '').strip()
+    mode = data.get('mode', 'stream')
+
+    if not user_prompt:
+        return jsonify({'error': 'Prompt cannot be empty'}), 400
+    if mode not in ('stream', 'full'):
+        return jsonify({'error': "mode must be 'stream' or 'full'"}), 400
+
+    previews = bool(data.get('previews', config.ENABLE_LATENT_PREVIEWS))
+    try:
+        if mode == 'stream':
+            job = submit_stream_job(user_prompt, {'previews': previews})
+        else:
+            job = job_queue.submit(user_prompt, mode=mode, options={'previews': previews})
+    except QueueFullError as e:
+        return queue_full_response(e)
+
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'queue_position': job_queue.depth(),
+        'status_url': f'/api/jobs/{job.id}',
+        'stream_url': f'/api/jobs/{job.id}/stream'
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll job status and the frames finished so far"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict(include_events=False))
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job
+    Running SDXL generation stops within one denoising step; queued jobs never start
+    """
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.finished:
+        return jsonify({'success': False, 'job_id': job.id, 'status': job.status}), 409
+    return jsonify({'success': True, 'job_id': job.id, 'status': 'cancelling'}), 202
+
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """
+    Stream a job's events, replaying what was already emitted
+
+    Resume without regenerating anything:
+      NDJSON: GET /api/jobs/<id>/stream?after=<last event id>
+      SSE:    Accept: text/event-stream (or ?format=sse), resumes from Last-Event-ID
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    wants_sse = (
+        request.args.get('format') == 'sse'
+        or 'text/event-stream' in request.headers.get('Accept', '')
+    )
+    after = request.args.get('after') or request.headers.get('Last-Event-ID') or 0
+    try:
+        after = max(0, int(after))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'after / Last-Event-ID must be an integer event ID'}), 400
+
+    return job_stream_response(job, after=after, fmt='sse' if wants_sse else 'ndjson')
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -206,10 +355,119 @@ def health_check():
     })
 
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    """
+    Liveness: the process is serving and its job workers are running
+    Restart the instance if this fails; it says nothing about model state
+    """
+    alive = job_queue.workers_alive()
+    ok = not job_queue.started or alive == job_queue.num_workers
+    return jsonify({
+        'status': 'alive' if ok else 'unhealthy',
+        'workers_alive': alive,
+        'workers': job_queue.num_workers,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ok else 503
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness: whether this instance should receive traffic (503 if not)
+
+    With READINESS_REQUIRES_WARM_MODEL the instance is not ready until the
+    startup warmup has succeeded. A pipeline unloaded later after
+    CACHE_TIMEOUT is reported as 'degraded' but still ready: the next job
+    reloads it. The probe itself never loads the model, so idle eviction
+    actually frees memory. A full job queue is not ready.
+    """
+    manager = get_model_manager()
+    local = generator.use_local
+    reasons = []
+    warnings = []
+
+    needs_warm_model = local and config.READINESS_REQUIRES_WARM_MODEL and warmer.state != ModelWarmer.STATE_SKIPPED
+    if needs_warm_model and not warmer.warmed_once:
+        if warmer.state == ModelWarmer.STATE_FAILED:
+            reasons.append(f'warmup failed: {warmer.error}')
+        reasons.append('model warming up' if warmer.running else 'model not warmed')
+    elif needs_warm_model and not (manager.is_loaded and manager.warmed):
+        warnings.append('model unloaded while idle; the next job reloads it')
+    if job_queue.is_full():
+        reasons.append('job queue full')
+
+    estimated_wait = job_queue.estimated_wait()
+    if local and not manager.is_loaded and warmer.state != ModelWarmer.STATE_SKIPPED:
+        # The next job pays for loading the model first
+        estimated_wait += int(manager.last_load_seconds or config.QUEUE_RETRY_AFTER_DEFAULT)
+
+    ready = not reasons
+    return jsonify({
+        'status': ('degraded' if warnings else 'ready') if ready else 'not_ready',
+        'ready': ready,
+        'reasons': reasons,
+        'warnings': warnings,
+        'backend': 'local' if local else 'dalle',
+        'model': {
+            'loaded': manager.is_loaded,
+            'warmed': manager.warmed,
+            'lora_loaded': manager.lora_loaded,
+            'ip_adapter_loaded': manager.ip_adapter_loaded,
+            'ip_adapter_required': bool(config.USE_IDENTITY_LOCK),
+        },
+        'warmup': warmer.status(),
+        'queue': {
+            'depth': job_queue.depth(),
+            'capacity': job_queue.max_size,
+            'active_jobs': job_queue.active_count(),
+            'estimated_wait_seconds': estimated_wait,
+        },
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latency histograms, counters and queue/memory gauges in Prometheus text format"""
+    if not config.ENABLE_METRICS:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/model/status', methods=['GET'])
+def model_status():
+    """Model residency: loaded state, memory usage and recent load/unload events"""
+    stats = get_model_manager().stats()
+    # Don't import the SDXL stack just to report on it
+    local_gen = generator.loaded_local_generator
+    if local_gen is not None and getattr(local_gen, 'scheduler', None) is not None:
+        stats['batching'] = local_gen.scheduler.stats()
+    return jsonify(stats)
+
+
+@app.route('/api/storage/status', methods=['GET'])
+def storage_status():
+    """Image writer stats (per-format encode time and file size) and artifact dedup counters"""
+    from image_writer import get_image_writer
+    from artifact_store import get_artifact_store
+    from llm_cache import get_llm_cache
+    writer = get_image_writer()
+    llm_cache = get_llm_cache()
+    return jsonify({
+        'default_format': writer.default_format,
+        'formats': writer.stats(),
+        'artifacts': get_artifact_store().stats(),
+        'exports': get_export_store().stats(),
+        'retention': retention.stats(),
+        'llm_cache': llm_cache.stats() if llm_cache else None
+    })
+
+
 @app.route('/static/generated/<path:filename>')
 def serve_generated_image(filename):
-    """Serve generated images"""
-    return send_from_directory('static/generated', filename)
+    """Serve generated images (ETag/304, ranges; content-addressed files are immutable)"""
+    return serve_static_file(config.OUTPUT_DIR, filename)
 
 
 @app.route('/favicon.ico')
@@ -233,14 +491,22 @@ def export_pdf():
         # Generate PDF
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_filename = f'aldar_kose_storyboard_{timestamp}.pdf'
-        output_path = os.path.join('static/exports', output_filename)
+        store = get_export_store()
+        output_path = os.path.join(store.root, f'.render_{uuid.uuid4().hex}.pdf')
+
+        # Export to PDF (reportlab is only imported when someone exports);
+        # pinned so retention can't remove the frames while they are being read
+        from pdf_exporter import export_to_pdf
+        with metrics.PDF_EXPORT_SECONDS.time():
+            with retention.pinned(frame.get('image_path') for frame in data['storyboard']):
+                pdf_path = export_to_pdf(data, output_path)
 
-        # Export to PDF
-        pdf_path = export_to_pdf(data, output_path)
+            # Move into the content-addressed store; the friendly name is only the download name
+            artifact = store.put_file(pdf_path, kind='export', metadata={'name': output_filename})
 
         return jsonify({
             'success': True,
-            'pdf_url': f'/static/exports/{output_filename}',
+            'pdf_url': artifact.url,
             'filename': output_filename
         })
 
@@ -256,13 +522,13 @@ def export_pdf():
 
 @app.route('/static/exports/<path:filename>')
 def serve_exported_pdf(filename):
-    """Serve exported PDF files"""
-    return send_from_directory('static/exports', filename)
+    """Serve exported PDF files (byte ranges let viewers fetch large PDFs page by page)"""
+    return serve_static_file(config.EXPORTS_DIR, filename)
 
 
 if __name__ == '__main__':
-    # Use port 8080 to avoid conflict with macOS AirPlay Receiver on port 5000
-    port = 8080
+    # Development server only; for production use the ASGI entry point in asgi.py
+    port = config.SERVER_PORT
     print("=" * 70)
     print("ALDAR KÖSE STORYBOARD GENERATOR")
     print("=" * 70)
@@ -287,4 +553,4 @@ if __name__ == '__main__':
     print(f"🚀 Server starting on http://localhost:{port}")
     print("=" * 70)
     print()
-    app.run(debug=True, host='0.0.0.0', port=port, use_reloader=False)
+    app.run(debug=config.DEBUG_MODE, host=config.SERVER_HOST, port=port, threaded=True, use_reloader=False)
@@ -0,0 +1,271 @@
+"""
+Content-Addressed Artifact Store
+Stores generated frames and exported PDFs under the sha256 of their bytes, so
+identical files are kept once, names never collide, and URLs are immutable
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+import config
+
+
+# <2-char shard>/<64-char sha256>.<ext>
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+$')
+
+SIDECAR_SUFFIX = '.json'
+
+
+class Artifact:
+    """A stored file and where to fetch it"""
+
+    def __init__(self, path: Path, relpath: str, url: str, sha256: str, size_bytes: int, deduplicated: bool):
+        self.path = path
+        self.relpath = relpath
+        self.url = url
+        self.sha256 = sha256
+        self.size_bytes = size_bytes
+        self.deduplicated = deduplicated
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'sha256': self.sha256,
+            'size_bytes': self.size_bytes,
+            'deduplicated': self.deduplicated,
+        }
+
+
+class ArtifactStore:
+    """
+    Directory of immutable, content-addressed files
+
+    Each file lives at <root>/<hash[:2]>/<hash>.<ext> next to a small JSON
+    sidecar (<file>.json) with its size, content type, kind and the metadata
+    of the first write. Writes go to a temp file, are fsynced, then renamed,
+    so readers never see a partial file. Writing bytes that are already
+    stored is a no-op.
+    """
+
+    def __init__(self, root: Union[str, Path], url_prefix: str):
+        """
+        Initialize the store
+
+        Args:
+            root: Directory holding the artifacts
+            url_prefix: Public URL prefix for root, e.g. "/static/generated"
+        """
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip('/')
+        self._lock = threading.Lock()
+
+        self.writes = 0
+        self.dedup_hits = 0
+        self.bytes_written = 0
+        self.bytes_deduplicated = 0
+
+    @staticmethod
+    def is_content_addressed(relpath: str) -> bool:
+        """True for paths produced by this store (safe to serve as immutable)"""
+        return bool(CONTENT_ADDRESSED_RE.match(relpath.replace(os.sep, '/')))
+
+    def put_bytes(self, data: bytes, extension: str, kind: str = 'artifact',
+                  metadata: Optional[Dict[str, Any]] = None) -> Artifact:
+        """
+        Store bytes under their content hash
+
+        Args:
+            data: File contents
+            extension: File extension including the dot, e.g. ".png"
+            kind: Label kept in the sidecar, e.g. "frame" or "export"
+            metadata: Extra sidecar fields (only the first write is kept)
+
+        Returns:
+            Artifact describing the stored (or already present) file
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        relpath = f"{digest[:2]}/{digest}{extension.lower()}"
+        path = self.root / relpath
+
+        with self._lock:
+            if self._reuse(path, len(data)):
+                return self._artifact(path, relpath, digest, len(data), deduplicated=True)
+
+        # Write and fsync outside the lock so writers for different content
+        # run in parallel; only the rename is serialized
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            if self._reuse(path, len(data)):
+                # Another writer stored the same bytes meanwhile
+                os.remove(tmp_path)
+                return self._artifact(path, relpath, digest, len(data), deduplicated=True)
+            os.replace(tmp_path, path)
+            self.writes += 1
+            self.bytes_written += len(data)
+
+        self._write_sidecar(path, {
+            'sha256': digest,
+            'size_bytes': len(data),
+            'extension': extension.lower(),
+            'kind': kind,
+            'created_at': time.time(),
+            **(metadata or {}),
+        })
+        return self._artifact(path, relpath, digest, len(data), deduplicated=False)
+
+    def _reuse(self, path: Path, size: int) -> bool:
+        """Count a dedup hit if path is already stored (caller holds the lock)"""
+        if not path.exists():
+            return False
+        self.dedup_hits += 1
+        self.bytes_deduplicated += size
+        try:
+            # Reused content counts as fresh for retention (see retention.py)
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def put_file(self, source: Union[str, Path], kind: str = 'artifact',
+                 metadata: Optional[Dict[str, Any]] = None, remove_source: bool = True) -> Artifact:
+        """Store an existing file (e.g. a rendered PDF) and optionally delete the original"""
+        source = Path(source)
+        with open(source, 'rb') as f:
+            data = f.read()
+        artifact = self.put_bytes(data, source.suffix, kind=kind, metadata=metadata)
+        if remove_source:
+            try:
+                os.remove(source)
+            except OSError:
+                pass
+        return artifact
+
+    def remove_if_older(self, path: Union[str, Path], cutoff: float) -> int:
+        """
+        Delete a stored file with its sidecar and compressed variants, unless
+        it was written or reused after `cutoff` (a unix timestamp)
+
+        Holding the store lock means a concurrent put_bytes() either reuses
+        the file before it is checked or writes it again afterwards.
+
+        Returns:
+            Bytes freed (0 if the file was kept or already gone)
+        """
+        path = Path(path)
+        with self._lock:
+            try:
+                if path.stat().st_mtime > cutoff:
+                    return 0
+            except OSError:
+                return 0
+            freed = 0
+            for victim in [path] + [path.with_name(path.name + suffix) for suffix in (SIDECAR_SUFFIX, '.gz', '.br')]:
+                try:
+                    size = victim.stat().st_size
+                    os.remove(victim)
+                    freed += size
+                except OSError:
+                    pass
+            return freed
+
+    def read_metadata(self, relpath: str) -> Optional[Dict[str, Any]]:
+        """Sidecar metadata for a stored file, or None"""
+        try:
+            with open(self.root / f"{relpath}{SIDECAR_SUFFIX}", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'root': str(self.root),
+            'writes': self.writes,
+            'dedup_hits': self.dedup_hits,
+            'bytes_written': self.bytes_written,
+            'bytes_deduplicated': self.bytes_deduplicated,
+        }
+
+    def _artifact(self, path: Path, relpath: str, digest: str, size: int, deduplicated: bool) -> Artifact:
+        return Artifact(
+            path=path,
+            relpath=relpath,
+            url=f"{self.url_prefix}/{relpath}",
+            sha256=digest,
+            size_bytes=size,
+            deduplicated=deduplicated
+        )
+
+    def _write_sidecar(self, path: Path, metadata: Dict[str, Any]):
+        sidecar = path.with_name(path.name + SIDECAR_SUFFIX)
+        tmp_path = sidecar.with_name(f".{sidecar.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, sidecar)
+
+
+def frame_file_paths(frame: Dict[str, Any]) -> List[str]:
+    """Every stored file a frame points at: the original plus its derivatives"""
+    paths = [frame['image_path']] if frame.get('image_path') else []
+    paths.extend(p for p in (frame.get('image_variant_paths') or {}).values() if p)
+    return [os.fspath(p) for p in paths]
+
+
+_stores: Dict[str, ArtifactStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_artifact_store(root: Union[str, Path] = None, url_prefix: Optional[str] = None) -> ArtifactStore:
+    """
+    Process-wide store for a directory (default: config.OUTPUT_DIR)
+
+    Args:
+        root: Store directory
+        url_prefix: Public URL prefix for root. Only needed for directories the
+            app does not serve itself: OUTPUT_DIR and EXPORTS_DIR map to their
+            /static/generated and /static/exports routes, other directories
+            under static/ to matching /static/... URLs
+
+    Raises:
+        ValueError: If root is not served by the app and no url_prefix is given
+    """
+    root = Path(root or config.OUTPUT_DIR).resolve()
+    key = str(root)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ArtifactStore(root, url_prefix or _served_url_prefix(root))
+        return _stores[key]
+
+
+def _served_url_prefix(root: Path) -> str:
+    """URL prefix the app serves root under; raises ValueError if it serves none"""
+    routes = {
+        Path(config.OUTPUT_DIR).resolve(): "/static/generated",
+        Path(config.EXPORTS_DIR).resolve(): "/static/exports",
+    }
+    if root in routes:
+        return routes[root]
+    static_dir = (config.BASE_DIR / "static").resolve()
+    try:
+        return "/static/" + root.relative_to(static_dir).as_posix()
+    except ValueError:
+        raise ValueError(
+            f"{root} is not served by the app (not OUTPUT_DIR, EXPORTS_DIR or under static/); "
+            f"pass an explicit url_prefix"
+        ) from None
+
+
+def get_export_store() -> ArtifactStore:
+    """Store for exported PDFs (static/exports)"""
+    return get_artifact_store(config.EXPORTS_DIR)
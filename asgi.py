@@ -0,0 +1,214 @@
+"""
+Production Entry Point (ASGI)
+Serves the Flask app through an ASGI server instead of the Werkzeug dev server
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8080 --workers 1 --timeout-keep-alive 75
+
+Job event streams (POST /api/generate/stream, GET /api/jobs/<id>/stream) are
+written from the event loop: the Flask view validates the request and queues
+the job, then the stream itself is handed to Job.aiter_events, so a client
+waiting minutes for its frames holds a coroutine, not a thread. Every other
+request runs the Flask app on a bounded pool of HTTP_THREADS threads, one
+request per thread, so health probes, /metrics, DELETE /api/jobs/<id> and 429
+replies are answered while any number of streams are open.
+
+Generation never runs on request threads: every job goes through the bounded
+job queue (JOB_QUEUE_MAX_SIZE / JOB_WORKERS), LLM calls run on the job
+workers, image encoding and disk writes on the image writer pool, and every
+pipe() call through the model manager. A full queue answers 429 with
+Retry-After.
+
+Workers:
+    Each worker process has its own job queue and its own copy of the SDXL
+    pipeline. With the local SDXL backend keep --workers 1 (the accelerator
+    is the bottleneck and a second copy of the model rarely fits). With the
+    DALL·E backend several workers are fine, but /api/jobs/<id> lookups need
+    sticky sessions (route by job ID or client) because jobs live in the
+    process that accepted them.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+import config
+from app import app, job_queue, disconnect_grace, encode_job_event, JOB_STREAM_ENVIRON_KEY
+
+# Start queue workers at import, before the first request arrives
+job_queue.start()
+
+
+def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """WSGI environ (PEP 3333) for an ASGI HTTP scope and its full request body"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body is fully buffered, so chunked uploads get a length too
+    environ.setdefault('CONTENT_LENGTH', str(len(body)))
+    return environ
+
+
+class StoryboardASGI:
+    """
+    ASGI application around the Flask app
+
+    Requests run the WSGI app on a bounded thread pool; responses marked as
+    job streams (JOB_STREAM_ENVIRON_KEY) are then served from the event loop.
+    """
+
+    def __init__(self, wsgi_app, max_threads: int = None):
+        """
+        Initialize the server adapter
+
+        Args:
+            wsgi_app: Flask (WSGI) application
+            max_threads: Requests handled concurrently by the Flask app
+        """
+        self.wsgi_app = wsgi_app
+        self.max_threads = max(1, max_threads or config.HTTP_THREADS)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="http")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return  # No websocket routes
+
+        body = await self._read_body(receive)
+        if body is None:
+            return  # Client went away before sending its request
+        environ = build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        stream = await loop.run_in_executor(self.executor, self._run_wsgi, environ, send_sync)
+        if stream is not None:
+            await self._stream_job(*stream, receive, send)
+
+    def _run_wsgi(self, environ: Dict[str, Any], send_sync) -> Optional[tuple]:
+        """
+        Run the Flask app on a pool thread and send its response
+
+        Returns:
+            (start message, (job, after, fmt)) for job streams, which the
+            event loop serves instead; None once the response was sent
+        """
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            }
+            return lambda data: send_sync({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        response = self.wsgi_app(environ, start_response)
+        try:
+            job_stream = environ.get(JOB_STREAM_ENVIRON_KEY)
+            if job_stream is not None:
+                # The body generator was never started, so closing it is a no-op
+                return start['message'], job_stream
+
+            started = False
+            for chunk in response:
+                if not started:
+                    send_sync(start['message'])
+                    started = True
+                if chunk:
+                    send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                send_sync(start['message'])
+            send_sync({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            return None
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+    async def _stream_job(self, start, job_stream, receive, send):
+        """Write a job's events as they arrive until it finishes or the client disconnects"""
+        job, after, fmt = job_stream
+        await send(start)
+
+        async def pump():
+            async for event in job.aiter_events(after=after):
+                body = encode_job_event(event, fmt).encode('utf-8')
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        job.attach()
+        writer = asyncio.ensure_future(pump())
+        watcher = asyncio.ensure_future(disconnected())
+        try:
+            await asyncio.wait({writer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                writer.result()  # Re-raise write errors
+        finally:
+            for task in (writer, watcher):
+                task.cancel()
+            job.detach(cancel_after=disconnect_grace(job))
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                job_queue.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = StoryboardASGI(app)
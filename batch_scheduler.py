@@ -0,0 +1,310 @@
+"""
+Micro-Batching Scheduler for SDXL Frame Generation
+Collects pending frames from every active storyboard over a short window and
+runs frames that share resolution, steps and guidance as one batched pipe() call
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+import config
+from cancellation import GenerationCancelled
+import metrics
+
+
+class FrameRequest:
+    """One image waiting to be rendered by the scheduler"""
+
+    def __init__(
+        self,
+        prompt: str,
+        negative_prompt: str,
+        num_inference_steps: int,
+        guidance_scale: float,
+        width: int,
+        height: int,
+        seed: Optional[int] = None,
+        step_callback: Optional[Callable] = None,
+        cancel_token=None
+    ):
+        self.prompt = prompt
+        self.negative_prompt = negative_prompt
+        self.num_inference_steps = num_inference_steps
+        self.guidance_scale = guidance_scale
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.step_callback = step_callback
+        self.cancel_token = cancel_token
+        self.future: Future = Future()
+        self.enqueued_at = time.time()
+
+    @property
+    def batch_key(self) -> Tuple[int, int, int, float]:
+        """Frames can share a pipe() call only if these settings match"""
+        return (self.width, self.height, self.num_inference_steps, float(self.guidance_scale))
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+
+class BatchScheduler:
+    """
+    Single dispatcher thread in front of the shared SDXL pipeline
+
+    Requests are grouped by batch_key. The dispatcher waits up to max_wait
+    seconds after the oldest pending request arrives (or until a group is
+    full), then renders the oldest group as one batch. Larger windows favor
+    throughput, smaller windows favor latency.
+    """
+
+    def __init__(
+        self,
+        model_manager,
+        device: str,
+        max_batch_size: int = None,
+        max_wait: float = None,
+        max_batch_pixels: int = None
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            model_manager: ModelManager owning the pipeline
+            device: Torch device used for seeded generators
+            max_batch_size: Maximum images per pipe() call
+            max_wait: Seconds to wait for more frames before dispatching
+            max_batch_pixels: Memory budget, as total pixels per batch
+        """
+        self.model_manager = model_manager
+        self.device = device
+        self.max_batch_size = max(1, max_batch_size or config.BATCH_MAX_SIZE)
+        self.max_wait = max_wait if max_wait is not None else config.BATCH_MAX_WAIT_MS / 1000.0
+        self.max_batch_pixels = max_batch_pixels or config.BATCH_MAX_PIXELS
+
+        self._pending: "OrderedDict[Tuple, List[FrameRequest]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        # Running totals for tuning batch size / wait time
+        self.batches_run = 0
+        self.images_run = 0
+
+    def submit(
+        self,
+        prompt: str,
+        negative_prompt: str,
+        num_inference_steps: int,
+        guidance_scale: float,
+        width: int = None,
+        height: int = None,
+        seed: Optional[int] = None,
+        step_callback: Optional[Callable] = None,
+        cancel_token=None
+    ) -> Future:
+        """
+        Queue one frame for batched generation
+
+        Args:
+            step_callback: Optional (step, total_steps, latents, batch_index) hook
+            cancel_token: Optional CancelToken; cancelled frames are dropped
+                before dispatch, and a batch whose frames are all cancelled
+                stops at the next denoising step
+
+        Returns:
+            Future resolving to a PIL Image
+        """
+        request = FrameRequest(
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            width=width or config.IMAGE_WIDTH,
+            height=height or config.IMAGE_HEIGHT,
+            seed=seed,
+            step_callback=step_callback,
+            cancel_token=cancel_token
+        )
+        with self._cond:
+            self._ensure_thread()
+            self._pending.setdefault(request.batch_key, []).append(request)
+            self._cond.notify_all()
+        return request.future
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters and current backlog"""
+        with self._cond:
+            pending = sum(len(group) for group in self._pending.values())
+        return {
+            'pending_frames': pending,
+            'batches_run': self.batches_run,
+            'images_run': self.images_run,
+            'avg_batch_size': round(self.images_run / self.batches_run, 2) if self.batches_run else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': int(self.max_wait * 1000),
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch_loop, name="sdxl-batch-scheduler", daemon=True)
+            self._thread.start()
+
+    def _batch_limit(self, key: Tuple) -> int:
+        """Images allowed in one batch for this resolution"""
+        width, height = key[0], key[1]
+        by_memory = max(1, self.max_batch_pixels // (width * height))
+        return min(self.max_batch_size, by_memory)
+
+    def _next_batch(self) -> List[FrameRequest]:
+        """Block until a batch is ready, then pop it from the pending groups"""
+        with self._cond:
+            while True:
+                while not self._pending:
+                    self._cond.wait()
+
+                # Oldest group first keeps ordering fair across storyboards
+                key, group = next(iter(self._pending.items()))
+                limit = self._batch_limit(key)
+                deadline = group[0].enqueued_at + self.max_wait
+                remaining = deadline - time.time()
+
+                if len(group) >= limit or remaining <= 0:
+                    batch, rest = group[:limit], group[limit:]
+                    if rest:
+                        self._pending[key] = rest
+                        self._pending.move_to_end(key, last=False)
+                    else:
+                        del self._pending[key]
+                    return batch
+
+                self._cond.wait(timeout=remaining)
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._next_batch()
+            # Drop frames whose caller already gave up
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            batch = self._drop_cancelled(batch)
+            if not batch:
+                continue
+            try:
+                for request, image in self._run_batch(batch):
+                    if request.cancelled:
+                        request.future.set_exception(GenerationCancelled(request.cancel_token.reason or 'cancelled'))
+                    else:
+                        request.future.set_result(image)
+            except BaseException as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    @staticmethod
+    def _drop_cancelled(batch: List[FrameRequest]) -> List[FrameRequest]:
+        """Fail cancelled frames right away and return the ones still wanted"""
+        runnable = []
+        for request in batch:
+            if request.cancelled:
+                if not request.future.done():
+                    request.future.set_exception(GenerationCancelled(request.cancel_token.reason or 'cancelled'))
+            else:
+                runnable.append(request)
+        return runnable
+
+    def _run_batch(self, batch: List[FrameRequest]) -> List[Tuple[FrameRequest, Any]]:
+        """
+        Render a batch of compatible frames with a single pipe() call
+
+        Frames cancelled while the batch waited for the pipeline are dropped
+        before pipe() runs, so they never cost denoising steps.
+
+        Returns:
+            (request, image) pairs for the frames that were rendered
+        """
+        with self.model_manager.acquire() as pipe:
+            batch = self._drop_cancelled(batch)
+            if not batch:
+                return []
+            images = self._render(pipe, batch)
+        return list(zip(batch, images))
+
+    def _render(self, pipe, batch: List[FrameRequest]) -> List[Any]:
+        """Run pipe() once for every frame in the batch"""
+        import torch
+
+        first = batch[0]
+        steps = first.num_inference_steps
+
+        generators = None
+        if any(request.seed is not None for request in batch):
+            generators = [
+                torch.Generator(device=self.device).manual_seed(
+                    request.seed if request.seed is not None else int(torch.seed() % (2 ** 32))
+                )
+                for request in batch
+            ]
+
+        start_time = time.time()
+        print(f"🎨 Batched generation: {len(batch)} frame(s), {steps} steps, {first.width}x{first.height}")
+        timer = metrics.DenoiseTimer(batch_size=len(batch))
+
+        def on_step(step, timestep, latents):
+            timer.step()
+            if step % 2 == 0:
+                print(f"  Step {step+1}/{steps}...", end='\r')
+            # A batch can't shrink mid-denoise; stop only once every frame is abandoned
+            if all(request.cancelled for request in batch):
+                raise GenerationCancelled('all frames in batch cancelled')
+            # Each frame's hook sees its own slice of the batched latents
+            for index, request in enumerate(batch):
+                if request.step_callback is not None and not request.cancelled:
+                    request.step_callback(step, steps, latents, index)
+
+        with torch.no_grad():
+            result = pipe(
+                prompt=[request.prompt for request in batch],
+                negative_prompt=[request.negative_prompt for request in batch],
+                num_inference_steps=steps,
+                guidance_scale=first.guidance_scale,
+                generator=generators,
+                height=first.height,
+                width=first.width,
+                callback=on_step,
+                callback_steps=1,
+            )
+        timer.finish()
+        images = list(result.images)
+
+        elapsed = time.time() - start_time
+        self.batches_run += 1
+        self.images_run += len(batch)
+        metrics.FRAMES_GENERATED.inc(len(batch), backend='sdxl')
+        print(f"\n✅ Batch of {len(batch)} generated in {elapsed:.2f} seconds ({elapsed / len(batch):.2f}s per image)")
+
+        del result
+        if self.device == "mps":
+            import gc
+            gc.collect()
+            torch.mps.empty_cache()
+
+        return images
+
+
+_scheduler: Optional[BatchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler(model_manager, device: str) -> BatchScheduler:
+    """Process-wide scheduler shared by every LocalImageGenerator"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BatchScheduler(model_manager, device)
+        return _scheduler
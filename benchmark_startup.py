@@ -0,0 +1,94 @@
+"""
+Startup Benchmark
+Measures how long `import app` takes and fails if the web tier starts pulling
+in the heavy generation stack (torch, diffusers, transformers, ...) at import
+
+Usage:
+    python benchmark_startup.py                # report + check against the budget
+    python benchmark_startup.py --budget 0.5   # stricter wall-clock budget (seconds)
+    python benchmark_startup.py --top 30       # show more of the slowest imports
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Modules that must only load when the first generation (or PDF export) needs them
+HEAVY_MODULES = ['torch', 'diffusers', 'transformers', 'accelerate', 'peft', 'reportlab', 'openai', 'numpy']
+
+DEFAULT_BUDGET_SECONDS = 1.0
+
+
+def measure_import(module: str = 'app'):
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Returns:
+        (wall_seconds, rows) where rows are (cumulative_us, self_us, module_name)
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit(f"❌ `import {module}` failed (exit code {proc.returncode})")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header row
+        rows.append((cumulative_us, self_us, parts[2].strip()))
+    return wall, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark web tier startup time")
+    parser.add_argument('--module', default='app', help="Module to import (default: app)")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Maximum wall-clock seconds for the import")
+    parser.add_argument('--top', type=int, default=15, help="How many of the slowest imports to list")
+    args = parser.parse_args()
+
+    wall, rows = measure_import(args.module)
+    imported = {name for _, _, name in rows}
+
+    print("=" * 70)
+    print(f"STARTUP BENCHMARK: import {args.module}")
+    print("=" * 70)
+    print(f"⚡ Wall clock (incl. interpreter start): {wall:.3f}s (budget {args.budget:.2f}s)")
+    print(f"   Modules imported: {len(rows)}")
+    print()
+    print("Slowest imports (cumulative):")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {name}")
+    print()
+
+    problems = []
+    leaked = [name for name in HEAVY_MODULES if name in imported]
+    if leaked:
+        problems.append(f"heavy modules imported at startup: {', '.join(leaked)}")
+    if wall > args.budget:
+        problems.append(f"startup took {wall:.3f}s, over the {args.budget:.2f}s budget")
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✓ Startup is within budget and free of heavy imports")
+
+
+if __name__ == "__main__":
+    main()
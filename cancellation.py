@@ -0,0 +1,51 @@
+"""
+Cooperative Cancellation
+A token shared by a job and every stage working on it, checked between
+stages and on every denoising step so abandoned storyboards free the GPU fast
+"""
+
+import threading
+from typing import Optional
+
+
+class GenerationCancelled(Exception):
+    """Raised inside generation code once its job has been cancelled"""
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag
+
+    Producers call cancel(); workers call raise_if_cancelled() at safe
+    points (between frames, and from the diffusers step callback, which
+    aborts the denoising loop within one step).
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = 'cancelled'):
+        """Request cancellation (idempotent; the first reason wins)"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def raise_if_cancelled(self):
+        """Raise GenerationCancelled if cancellation was requested"""
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason or 'cancelled')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or timeout; returns True if cancelled"""
+        return self._event.wait(timeout)
+
+
+def raise_if_cancelled(token: Optional[CancelToken]):
+    """raise_if_cancelled() that accepts None for callers without a token"""
+    if token is not None:
+        token.raise_if_cancelled()
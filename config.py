@@ -14,11 +14,9 @@ load_dotenv()
 BASE_DIR = Path(__file__).parent
 MODELS_DIR = BASE_DIR / "models"
 REFERENCE_IMAGES_DIR = BASE_DIR
-OUTPUT_DIR = BASE_DIR / "static" / "generated"
-
-# Ensure directories exist
-MODELS_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
+OUTPUT_DIR = BASE_DIR / "static" / "generated"  # Content-addressed: <sha[:2]>/<sha>.<ext> (see artifact_store.py)
+EXPORTS_DIR = BASE_DIR / "static" / "exports"
+LOGS_DIR = BASE_DIR / "logs"
 
 # ===== STABLE DIFFUSION XL CONFIGURATION =====
 
@@ -59,6 +57,7 @@ IMAGE_WIDTH = 1024
 IMAGE_HEIGHT = 1024
 NUM_INFERENCE_STEPS = 30  # Higher quality
 GUIDANCE_SCALE = 7.5  # Original settings
+GENERATION_SEED = None  # Fixed seed for reproducible frames (None = random each time)
 
 # Scheduler settings (for speed optimization)
 USE_FAST_SCHEDULER = True  # Use Euler Ancestral (faster, high quality)
@@ -72,6 +71,32 @@ LCM_STEPS = 6  # Steps when using LCM (4-8 recommended)
 PARALLEL_BATCH_SIZE = 1  # M1 optimization: sequential is more stable
 MAX_WORKERS = 1  # Single worker prevents memory issues
 
+# Cross-request micro-batching (frames from all active storyboards)
+# Off by default: batched pipe() calls only pay off on CUDA, on MPS they are slower than sequential
+ENABLE_BATCH_SCHEDULER = os.getenv('ENABLE_BATCH_SCHEDULER', 'false').lower() == 'true'  # Group compatible frames into one pipe() call (CUDA only)
+BATCH_MAX_SIZE = 4  # Max images per batched pipe() call
+BATCH_MAX_WAIT_MS = 50  # Collection window: lower = latency, higher = throughput
+BATCH_MAX_PIXELS = 1024 * 1024 * 2  # Memory budget per batch (2 frames at 1024x1024)
+
+# Streaming pipeline (prompt prep -> diffusion -> encode/save run concurrently)
+STREAM_PIPELINE_DEPTH = 2  # Max frames buffered between two stages
+STREAM_FRAME_PLANNING = True  # Stream the GPT frame plan and start rendering frame 1 before it is complete
+
+# Image output (encoded and saved on a background writer pool)
+IMAGE_FORMAT = "png"  # Options: "png" (fast zlib), "png_optimized", "webp_lossless", "webp", "jpeg"
+PNG_COMPRESS_LEVEL = 1  # zlib level for "png": 1 is ~10x faster than optimize=True
+WEBP_QUALITY = 90  # Lossy WebP quality (previews)
+JPEG_QUALITY = 92  # JPEG quality (previews)
+IMAGE_WRITER_WORKERS = 2  # Encoder threads
+
+# Derivatives written next to every saved frame (UI loads thumb/preview, PDF embeds print)
+ENABLE_IMAGE_DERIVATIVES = True
+IMAGE_DERIVATIVES = {
+    'thumb': {'max_size': 256, 'format': 'webp'},  # Grid thumbnails, ~10KB
+    'preview': {'max_size': 512, 'format': 'webp'},  # Frame cards, ~30-40KB
+    'print': {'max_size': None, 'format': 'jpeg'},  # Full size JPEG for PDF export (DCT passthrough)
+}
+
 # Quality settings
 ENABLE_QUALITY_VALIDATION = True
 MAX_REGENERATION_ATTEMPTS = 2  # How many times to retry failed generations
@@ -111,6 +136,10 @@ TRAINING_CAPTION = (
 
 # ===== PROMPT ENHANCEMENT SETTINGS =====
 
+# Keyword rules for actions, settings, Kazakh->English terms and key elements
+# (compiled into one matcher by scene_rules.py; reloaded when the file changes)
+SCENE_RULES_PATH = MODELS_DIR / "scene_rules.json"
+
 # Base style prompt (concise for 77 token limit)
 BASE_STYLE_PROMPT = (
     "2D cel-shaded, anime-inspired illustration, smooth clean outlines, flat colors, soft shadows, "
@@ -212,6 +241,29 @@ GPT_MODEL = "gpt-4o-mini"  # Use gpt-4o-mini (cheaper and available to all)
 GPT_TEMPERATURE = 0.7
 GPT_MAX_TOKENS_STORY = 300
 GPT_MAX_TOKENS_FRAMES = 2000
+# "two_step": story call, then (streamed) frame planning call
+# "single_call": story + frames in one schema-constrained response (one round trip fewer;
+#   frames arrive all at once, so frame 1 can't start while the plan streams)
+PLANNING_MODE = os.getenv('PLANNING_MODE', 'two_step')
+
+# Shared API client (see llm_client.py)
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '30'))  # Seconds per chat attempt
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '60'))  # Seconds per chat call including retries
+IMAGE_REQUEST_TIMEOUT = 90  # Seconds per DALL·E attempt
+IMAGE_DEADLINE = 180  # Seconds per DALL·E call including retries
+DOWNLOAD_TIMEOUT = 30  # Seconds per image download attempt
+HTTP_CONNECT_TIMEOUT = 5  # Seconds to establish a connection
+LLM_MAX_RETRIES = 3  # Retries on timeouts, connection errors, 408/429/5xx
+LLM_RETRY_BASE_DELAY = 0.5  # Backoff base (full jitter: uniform(0, base * 2^attempt))
+LLM_RETRY_MAX_DELAY = 8  # Cap on one backoff sleep (also caps Retry-After)
+HTTP_POOL_MAXSIZE = 16  # Pooled keep-alive connections per host
+HTTP_KEEPALIVE_EXPIRY = 30  # Seconds an idle pooled connection is kept
+
+# DALL·E path (see image_api_executor.py); frames are generated concurrently
+DALLE_MAX_IN_FLIGHT = int(os.getenv('DALLE_MAX_IN_FLIGHT', '5'))  # Concurrent image API calls (process-wide)
+DALLE_REQUESTS_PER_MINUTE = float(os.getenv('DALLE_REQUESTS_PER_MINUTE', '15'))  # Token-bucket rate (0 = unlimited)
+DALLE_BURST = 5  # Calls that may start back to back before the rate applies
+DALLE_RESPONSE_FORMAT = "b64_json"  # "b64_json" (image in the response) or "url" (extra download)
 
 # ===== PERFORMANCE SETTINGS =====
 
@@ -219,6 +271,30 @@ GPT_MAX_TOKENS_FRAMES = 2000
 ENABLE_MODEL_CACHING = True  # Keep model in memory between requests
 CACHE_TIMEOUT = 3600  # Seconds to keep model cached (1 hour)
 
+# Live latent previews ({"type":"preview"} stream events while a frame denoises)
+ENABLE_LATENT_PREVIEWS = False  # Default when the request doesn't set "previews"
+PREVIEW_EVERY_N_STEPS = 5  # Convert latents at most every N denoising steps
+PREVIEW_MIN_INTERVAL = 0.5  # ...and at most once per this many seconds
+PREVIEW_MAX_SIZE = 192  # Longest side of preview thumbnails (px)
+PREVIEW_JPEG_QUALITY = 70
+
+# Storyboard result cache (replays finished storyboards for repeated prompts)
+ENABLE_STORYBOARD_CACHE = True  # Storyboards with template frames or placeholder images are never cached
+STORYBOARD_CACHE_DIR = BASE_DIR / "cache" / "storyboards"
+STORYBOARD_CACHE_MAX_ENTRIES = 500  # LRU eviction beyond this many storyboards
+STORYBOARD_CACHE_MAX_BYTES = 2 * 1024 ** 3  # LRU eviction beyond this size (entries + their images)
+
+# LLM response cache (story / frame planning replies, see llm_cache.py)
+ENABLE_LLM_CACHE = os.getenv('ENABLE_LLM_CACHE', 'false').lower() == 'true'
+LLM_CACHE_DIR = BASE_DIR / "cache" / "llm"
+LLM_CACHE_TTL = 7 * 24 * 3600  # Seconds an entry stays valid (0 = forever)
+LLM_CACHE_MAX_ENTRIES = 5000  # LRU eviction beyond this many responses
+LLM_CACHE_MAX_BYTES = 100 * 1024 ** 2  # LRU eviction beyond this size
+# Deterministic mode (benchmarks, tests): cache on regardless of ENABLE_LLM_CACHE,
+# no TTL, temperature 0 and a fixed seed, so repeated runs replay the same plans
+LLM_DETERMINISTIC = os.getenv('LLM_DETERMINISTIC', 'false').lower() == 'true'
+LLM_DETERMINISTIC_SEED = 1234
+
 # Lazy loading
 LAZY_LOAD_MODEL = True  # Only load model when first generation request comes in
 
@@ -226,6 +302,81 @@ LAZY_LOAD_MODEL = True  # Only load model when first generation request comes in
 ENABLE_PROGRESS_TRACKING = True
 PROGRESS_UPDATE_INTERVAL = 1.0  # Seconds between progress updates
 
+# ===== JOB QUEUE SETTINGS =====
+
+# Background generation jobs (/api/jobs)
+JOB_QUEUE_MAX_SIZE = 16  # Pending jobs before new submissions are rejected
+# A second worker only helps when its frames can share pipe() calls with the first
+JOB_WORKERS = 2 if ENABLE_BATCH_SCHEDULER else 1  # Concurrent storyboards; pipe() access is serialized by the model manager / batch scheduler
+JOB_RESULT_TTL = 3600  # Seconds to keep finished jobs available for polling
+JOB_SYNC_TIMEOUT = 900  # Seconds /api/generate waits for its job before giving up
+JOB_EXPIRY_INTERVAL = 30  # Seconds between sweeps that release replay buffers and forget old jobs
+
+# Resumable streams: per-job replay buffer of emitted events
+REPLAY_BUFFER_MAX_EVENTS = 500  # Soft limit: only previews are dropped when over budget
+REPLAY_BUFFER_MAX_BYTES = 2 * 1024 * 1024  # Serialized size budget per job
+REPLAY_BUFFER_TTL = 900  # Seconds after a job finishes that clients can still resume it (later: a 'gap' event)
+
+# Backpressure: a full queue answers 429 with Retry-After instead of taking more work
+QUEUE_RETRY_AFTER_DEFAULT = 60  # Seconds per job assumed until real durations are measured
+QUEUE_RETRY_AFTER_MIN = 5
+QUEUE_RETRY_AFTER_MAX = 300
+
+# Cancellation: streams started by /api/generate/stream are cancelled when the client goes away
+CANCEL_ON_DISCONNECT_GRACE = 10  # Seconds to wait for the client to resume before freeing the GPU
+
+# ===== STATIC SERVING =====
+
+# Generated images and PDFs: strong ETags, 304s and byte ranges (static_server.py)
+IMMUTABLE_MAX_AGE = 31536000  # One year for content-addressed files (their URL changes if the bytes do)
+STATIC_MAX_AGE = 300  # Other files: short max-age, then cheap ETag revalidation
+ETAG_CACHE_MAX_ENTRIES = 1024  # Hashed ETags memoized for non-content-addressed files (LRU)
+SERVE_PRECOMPRESSED = True  # Serve <file>.br / <file>.gz when present and accepted (never for ranges or PDFs)
+
+# ===== RETENTION =====
+
+# Background garbage collection of static/generated and static/exports (retention.py)
+ENABLE_RETENTION = True
+RETENTION_INTERVAL = 600  # Seconds between collection passes
+RETENTION_MIN_AGE = 3600  # Never delete files younger than this (covers frames of jobs still running)
+RETENTION_GENERATED_MAX_AGE_DAYS = 14  # Delete unreferenced images older than this
+RETENTION_GENERATED_MAX_BYTES = 5 * 1024 ** 3  # Then delete oldest unreferenced images beyond this size
+RETENTION_EXPORTS_MAX_AGE_DAYS = 3
+RETENTION_EXPORTS_MAX_BYTES = 1 * 1024 ** 3
+RETENTION_KEEP_REFERENCED = True  # Keep images of cached storyboards (live jobs' files are always kept)
+RETENTION_MAX_DELETES_PER_PASS = 500  # Work per pass stays bounded; the rest waits for the next pass
+
+# ===== HEALTH & WARMUP =====
+
+# /api/health/live answers as long as the process and its job workers are up.
+# /api/health/ready answers 503 while the instance can't take traffic quickly.
+ENABLE_STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'False').lower() == 'true'  # Load + one tiny generation at startup
+WARMUP_IMAGE_SIZE = 512  # px (multiple of 8); small enough to take seconds
+WARMUP_STEPS = 2
+WARMUP_RETRY_INTERVAL = 60  # Seconds before a failed warmup retries itself
+WARMUP_MAX_RUNS = 3  # Give up (stay not ready) after this many failed warmups
+READINESS_REQUIRES_WARM_MODEL = ENABLE_STARTUP_WARMUP  # Not ready until the first warmup succeeds (idle unload later = 'degraded', still 200)
+
+# ===== METRICS =====
+
+# Prometheus text format at GET /metrics (metrics.py): stage latencies, queue depth, memory
+ENABLE_METRICS = os.getenv('ENABLE_METRICS', 'True').lower() == 'true'
+
+# ===== REQUEST TIMINGS =====
+
+# Per-request stage timeline (timeline.py): metadata.timings, a final "stats" stream event
+# and one JSON line per storyboard in the timings log
+ENABLE_TIMINGS_LOG = os.getenv('TIMINGS_LOG', 'True').lower() == 'true'
+TIMINGS_LOG_PATH = LOGS_DIR / "timings.jsonl"
+TIMINGS_LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotated to timings.jsonl.1 beyond this
+
+# ===== SERVER SETTINGS =====
+
+# Dev server: python app.py   |   Production: uvicorn asgi:application (see asgi.py)
+SERVER_HOST = os.getenv('HOST', '0.0.0.0')
+SERVER_PORT = int(os.getenv('PORT', '8080'))  # 8080 avoids macOS AirPlay Receiver on port 5000
+HTTP_THREADS = int(os.getenv('HTTP_THREADS', '32'))  # asgi.py: concurrent non-stream requests (job streams use no thread)
+
 # ===== DEBUG SETTINGS =====
 
 DEBUG_MODE = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -273,10 +424,16 @@ def validate_config():
 
     return issues
 
-# Validate on import
-if __name__ != "__main__":
+def ensure_directories():
+    """Create the output directories the app writes to (call once at startup)"""
+    for directory in (MODELS_DIR, OUTPUT_DIR, EXPORTS_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+def report_config_issues():
+    """Print validate_config() problems; returns the list of issues"""
     config_issues = validate_config()
     if config_issues:
         print("Configuration issues detected:")
         for issue in config_issues:
             print(f"  - {issue}")
+    return config_issues
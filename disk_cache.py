@@ -0,0 +1,140 @@
+"""
+On-Disk LRU Cache
+Shared storage for the storyboard and LLM response caches: one JSON file per
+key in two-character shards, atomic writes, and an in-memory LRU index that
+drives eviction by entry count and total size
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+
+
+class DiskLRUCache:
+    """
+    Base class for JSON-entry caches on disk
+
+    Each entry is one file named by its key, so a lookup is a single path
+    check. The LRU index (key -> bytes, oldest first) is rebuilt from file
+    mtimes the first time it is needed; reads refresh an entry's mtime so
+    the order survives restarts. Subclasses decide what an entry holds and
+    may count extra bytes against the size budget (see _entry_size).
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int, max_bytes: int):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding one JSON file per entry
+            max_entries: Maximum cached entries
+            max_bytes: Maximum total size, as counted by _entry_size
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self.hits = 0
+        self.misses = 0
+
+    def delete(self, key: str):
+        """Drop one entry"""
+        with self._lock:
+            self._load_index().pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                'entries': len(index),
+                'total_bytes': sum(index.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Parsed entry file, or None if it is missing or unreadable"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key: str, entry: Dict[str, Any], extra_bytes: int = 0):
+        """Atomically write an entry, mark it most recently used and evict over budget"""
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8')
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            index = self._load_index()
+            index[key] = len(data) + extra_bytes
+            index.move_to_end(key)
+            self._evict(index)
+
+    def _record_hit(self, key: str):
+        """Count a hit and mark the entry most recently used"""
+        with self._lock:
+            self.hits += 1
+            index = self._load_index()
+            if key in index:
+                index.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _entry_paths(self) -> Iterator[Path]:
+        return self.cache_dir.glob('*/*.json')
+
+    def _entry_size(self, entry_path: Path, size: int) -> int:
+        """Bytes an existing entry counts against max_bytes (the file itself by default)"""
+        return size
+
+    def _path(self, key: str) -> Path:
+        # Two-character shards keep directories small
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """LRU index of key -> bytes, oldest first (built lazily from disk; call with _lock held)"""
+        if self._index is None:
+            entries = []
+            for entry_path in self._entry_paths():
+                try:
+                    stat = entry_path.stat()
+                    size = self._entry_size(entry_path, stat.st_size)
+                except (OSError, ValueError):
+                    continue
+                entries.append((stat.st_mtime, entry_path.stem, size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+        return self._index
+
+    def _evict(self, index: "OrderedDict[str, int]"):
+        """Drop least recently used entries until within count and size limits"""
+        total = sum(index.values())
+        while index and (len(index) > self.max_entries or total > self.max_bytes):
+            key, size = index.popitem(last=False)
+            total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
@@ -0,0 +1,327 @@
+"""
+Frame Planning
+Streams the storyboard plan and yields each frame the moment its JSON object
+closes, so the first frame can start rendering while GPT is still writing the
+rest of the plan; or (PLANNING_MODE="single_call") gets story and frames back
+in one schema-constrained response
+"""
+
+import json
+import time
+import types
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+import config
+import metrics
+from llm_client import get_llm_client
+
+
+# The 7-key frame schema from StoryboardGenerator._get_storyboard_system_prompt()
+MORALS = ['kindness', 'justice', 'hospitality', 'wisdom', 'courage', 'generosity']
+SHOT_TYPES = ['establishing', 'wide', 'medium', 'two-shot', 'close-up', 'over-shoulder']
+FRAME_TEXT_KEYS = ['rhyme', 'moral', 'shot_type', 'setting', 'lighting_hint', 'description']
+FRAME_KEYS = FRAME_TEXT_KEYS + ['key_objects']
+MAX_FRAMES = 10
+
+FRAME_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'rhyme': {'type': 'string'},
+        'moral': {'type': 'string', 'enum': MORALS},
+        'shot_type': {'type': 'string', 'enum': SHOT_TYPES},
+        'setting': {'type': 'string'},
+        'key_objects': {'type': 'array', 'items': {'type': 'string'}},
+        'lighting_hint': {'type': 'string'},
+        'description': {'type': 'string'},
+    },
+    'required': FRAME_KEYS,
+    'additionalProperties': False,
+}
+
+# response_format for the single-call planner (strict: the API enforces the schema)
+STORYBOARD_PLAN_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {
+        'name': 'aldar_storyboard',
+        'strict': True,
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'story': {'type': 'string'},
+                'frames': {'type': 'array', 'items': FRAME_SCHEMA},
+            },
+            'required': ['story', 'frames'],
+            'additionalProperties': False,
+        },
+    },
+}
+
+SINGLE_CALL_INSTRUCTIONS = """
+
+SINGLE RESPONSE MODE:
+First write the Aldar Köse story itself (2–4 sentences) from the user's idea, then plan the storyboard for that story.
+Return ONE JSON object instead of a bare array: {"story": "<the story>", "frames": [<the 6–10 frame objects described above>]}.
+This replaces the array-only output rule above."""
+
+
+def frame_errors(frame: Any) -> List[str]:
+    """Ways a frame breaks the 7-key schema (empty list = valid)"""
+    if not isinstance(frame, dict):
+        return ['not an object']
+    errors = []
+    missing = [key for key in FRAME_KEYS if key not in frame]
+    if missing:
+        errors.append(f"missing {', '.join(missing)}")
+    extra = [key for key in frame if key not in FRAME_KEYS]
+    if extra:
+        errors.append(f"unexpected {', '.join(extra)}")
+    for key in FRAME_TEXT_KEYS:
+        if key in frame and not (isinstance(frame[key], str) and frame[key].strip()):
+            errors.append(f"{key} must be a non-empty string")
+    if frame.get('moral') not in MORALS:
+        errors.append(f"moral {frame.get('moral')!r} not in {MORALS}")
+    if frame.get('shot_type') not in SHOT_TYPES:
+        errors.append(f"shot_type {frame.get('shot_type')!r} not in {SHOT_TYPES}")
+    objects = frame.get('key_objects')
+    if not (isinstance(objects, list) and objects and all(isinstance(o, str) for o in objects)):
+        errors.append("key_objects must be a non-empty list of strings")
+    return errors
+
+
+class FrameArrayParser:
+    """
+    Incremental parser for a JSON array of objects arriving in chunks
+
+    Text before the opening '[' (e.g. a ```json fence) is skipped. Brackets
+    inside strings are ignored, so each top-level object is handed to
+    json.loads() exactly once, as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.skipped = 0
+        self._current: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next chunk of the reply
+
+        Returns:
+            Objects completed by this chunk (malformed ones are skipped and counted)
+        """
+        objects = []
+        for ch in text:
+            if self.finished:
+                break
+            if not self.started:
+                self.started = ch == '['
+                continue
+            if self._depth == 0:
+                # Between objects: only '{' and the closing ']' matter
+                if ch == '{':
+                    self._depth = 1
+                    self._current = [ch]
+                elif ch == ']':
+                    self.finished = True
+                continue
+
+            self._current.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = self._parse(''.join(self._current))
+                    if obj is not None:
+                        objects.append(obj)
+        return objects
+
+    def _parse(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            obj = json.loads(text)
+        except ValueError as e:
+            print(f"⚠️  Skipping malformed frame in streamed plan: {e}")
+            self.skipped += 1
+            return None
+        if not isinstance(obj, dict):
+            self.skipped += 1
+            return None
+        return obj
+
+
+def stream_frame_plan(
+    messages: List[Dict[str, str]],
+    model: str,
+    timeline=None,
+    plan: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield planned frames as the streamed completion produces them
+
+    Frames that break the 7-key schema are dropped, like in plan_storyboard,
+    and the plan stops after MAX_FRAMES.
+
+    Args:
+        messages: System prompt and story for the planner
+        model: Chat model
+        timeline: Optional RequestTimeline; records the LLM call (with tokens)
+            and a 'frame_planning' stage with the time to the first frame
+        plan: Optional dict; 'truncated' is set to True if the stream failed
+            or was cut off before the frame array closed. Frames already
+            yielded stay valid, but the storyboard is short.
+
+    Yields:
+        Frame dicts in plan order
+    """
+    started = time.time()
+    start = time.perf_counter()
+    parser = FrameArrayParser()
+    usage = None
+    cached = False
+    first_frame_seconds = None
+    count = 0
+    dropped = 0
+    error = None
+
+    try:
+        stream = get_llm_client().chat_stream(
+            'frame_planning',
+            messages=messages,
+            model=model,
+            temperature=0.7,
+            max_tokens=config.GPT_MAX_TOKENS_FRAMES
+        )
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                cached = getattr(chunk, 'cached', False)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta or parser.finished:
+                    # Keep reading after ']': the final chunk carries token usage
+                    continue
+                for frame in parser.feed(delta):
+                    errors = frame_errors(frame)
+                    if errors:
+                        dropped += 1
+                        print(f"⚠️  Dropping planned frame {count + dropped}: {'; '.join(errors)}")
+                        continue
+                    if first_frame_seconds is None:
+                        first_frame_seconds = round(time.perf_counter() - start, 3)
+                        print(f"⚡ First planned frame after {first_frame_seconds:.1f}s")
+                    count += 1
+                    yield frame
+                    if count >= MAX_FRAMES:
+                        break
+                if count >= MAX_FRAMES:
+                    # Stop reading: later frames would be dropped anyway
+                    print(f"ℹ️  Frame plan capped at {MAX_FRAMES} frames")
+                    break
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+    except Exception as e:
+        error = e
+        print(f"GPT frame planning stream failed after {count} frames: {e}")
+
+    truncated = count < MAX_FRAMES and (error is not None or not parser.finished)
+    if truncated and error is None:
+        print(f"⚠️  Frame plan stream ended before the frame array closed ({count} frames)")
+    if plan is not None:
+        plan['truncated'] = truncated
+
+    seconds = time.perf_counter() - start
+    metrics.FRAME_PLANNING_SECONDS.observe(seconds)
+    if timeline:
+        timeline.record_llm('frame_planning', model, seconds, types.SimpleNamespace(usage=usage, cached=cached),
+                            error=str(error) if error else None)
+        timeline.record_stage('frame_planning', started, frames=count, streamed=True,
+                              first_frame_s=first_frame_seconds, skipped=parser.skipped + dropped,
+                              truncated=truncated)
+
+
+def plan_storyboard(
+    user_prompt: str,
+    story_system_prompt: str,
+    frames_system_prompt: str,
+    model: str,
+    timeline=None
+) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Story and frames from one schema-constrained chat completion
+
+    Replaces the story call + frame planning call of the two-step mode,
+    saving one LLM round trip. Frames that break the 7-key schema are
+    dropped; the plan is rejected if none are left.
+
+    Args:
+        user_prompt: The user's story idea
+        story_system_prompt: Instructions for writing the story
+        frames_system_prompt: Instructions (and frame schema) for planning frames
+        model: Chat model
+        timeline: Optional RequestTimeline; records the call and a 'planning' stage
+
+    Returns:
+        (story, frames), or None if the call failed or the reply was unusable
+        (the caller then falls back to the two-step mode)
+    """
+    started = time.time()
+    start = time.perf_counter()
+    response = None
+    error = None
+    result = None
+
+    try:
+        response = get_llm_client().chat(
+            'storyboard_plan',
+            model=model,
+            messages=[
+                {"role": "system", "content": f"{story_system_prompt}\n\n{frames_system_prompt}{SINGLE_CALL_INSTRUCTIONS}"},
+                {"role": "user", "content": f"Create an Aldar Köse story and its storyboard based on this idea: {user_prompt}"},
+            ],
+            temperature=0.7,
+            max_tokens=config.GPT_MAX_TOKENS_STORY + config.GPT_MAX_TOKENS_FRAMES,
+            response_format=STORYBOARD_PLAN_FORMAT
+        )
+        message = response.choices[0].message
+        if getattr(message, 'refusal', None):
+            raise ValueError(f"model refused: {message.refusal}")
+        if response.choices[0].finish_reason == 'length':
+            raise ValueError("reply was cut off at max_tokens")
+        plan = json.loads(message.content)
+
+        story = (plan.get('story') or '').strip()
+        frames = []
+        for idx, frame in enumerate(plan.get('frames') or []):
+            errors = frame_errors(frame)
+            if errors:
+                print(f"⚠️  Dropping planned frame {idx + 1}: {'; '.join(errors)}")
+            else:
+                frames.append(frame)
+        if not story or not frames:
+            raise ValueError("plan has no story or no valid frames")
+        result = story, frames[:MAX_FRAMES]
+    except Exception as e:
+        error = e
+        print(f"GPT single-call planning failed: {e}")
+
+    seconds = time.perf_counter() - start
+    if timeline:
+        timeline.record_llm('storyboard_plan', model, seconds, response, error=str(error) if error else None)
+        timeline.record_stage('planning', started, mode='single_call', frames=len(result[1]) if result else 0)
+    return result
@@ -0,0 +1,130 @@
+"""
+Image API Executor
+Runs remote image generation calls (DALL·E) concurrently with a bounded number
+in flight and a process-wide token-bucket rate limit, so a remote storyboard
+takes about as long as its slowest frame instead of the sum of all frames
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional, Callable
+
+import config
+import metrics
+from cancellation import raise_if_cancelled
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter
+
+    Holds up to `capacity` tokens, refilled at `rate` tokens per second;
+    acquire() takes one token, sleeping until one is available. A rate of 0
+    disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel_token=None) -> float:
+        """
+        Take one token
+
+        Args:
+            cancel_token: Optional CancelToken; raises GenerationCancelled while waiting
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                wait = (1 - self.tokens) / self.rate
+            raise_if_cancelled(cancel_token)
+            time.sleep(min(wait, 0.5))
+
+
+class ImageAPIExecutor:
+    """
+    Shared thread pool for image API calls
+
+    The pool size is the in-flight limit; every call first takes a token
+    from the rate limiter, so concurrent jobs share one request budget.
+    """
+
+    def __init__(self, max_in_flight: int = None, requests_per_minute: float = None, burst: int = None):
+        """
+        Initialize the executor
+
+        Args:
+            max_in_flight: Maximum concurrent API calls
+            requests_per_minute: Sustained request rate (0 = unlimited)
+            burst: Requests that may start back to back before the rate applies
+        """
+        self.max_in_flight = max(1, max_in_flight or config.DALLE_MAX_IN_FLIGHT)
+        rate = config.DALLE_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        self.bucket = TokenBucket(rate / 60.0, burst or config.DALLE_BURST)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="image-api")
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rate_limited_seconds = 0.0
+
+    def submit(self, fn: Callable, *args, cancel_token=None, **kwargs) -> Future:
+        """Run fn(*args, **kwargs) on the pool once a rate-limit token is available"""
+        def run():
+            raise_if_cancelled(cancel_token)
+            waited = self.bucket.acquire(cancel_token)
+            metrics.IMAGE_API_RATE_LIMIT_WAIT_SECONDS.observe(waited)
+            with self._lock:
+                self.in_flight += 1
+                self.rate_limited_seconds += waited
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+
+        with self._lock:
+            self.submitted += 1
+        return self._pool.submit(run)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'requests_per_minute': self.bucket.rate * 60,
+                'in_flight': self.in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rate_limited_seconds': round(self.rate_limited_seconds, 3),
+            }
+
+
+_executor: Optional[ImageAPIExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_image_api_executor() -> ImageAPIExecutor:
+    """Process-wide image API executor (one in-flight limit and rate budget for all jobs)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ImageAPIExecutor()
+        return _executor
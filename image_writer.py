@@ -0,0 +1,292 @@
+"""
+Background Image Writer
+Encodes and saves generated frames on a worker pool, off the generation thread,
+with selectable output formats, per-format encode timing and resized derivatives
+(encoded as separate pool tasks after the original is stored)
+"""
+
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, Union
+
+from PIL import Image
+
+import config
+import metrics
+from artifact_store import get_artifact_store
+
+
+# format name -> (PIL format, file extension, save options)
+FORMATS = {
+    # Lossless, fast zlib level instead of optimize=True (which retries every filter)
+    'png': ('PNG', '.png', {'compress_level': config.PNG_COMPRESS_LEVEL}),
+    # Smallest PNG, slowest encode (the previous default)
+    'png_optimized': ('PNG', '.png', {'optimize': True}),
+    # Lossless WebP: usually ~25% smaller than PNG
+    'webp_lossless': ('WEBP', '.webp', {'lossless': True, 'quality': 50, 'method': 2}),
+    # High-quality lossy formats for previews
+    'webp': ('WEBP', '.webp', {'quality': config.WEBP_QUALITY, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', {'quality': config.JPEG_QUALITY, 'subsampling': 0}),
+}
+
+
+class SavedImage:
+    """
+    Result of a background save
+
+    Resolves as soon as the original is stored. Derivatives are encoded
+    afterwards on the same pool: `variants` stays empty until they are
+    done (see variants_pending / on_variants / wait_variants).
+    """
+
+    def __init__(self, path: Path, url: str, image_format: str, size_bytes: int, encode_seconds: float,
+                 sha256: str = None, deduplicated: bool = False, variants: Optional[Dict[str, Any]] = None,
+                 write_seconds: float = 0.0, variants_future: Optional[Future] = None):
+        self.path = path
+        self.filename = path.name
+        self.url = url
+        self.format = image_format
+        self.size_bytes = size_bytes
+        self.encode_seconds = encode_seconds
+        self.sha256 = sha256
+        self.deduplicated = deduplicated
+        # derivative name -> Artifact (see config.IMAGE_DERIVATIVES)
+        self.variants = variants or {}
+        self._variants_future = variants_future
+        # Encode + store of the original, as spent on the writer pool
+        self.write_seconds = write_seconds
+
+    @property
+    def variants_pending(self) -> bool:
+        """True while derivatives are still being encoded"""
+        return self._variants_future is not None and not self._variants_future.done()
+
+    def wait_variants(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Block until the derivatives are stored (a failed derivative pass leaves none)"""
+        future = self._variants_future
+        if future is not None:
+            try:
+                self.variants = future.result(timeout)
+            except Exception as e:
+                print(f"⚠️  Derivatives for {self.filename} failed: {e}")
+                self.variants = {}
+            self._variants_future = None
+        return self.variants
+
+    def on_variants(self, callback: Callable[["SavedImage"], None]):
+        """Call callback(self) once the derivatives are stored (right away if they already are)"""
+        future = self._variants_future
+        if future is None:
+            callback(self)
+            return
+
+        def done(_):
+            self.wait_variants()
+            callback(self)
+        future.add_done_callback(done)
+
+    def variant_urls(self) -> Dict[str, str]:
+        """URL per variant, including the full-size original"""
+        return {'original': self.url, **{name: a.url for name, a in self.variants.items()}}
+
+    def apply_to(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        """Record where this image and its derivatives live on a frame dict"""
+        frame['image_path'] = os.fspath(self.path)
+        frame['image_url'] = self.url
+        frame['image_format'] = self.format
+        frame['image_variants'] = self.variant_urls()
+        frame['image_variant_paths'] = {name: os.fspath(a.path) for name, a in self.variants.items()}
+        return frame
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'format': self.format,
+            'size_bytes': self.size_bytes,
+            'encode_ms': round(self.encode_seconds * 1000, 1),
+            'sha256': self.sha256,
+        }
+
+
+class ImageWriter:
+    """Thread pool that encodes images and writes them durably to disk"""
+
+    def __init__(self, max_workers: int = None, default_format: str = None):
+        """
+        Initialize the writer
+
+        Args:
+            max_workers: Encoder threads (PIL releases the GIL while encoding)
+            default_format: One of FORMATS (default from config.IMAGE_FORMAT)
+        """
+        self.default_format = default_format or config.IMAGE_FORMAT
+        if self.default_format not in FORMATS:
+            raise ValueError(f"Unknown image format '{self.default_format}', choose from {sorted(FORMATS)}")
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or config.IMAGE_WRITER_WORKERS,
+            thread_name_prefix="image-writer"
+        )
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def submit(
+        self,
+        image: Image.Image,
+        stem: str,
+        image_format: Optional[str] = None,
+        output_dir: Optional[Union[str, Path]] = None
+    ) -> Future:
+        """
+        Queue an image for encoding and saving
+
+        Args:
+            image: PIL Image to save
+            stem: Human-readable name, kept in the artifact sidecar (files are named by content hash)
+            image_format: One of FORMATS (default: writer default)
+            output_dir: Artifact store directory (default: config.OUTPUT_DIR)
+
+        Returns:
+            Future resolving to a SavedImage once the bytes are on disk
+        """
+        image_format = image_format or self.default_format
+        if image_format not in FORMATS:
+            raise ValueError(f"Unknown image format '{image_format}', choose from {sorted(FORMATS)}")
+        output_dir = Path(output_dir or config.OUTPUT_DIR)
+        return self._executor.submit(self._write, image, stem, image_format, output_dir)
+
+    def save(self, image: Image.Image, stem: str, image_format: Optional[str] = None,
+             output_dir: Optional[Union[str, Path]] = None) -> SavedImage:
+        """Encode and save, blocking until the file is durable"""
+        return self.submit(image, stem, image_format, output_dir).result()
+
+    def adopt(self, path: Union[str, Path], url: str, stem: str) -> SavedImage:
+        """
+        Wrap an image that was stored elsewhere (e.g. a DALL·E download); its derivatives follow
+
+        Args:
+            path: Stored original
+            url: Its public URL
+            stem: Human-readable name for the derivative sidecars
+        """
+        path = Path(path)
+        variants_future = None
+        if config.ENABLE_IMAGE_DERIVATIVES:
+            variants_future = self._executor.submit(self._derive_from_file, path, stem)
+        return SavedImage(
+            path=path,
+            url=url,
+            image_format=path.suffix.lstrip('.').lower(),
+            size_bytes=path.stat().st_size,
+            encode_seconds=0.0,
+            variants_future=variants_future
+        )
+
+    def _derive_from_file(self, path: Path, stem: str) -> Dict[str, Any]:
+        with Image.open(path) as image:
+            image.load()
+            return self._write_derivatives(image, stem, path.parent.parent)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-format (and per-derivative) counts, average encode time and average file size"""
+        with self._stats_lock:
+            return {
+                fmt: {
+                    'count': int(s['count']),
+                    'avg_encode_ms': round(s['encode_seconds'] / s['count'] * 1000, 1),
+                    'avg_size_bytes': int(s['bytes'] / s['count']),
+                }
+                for fmt, s in self._stats.items() if s['count']
+            }
+
+    def _encode(self, image: Image.Image, image_format: str, variant: str = 'original'):
+        """Encode in memory, so encode time is measured on its own; returns (bytes, extension, seconds)"""
+        pil_format, extension, options = FORMATS[image_format]
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **options)
+        encode_seconds = time.perf_counter() - start
+        metrics.IMAGE_ENCODE_SECONDS.observe(encode_seconds, format=image_format, variant=variant)
+        return buffer.getvalue(), extension, encode_seconds
+
+    def _record(self, key: str, encode_seconds: float, size: int):
+        with self._stats_lock:
+            s = self._stats.setdefault(key, {'count': 0, 'encode_seconds': 0.0, 'bytes': 0})
+            s['count'] += 1
+            s['encode_seconds'] += encode_seconds
+            s['bytes'] += size
+
+    def _write_derivatives(self, image: Image.Image, stem: str, output_dir: Path) -> Dict[str, Any]:
+        """Downscaled copies for the UI and PDF, each stored by content hash"""
+        store = get_artifact_store(output_dir)
+        variants = {}
+        for name, spec in config.IMAGE_DERIVATIVES.items():
+            derived = image
+            max_size = spec.get('max_size')
+            if max_size and max(image.size) > max_size:
+                derived = image.copy()
+                derived.thumbnail((max_size, max_size), Image.LANCZOS)
+            data, extension, encode_seconds = self._encode(derived, spec['format'], variant=name)
+            variants[name] = store.put_bytes(data, extension, kind='derivative', metadata={
+                'name': f"{stem}_{name}",
+                'variant': name,
+                'format': spec['format'],
+                'width': derived.width,
+                'height': derived.height,
+            })
+            self._record(f"{name}:{spec['format']}", encode_seconds, len(data))
+        return variants
+
+    def _write(self, image: Image.Image, stem: str, image_format: str, output_dir: Path) -> SavedImage:
+        start = time.perf_counter()
+        data, extension, encode_seconds = self._encode(image, image_format)
+
+        # Atomic, deduplicated write named by the sha256 of the encoded bytes
+        artifact = get_artifact_store(output_dir).put_bytes(data, extension, kind='frame', metadata={
+            'name': stem,
+            'format': image_format,
+            'width': image.width,
+            'height': image.height,
+        })
+
+        self._record(image_format, encode_seconds, len(data))
+
+        # Thumbnail / preview / print copies are separate pool tasks, so the
+        # frame is delivered as soon as its original is durable
+        variants_future = None
+        if config.ENABLE_IMAGE_DERIVATIVES:
+            variants_future = self._executor.submit(self._write_derivatives, image, stem, output_dir)
+
+        note = ", already stored" if artifact.deduplicated else ""
+        print(f"💾 Saved {stem} as {artifact.relpath} ({image_format}, {encode_seconds * 1000:.0f}ms encode, {len(data) / 1024:.0f}KB{note})")
+        return SavedImage(
+            path=artifact.path,
+            url=artifact.url,
+            image_format=image_format,
+            size_bytes=len(data),
+            encode_seconds=encode_seconds,
+            sha256=artifact.sha256,
+            deduplicated=artifact.deduplicated,
+            write_seconds=time.perf_counter() - start,
+            variants_future=variants_future
+        )
+
+
+_writer: Optional[ImageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_image_writer() -> ImageWriter:
+    """Process-wide image writer"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ImageWriter()
+        return _writer
@@ -0,0 +1,568 @@
+"""
+Background Job Queue for Storyboard Generation
+Runs storyboard jobs on a dedicated inference worker so Flask request threads never block on SDXL
+"""
+
+import asyncio
+import json
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Iterator
+
+import config
+import metrics
+from cancellation import CancelToken, GenerationCancelled
+from artifact_store import frame_file_paths
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+    def __init__(self, message: str, retry_after: int = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def frames_from_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Frames delivered so far, with any later 'frame_variants' update merged in
+
+    Args:
+        events: Job events in order
+
+    Returns:
+        Frame dicts in delivery order
+    """
+    frames = {}
+    for event in events:
+        if event.get('type') == 'frame':
+            frames[event.get('index', len(frames))] = dict(event.get('frame') or {})
+        elif event.get('type') == 'frame_variants' and event.get('index') in frames:
+            frames[event['index']].update(
+                image_variants=event['image_variants'],
+                image_variant_paths=event['image_variant_paths'],
+            )
+    return list(frames.values())
+
+
+class Job:
+    """
+    A single storyboard generation job and the events it has produced so far
+
+    Every event gets a monotonic integer 'id'. Emitted events stay in a
+    bounded replay buffer so a client that lost its connection can resume
+    from the last ID it saw instead of starting a new storyboard. When the
+    buffer is over budget only preview events are dropped: story/frame
+    events are what a resumed client needs, so the budgets are soft limits:
+    a job with no previews left stays over them. Once the buffer is released
+    after REPLAY_BUFFER_TTL, a client resuming from before that point gets
+    an explicit 'gap' event instead of silently missing frames.
+
+    Each job carries a CancelToken; generation code checks it between
+    frames and on every denoising step.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+
+    FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+    def __init__(self, prompt: str, mode: str = 'stream', options: Optional[Dict[str, Any]] = None):
+        """
+        Create a new job
+
+        Args:
+            prompt: User prompt to generate a storyboard from
+            mode: 'stream' (frames emitted as they finish) or 'full' (whole storyboard at once)
+            options: Extra generation options, e.g. {"previews": True}
+        """
+        self.id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.mode = mode
+        self.options = options or {}
+        self.status = self.STATUS_QUEUED
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._events: List[Dict[str, Any]] = []
+        self._event_sizes: List[int] = []
+        self._buffer_bytes = 0
+        self._next_event_id = 1
+        self.buffer_released = False
+        self._released_through = 0  # Highest event ID dropped by release_buffer()
+        self._cond = threading.Condition()
+        self._wakers: List[Callable[[], None]] = []  # Async listeners (aiter_events)
+
+        self.cancel_token = CancelToken()
+        self._listeners = 0
+        self._orphan_timer: Optional[threading.Timer] = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the job has completed or failed"""
+        return self.status in self.FINISHED_STATUSES
+
+    @property
+    def last_event_id(self) -> int:
+        """ID of the most recently emitted event (0 if none)"""
+        return self._next_event_id - 1
+
+    def emit(self, event: Dict[str, Any]):
+        """Assign the next event ID, buffer the event and wake up every listener"""
+        with self._cond:
+            event = {'id': self._next_event_id, **event}
+            self._next_event_id += 1
+            size = len(json.dumps(event, default=str))
+            self._events.append(event)
+            self._event_sizes.append(size)
+            self._buffer_bytes += size
+            self._trim_buffer()
+            self._notify()
+
+    def _notify(self):
+        """Wake every listener, threaded and async (caller holds the lock)"""
+        self._cond.notify_all()
+        for wake in self._wakers:
+            wake()
+
+    def _trim_buffer(self):
+        """
+        Keep the replay buffer within its event-count and byte budgets
+
+        The budgets are soft: only the oldest previews are evicted. Without
+        previews left the buffer stays over budget, because the remaining
+        events (a few per frame, with image URLs rather than data) are needed
+        to resume the storyboard. release_buffer() bounds it after the job.
+        """
+        max_events = config.REPLAY_BUFFER_MAX_EVENTS
+        max_bytes = config.REPLAY_BUFFER_MAX_BYTES
+        while len(self._events) > max_events or self._buffer_bytes > max_bytes:
+            victim = next((i for i, e in enumerate(self._events) if e.get('type') == 'preview'), None)
+            if victim is None:
+                return
+            self._events.pop(victim)
+            self._buffer_bytes -= self._event_sizes.pop(victim)
+
+    def _events_after(self, last_id: int) -> List[Dict[str, Any]]:
+        """Buffered events after last_id, led by a 'gap' event if some were released (caller holds the lock)"""
+        pending = [e for e in self._events if e['id'] > last_id]
+        if last_id < self._released_through:
+            pending.insert(0, {
+                'id': self._released_through,
+                'type': 'gap',
+                'after': last_id,
+                'message': f'Events {last_id + 1}-{self._released_through} are no longer buffered; '
+                           f'this storyboard can no longer be resumed'
+            })
+        return pending
+
+    def release_buffer(self):
+        """Drop buffered events once the replay TTL has passed (status is kept)"""
+        with self._cond:
+            terminal = ('complete', 'error', 'cancelled')
+            dropped = [e['id'] for e in self._events if e.get('type') not in terminal]
+            self._released_through = max(dropped + [self._released_through])
+            self._events = [e for e in self._events if e.get('type') in terminal]
+            self._event_sizes = [len(json.dumps(e, default=str)) for e in self._events]
+            self._buffer_bytes = sum(self._event_sizes)
+            self.buffer_released = True
+
+    def mark_running(self):
+        """Mark the job as picked up by a worker"""
+        with self._cond:
+            self.status = self.STATUS_RUNNING
+            self.started_at = time.time()
+            self._notify()
+
+    def mark_finished(self, error: Optional[str] = None, cancelled: bool = False):
+        """Mark the job as completed, failed (if an error is given) or cancelled"""
+        with self._cond:
+            self.error = error
+            if cancelled:
+                self.status = self.STATUS_CANCELLED
+            else:
+                self.status = self.STATUS_FAILED if error else self.STATUS_COMPLETED
+            self.finished_at = time.time()
+            self._notify()
+
+    def cancel(self, reason: str = 'cancelled by client') -> bool:
+        """
+        Request cancellation; running generation stops at its next step
+
+        Returns:
+            False if the job had already finished
+        """
+        if self.finished:
+            return False
+        self.cancel_token.cancel(reason)
+        return True
+
+    def attach(self):
+        """Register a connected stream client"""
+        with self._cond:
+            self._listeners += 1
+            if self._orphan_timer is not None:
+                self._orphan_timer.cancel()
+                self._orphan_timer = None
+
+    def detach(self, cancel_after: Optional[float] = None):
+        """
+        Unregister a stream client
+
+        Args:
+            cancel_after: If set and no client reattaches within this many
+                seconds, cancel the job (the user closed the tab)
+        """
+        with self._cond:
+            self._listeners = max(0, self._listeners - 1)
+            if self._listeners or cancel_after is None or self.finished:
+                return
+            self._orphan_timer = threading.Timer(cancel_after, self._cancel_if_orphaned)
+            self._orphan_timer.daemon = True
+            self._orphan_timer.start()
+
+    def _cancel_if_orphaned(self):
+        with self._cond:
+            orphaned = self._listeners == 0
+            self._orphan_timer = None
+        if orphaned:
+            self.cancel(reason='client disconnected')
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Snapshot of all events emitted so far"""
+        with self._cond:
+            return list(self._events)
+
+    def iter_events(self, after: int = 0, poll_interval: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events as they arrive until the job finishes
+
+        Args:
+            after: ID of the last event the caller has already seen (0 = from the start)
+            poll_interval: Seconds to wait before yielding a None heartbeat
+
+        Yields:
+            Event dicts, or None as a keep-alive when nothing happened for poll_interval
+        """
+        last_id = after
+        while True:
+            with self._cond:
+                if self.last_event_id <= last_id and not self.finished:
+                    self._cond.wait(timeout=poll_interval)
+                pending = self._events_after(last_id)
+                done = self.finished
+            if pending:
+                last_id = pending[-1]['id']
+                for event in pending:
+                    yield event
+            elif done:
+                return
+            else:
+                yield None
+
+    async def aiter_events(self, after: int = 0, poll_interval: float = 15.0):
+        """
+        Async version of iter_events for event-loop servers (see asgi.py)
+
+        Waits for new events without holding a thread, so a long-lived
+        stream costs one coroutine instead of one blocked request thread.
+        """
+        loop = asyncio.get_running_loop()
+        arrived = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(arrived.set)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        with self._cond:
+            self._wakers.append(wake)
+        try:
+            last_id = after
+            while True:
+                arrived.clear()
+                with self._cond:
+                    pending = self._events_after(last_id)
+                    done = self.finished
+                if pending:
+                    last_id = pending[-1]['id']
+                    for event in pending:
+                        yield event
+                    continue
+                if done:
+                    return
+                try:
+                    await asyncio.wait_for(arrived.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._cond:
+                self._wakers.remove(wake)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout=timeout)
+
+    def to_dict(self, include_events: bool = True) -> Dict[str, Any]:
+        """JSON-friendly view of the job"""
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'mode': self.mode,
+            'prompt': self.prompt,
+            'error': self.error,
+            'last_event_id': self.last_event_id,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+        }
+        events = self.events()
+        data['frames'] = frames_from_events(events)
+        if include_events:
+            data['events'] = events
+        if self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class JobQueue:
+    """
+    Bounded FIFO of storyboard jobs drained by dedicated worker thread(s)
+
+    HTTP request threads only enqueue and read events. Workers run the
+    generation, and every pipe() call goes through the shared model manager,
+    so concurrent requests can never interleave calls into the pipeline.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], None],
+        max_size: int = None,
+        num_workers: int = None,
+        result_ttl: float = None
+    ):
+        """
+        Initialize the job queue
+
+        Args:
+            handler: Function that runs a job, emitting events via job.emit()
+            max_size: Maximum number of queued (not yet running) jobs
+            num_workers: Number of worker threads draining the queue
+            result_ttl: Seconds to keep finished jobs around for polling
+        """
+        self.handler = handler
+        self.max_size = max_size if max_size is not None else config.JOB_QUEUE_MAX_SIZE
+        self.num_workers = num_workers or config.JOB_WORKERS
+        self.result_ttl = result_ttl if result_ttl is not None else config.JOB_RESULT_TTL
+
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=self.max_size)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._janitor: Optional[threading.Thread] = None
+        self._started = False
+
+        # Moving average of job run time, used to estimate Retry-After
+        self._avg_job_seconds: Optional[float] = None
+
+    def start(self):
+        """Start worker threads (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.num_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"storyboard-worker-{i}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            # Replay buffers and finished jobs expire on a timer, not only when
+            # the next request happens to come in
+            self._janitor = threading.Thread(
+                target=self._janitor_loop,
+                name="storyboard-job-janitor",
+                daemon=True
+            )
+            self._janitor.start()
+
+    def submit(
+        self,
+        prompt: str,
+        mode: str = 'stream',
+        options: Optional[Dict[str, Any]] = None,
+        on_created: Optional[Callable[[Job], None]] = None
+    ) -> Job:
+        """
+        Enqueue a new job
+
+        Args:
+            prompt: User prompt to generate a storyboard from
+            mode: 'stream' or 'full' (see Job)
+            options: Extra generation options
+            on_created: Called with the job before it is queued, so events it
+                emits (e.g. the resume handle) precede anything a worker emits
+
+        Raises:
+            QueueFullError: If the queue already holds max_size pending jobs
+        """
+        self.start()
+        self._expire_finished()
+
+        job = Job(prompt, mode=mode, options=options)
+        if on_created is not None:
+            on_created(job)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise QueueFullError(
+                f"Job queue is full ({self.max_size} pending jobs)",
+                retry_after=self.retry_after()
+            )
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; returns the job (None if unknown)"""
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID"""
+        self._expire_finished()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def referenced_paths(self) -> set:
+        """Absolute image paths referenced by any job still held in memory"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        paths = set()
+        for job in jobs:
+            frames = frames_from_events(job.events())
+            if job.result:
+                frames += job.result.get('storyboard', [])
+            for frame in frames:
+                paths.update(os.path.abspath(path) for path in frame_file_paths(frame))
+        return paths
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def active_count(self) -> int:
+        """Number of jobs currently running"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == Job.STATUS_RUNNING)
+
+    def is_full(self) -> bool:
+        """True while new submissions would be rejected"""
+        return self._queue.full()
+
+    def workers_alive(self) -> int:
+        """Worker threads still running (0 before start())"""
+        return sum(1 for worker in self._workers if worker.is_alive())
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def estimated_wait(self) -> int:
+        """Rough seconds a job submitted now would wait for a worker"""
+        ahead = self.depth() + self.active_count()
+        if ahead < self.num_workers:
+            return 0
+        avg = self._avg_job_seconds or config.QUEUE_RETRY_AFTER_DEFAULT
+        return int(math.ceil((ahead - self.num_workers + 1) * avg / self.num_workers))
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before trying again"""
+        avg = self._avg_job_seconds or config.QUEUE_RETRY_AFTER_DEFAULT
+        # A queue slot frees up roughly every avg / num_workers seconds
+        estimate = math.ceil(avg / self.num_workers)
+        return int(min(max(estimate, config.QUEUE_RETRY_AFTER_MIN), config.QUEUE_RETRY_AFTER_MAX))
+
+    def _record_duration(self, job: Job):
+        metrics.JOBS_FINISHED.inc(status=job.status)
+        if not job.started_at or not job.finished_at:
+            return
+        seconds = job.finished_at - job.started_at
+        metrics.JOB_DURATION_SECONDS.observe(seconds, mode=job.mode, status=job.status)
+        with self._lock:
+            if self._avg_job_seconds is None:
+                self._avg_job_seconds = seconds
+            else:
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * seconds
+
+    def _worker_loop(self):
+        """Drain the queue forever, one job at a time"""
+        while True:
+            job = self._queue.get()
+            if job.cancel_token.cancelled:
+                # Cancelled while still waiting: never touch the GPU
+                job.emit({"type": "cancelled", "reason": job.cancel_token.reason})
+                job.mark_finished(cancelled=True)
+                metrics.JOBS_FINISHED.inc(status=job.status)
+                self._queue.task_done()
+                continue
+            job.mark_running()
+            metrics.JOB_WAIT_SECONDS.observe(job.started_at - job.created_at)
+            try:
+                self.handler(job)
+                job.mark_finished()
+            except GenerationCancelled as e:
+                print(f"⚠️  Job {job.id} cancelled: {e}")
+                job.emit({"type": "cancelled", "reason": str(e)})
+                job.mark_finished(cancelled=True)
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {e}")
+                job.emit({"type": "error", "message": str(e)})
+                job.mark_finished(error=str(e))
+            finally:
+                self._record_duration(job)
+                self._queue.task_done()
+
+    def _janitor_loop(self):
+        """Expire finished jobs every JOB_EXPIRY_INTERVAL seconds"""
+        while True:
+            time.sleep(config.JOB_EXPIRY_INTERVAL)
+            try:
+                self._expire_finished()
+            except Exception as e:
+                print(f"⚠️  Job expiry failed: {e}")
+
+    def _expire_finished(self):
+        """Release replay buffers after REPLAY_BUFFER_TTL and forget jobs after result_ttl"""
+        now = time.time()
+        with self._lock:
+            expired = []
+            for job_id, job in self._jobs.items():
+                if not job.finished or not job.finished_at:
+                    continue
+                if job.finished_at < now - self.result_ttl:
+                    expired.append(job_id)
+                elif job.finished_at < now - config.REPLAY_BUFFER_TTL and not job.buffer_released:
+                    job.release_buffer()
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,112 @@
+"""
+Live Latent Previews
+Turns intermediate SDXL latents into small RGB thumbnails with a cheap linear
+latent-to-RGB projection (no VAE decode), for streaming progress to the UI
+"""
+
+import base64
+import io
+import time
+from typing import Optional, Callable
+
+import config
+
+
+# Linear projection from the 4 SDXL latent channels to RGB, plus bias
+# (same approximation used by common SD preview tools)
+SDXL_LATENT_RGB_FACTORS = [
+    #   R        G        B
+    [0.3651, 0.4232, 0.4341],
+    [-0.2533, -0.0042, 0.1068],
+    [0.1076, 0.1111, -0.0362],
+    [-0.3165, -0.2492, -0.2188],
+]
+SDXL_LATENT_RGB_BIAS = [0.1084, -0.0175, -0.0011]
+
+
+def latents_to_image(latents, index: int = 0, max_size: int = None):
+    """
+    Approximate the RGB image for one latent in a batch
+
+    Args:
+        latents: Tensor of shape (batch, 4, h, w)
+        index: Which batch item to convert
+        max_size: Longest side of the returned thumbnail
+
+    Returns:
+        PIL Image (latent resolution is 1/8 of the output, e.g. 128px for 1024px)
+    """
+    import torch
+    from PIL import Image
+
+    max_size = max_size or config.PREVIEW_MAX_SIZE
+    with torch.no_grad():
+        latent = latents[index].detach().float().cpu()
+        factors = torch.tensor(SDXL_LATENT_RGB_FACTORS, dtype=latent.dtype)
+        bias = torch.tensor(SDXL_LATENT_RGB_BIAS, dtype=latent.dtype)
+        rgb = torch.einsum('chw,cr->hwr', latent, factors) + bias
+        rgb = ((rgb + 1.0) / 2.0).clamp(0, 1).mul(255).byte().numpy()
+
+    image = Image.fromarray(rgb, mode='RGB')
+    if max(image.size) != max_size:
+        scale = max_size / max(image.size)
+        image = image.resize(
+            (max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+            Image.BILINEAR
+        )
+    return image
+
+
+def image_to_data_url(image, quality: int = None) -> str:
+    """Encode a thumbnail as an inline JPEG data URL"""
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality or config.PREVIEW_JPEG_QUALITY)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class PreviewThrottle:
+    """
+    Step callback that emits a preview at most every N steps and every T seconds
+
+    Conversion only happens for steps that pass the throttle, so the UNet
+    loop pays nothing on the others.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[dict], None],
+        every_n_steps: int = None,
+        min_interval: float = None,
+        max_size: int = None
+    ):
+        """
+        Args:
+            emit: Receives {"step", "total_steps", "image"} dicts
+            every_n_steps: Minimum steps between previews
+            min_interval: Minimum seconds between previews
+            max_size: Longest side of preview thumbnails
+        """
+        self.emit = emit
+        self.every_n_steps = max(1, every_n_steps or config.PREVIEW_EVERY_N_STEPS)
+        self.min_interval = min_interval if min_interval is not None else config.PREVIEW_MIN_INTERVAL
+        self.max_size = max_size or config.PREVIEW_MAX_SIZE
+        self._last_emit: Optional[float] = None
+
+    def __call__(self, step: int, total_steps: int, latents, index: int = 0):
+        """Step callback: (step, total_steps, latents[, batch index])"""
+        # Skip the last step: the real frame arrives right after it
+        if step + 1 >= total_steps or (step + 1) % self.every_n_steps:
+            return
+        now = time.time()
+        if self._last_emit is not None and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+        try:
+            image = latents_to_image(latents, index=index, max_size=self.max_size)
+            self.emit({
+                'step': step + 1,
+                'total_steps': total_steps,
+                'image': image_to_data_url(image),
+            })
+        except Exception as e:
+            print(f"⚠️  Preview failed: {e}")
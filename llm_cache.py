@@ -0,0 +1,102 @@
+"""
+LLM Response Cache
+Persistent cache of chat completions keyed by model, messages and sampling
+parameters, so repeated story and frame planning requests skip the API call;
+in deterministic mode it makes benchmark and test runs reproducible
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import config
+from disk_cache import DiskLRUCache
+
+
+def is_deterministic() -> bool:
+    """Deterministic mode: cache always on, entries never expire, temperature 0 and a fixed seed"""
+    return config.LLM_DETERMINISTIC
+
+
+def make_key(request: Dict[str, Any]) -> str:
+    """Cache key: sha256 of the canonical JSON of the request parameters"""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache(DiskLRUCache):
+    """
+    On-disk chat completion cache with TTL and LRU eviction
+
+    Same layout as the storyboard cache (see DiskLRUCache). Entries older
+    than the TTL are treated as misses and removed.
+    """
+
+    def __init__(self, cache_dir: Path = None, max_entries: int = None, max_bytes: int = None, ttl: float = None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding one JSON file per response
+            max_entries: Maximum cached responses
+            max_bytes: Maximum total size of the entry files
+            ttl: Seconds an entry stays valid (0 = forever; ignored in deterministic mode)
+        """
+        super().__init__(
+            cache_dir or config.LLM_CACHE_DIR,
+            max_entries or config.LLM_CACHE_MAX_ENTRIES,
+            max_bytes or config.LLM_CACHE_MAX_BYTES
+        )
+        self.ttl = config.LLM_CACHE_TTL if ttl is None else ttl
+        self.expired = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response ({'content', 'finish_reason', 'usage'}), or None"""
+        entry = self._read_entry(key)
+        if entry is None:
+            self._record_miss()
+            return None
+
+        if self.ttl and not is_deterministic() and time.time() - entry.get('cached_at', 0) > self.ttl:
+            self.delete(key)
+            with self._lock:
+                self.expired += 1
+            self._record_miss()
+            return None
+
+        self._record_hit(key)
+        return entry['response']
+
+    def put(self, key: str, request: Dict[str, Any], response: Dict[str, Any]):
+        """Store a response along with the request it answers (kept for debugging)"""
+        self._write_entry(key, {
+            'key': key,
+            'request': request,
+            'response': response,
+            'cached_at': time.time(),
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats['expired'] = self.expired
+        stats['deterministic'] = is_deterministic()
+        return stats
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide LLM cache (None unless enabled in config or in deterministic mode)"""
+    global _cache
+    if not (config.ENABLE_LLM_CACHE or is_deterministic()):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
@@ -0,0 +1,327 @@
+"""
+Shared LLM / Image API Client
+One long-lived OpenAI client and one requests.Session per process, so every
+GPT call, DALL·E call and image download reuses pooled keep-alive connections,
+with per-attempt timeouts, an overall deadline and jittered retries; chat
+completions go through the persistent LLM cache when it is enabled
+"""
+
+import random
+import threading
+import time
+import types
+from typing import List, Dict, Any, Optional, Callable, Iterator
+
+import config
+import metrics
+from llm_cache import get_llm_cache, make_key, is_deterministic
+
+
+class LLMClient:
+    """
+    Thread-safe wrapper around the OpenAI SDK and a pooled requests.Session
+
+    The SDK's own retries are disabled; every call goes through _call(),
+    which retries connection errors, timeouts, 408/429 and 5xx responses
+    with full-jitter exponential backoff (honouring Retry-After), and gives
+    up once the call's deadline has passed.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        """
+        Initialize the client (nothing is imported or connected until first use)
+
+        Args:
+            api_key: OpenAI API key (default from config)
+        """
+        self.api_key = api_key or config.OPENAI_API_KEY
+        self._openai = None
+        self._session = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def openai(self):
+        """The shared OpenAI client, created on first use"""
+        if self._openai is None:
+            with self._lock:
+                if self._openai is None:
+                    self._openai = self._build_openai()
+        return self._openai
+
+    @property
+    def session(self):
+        """The shared requests.Session for downloads, created on first use"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_openai(self):
+        import httpx
+        from openai import OpenAI, DefaultHttpxClient
+
+        http_client = DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=config.HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=config.HTTP_POOL_MAXSIZE,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(config.LLM_REQUEST_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)
+        )
+        # Retries are ours: deadline-aware and jittered
+        return OpenAI(api_key=self.api_key, max_retries=0, http_client=http_client)
+
+    def _build_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.HTTP_POOL_MAXSIZE, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def chat(self, operation: str, messages: List[Dict[str, str]], model: str = None,
+             temperature: float = None, max_tokens: int = None, deadline: float = None, **kwargs):
+        """
+        Chat completion with retries
+
+        Args:
+            operation: Label for metrics and logs, e.g. "story" or "frame_planning"
+            messages: Chat messages
+            model: Model name (default config.GPT_MODEL)
+            temperature: Sampling temperature (default config.GPT_TEMPERATURE)
+            max_tokens: Completion token limit
+            deadline: Seconds for the whole call including retries (default config.LLM_DEADLINE)
+
+        Returns:
+            The SDK's ChatCompletion response (a look-alike with cached=True
+            and no usage when served from the LLM cache)
+        """
+        request = self._chat_request(model, messages, temperature, max_tokens, kwargs)
+        cache, key, cached = self._cache_lookup(operation, request)
+        if cached is not None:
+            return _cached_completion(cached)
+
+        def attempt(timeout):
+            return self.openai.chat.completions.create(timeout=timeout, **request)
+        response = self._call(operation, attempt, config.LLM_REQUEST_TIMEOUT, deadline or config.LLM_DEADLINE)
+
+        if cache:
+            choice = response.choices[0]
+            _store(cache, key, request, choice.message.content, choice.finish_reason, response.usage)
+        return response
+
+    def chat_stream(self, operation: str, messages: List[Dict[str, str]], model: str = None,
+                    temperature: float = None, max_tokens: int = None, deadline: float = None, **kwargs):
+        """
+        Streaming chat completion
+
+        Only opening the stream is retried (nothing has been consumed yet);
+        afterwards the per-attempt timeout bounds the gap between chunks.
+        The last chunk carries token usage.
+
+        Returns:
+            Iterator of ChatCompletionChunk (close() it when stopping early).
+            A cache hit replays the stored reply as one content chunk plus a
+            usage chunk, both with cached=True.
+        """
+        request = self._chat_request(model, messages, temperature, max_tokens, kwargs)
+        cache, key, cached = self._cache_lookup(operation, request)
+        if cached is not None:
+            return _cached_chunks(cached)
+
+        def attempt(timeout):
+            return self.openai.chat.completions.create(
+                stream=True,
+                stream_options={'include_usage': True},
+                timeout=timeout,
+                **request
+            )
+        stream = self._call(operation, attempt, config.LLM_REQUEST_TIMEOUT, deadline or config.LLM_DEADLINE)
+        return _recording_stream(stream, cache, key, request) if cache else stream
+
+    def _chat_request(self, model, messages, temperature, max_tokens, extra) -> Dict[str, Any]:
+        """Chat completion parameters (the LLM cache key is derived from exactly these)"""
+        request = {
+            'model': model or config.GPT_MODEL,
+            'messages': messages,
+            'temperature': config.GPT_TEMPERATURE if temperature is None else temperature,
+            'max_tokens': max_tokens,
+            **extra
+        }
+        if is_deterministic():
+            request['temperature'] = 0
+            request.setdefault('seed', config.LLM_DETERMINISTIC_SEED)
+        return request
+
+    def _cache_lookup(self, operation: str, request: Dict[str, Any]):
+        """
+        Check the LLM cache
+
+        Returns:
+            (cache, key, cached response or None); cache is None when caching is off
+        """
+        cache = get_llm_cache()
+        if cache is None:
+            return None, None, None
+        key = make_key(request)
+        cached = cache.get(key)
+        metrics.LLM_CACHE_REQUESTS.inc(operation=operation, result='miss' if cached is None else 'hit')
+        if cached is not None:
+            print(f"⚡ LLM cache hit for {operation} ({key[:12]})")
+        return cache, key, cached
+
+    def generate_image(self, prompt: str, model: str = "dall-e-3", size: str = "1024x1024",
+                       quality: str = "standard", deadline: float = None, **kwargs):
+        """DALL·E image generation with retries; returns the SDK's ImagesResponse"""
+        def attempt(timeout):
+            return self.openai.images.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=1,
+                timeout=timeout,
+                **kwargs
+            )
+        return self._call('image', attempt, config.IMAGE_REQUEST_TIMEOUT, deadline or config.IMAGE_DEADLINE)
+
+    def download(self, url: str, deadline: float = None) -> bytes:
+        """GET a URL over the pooled session (e.g. a DALL·E image) and return its body"""
+        def attempt(timeout):
+            response = self.session.get(url, timeout=(config.HTTP_CONNECT_TIMEOUT, timeout))
+            response.raise_for_status()
+            return response.content
+        return self._call('download', attempt, config.DOWNLOAD_TIMEOUT, deadline or config.DOWNLOAD_TIMEOUT * 2)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, retries and failures per operation"""
+        with self._stats_lock:
+            return {operation: dict(counts) for operation, counts in self._stats.items()}
+
+    def _count(self, operation: str, key: str):
+        with self._stats_lock:
+            counts = self._stats.setdefault(operation, {'calls': 0, 'retries': 0, 'failures': 0})
+            counts[key] += 1
+
+    def _call(self, operation: str, attempt: Callable[[float], Any], attempt_timeout: float, deadline: float):
+        """
+        Run attempt(timeout) until it succeeds, fails permanently or the deadline passes
+
+        Each attempt gets min(attempt_timeout, time left) as its timeout.
+        """
+        start = time.perf_counter()
+        ends_at = start + deadline
+        self._count(operation, 'calls')
+
+        for retry in range(config.LLM_MAX_RETRIES + 1):
+            remaining = ends_at - time.perf_counter()
+            try:
+                result = attempt(max(1.0, min(attempt_timeout, remaining)))
+                metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome='ok')
+                return result
+            except Exception as e:
+                retryable, retry_after = _classify(e)
+                delay = random.uniform(0, min(config.LLM_RETRY_MAX_DELAY, config.LLM_RETRY_BASE_DELAY * 2 ** retry))
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, config.LLM_RETRY_MAX_DELAY))
+                out_of_time = time.perf_counter() + delay >= ends_at - 1.0
+                if not retryable or retry >= config.LLM_MAX_RETRIES or out_of_time:
+                    self._count(operation, 'failures')
+                    metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome='error')
+                    raise
+                self._count(operation, 'retries')
+                metrics.LLM_RETRIES.inc(operation=operation)
+                print(f"⚠️  {operation} call failed ({type(e).__name__}: {e}), retry {retry + 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def _store(cache, key: str, request: Dict[str, Any], content: Optional[str], finish_reason: Optional[str], usage):
+    """Cache a complete reply (truncated or empty replies are not worth replaying)"""
+    if finish_reason != 'stop' or not content:
+        return
+    try:
+        cache.put(key, request, {
+            'content': content,
+            'finish_reason': finish_reason,
+            'usage': usage.model_dump() if hasattr(usage, 'model_dump') else None,
+        })
+    except OSError as e:
+        print(f"⚠️  Could not write LLM cache entry: {e}")
+
+
+def _cached_completion(cached: Dict[str, Any]):
+    """ChatCompletion look-alike for a cached reply (usage is None: it cost nothing)"""
+    message = types.SimpleNamespace(role='assistant', content=cached['content'], refusal=None)
+    choice = types.SimpleNamespace(index=0, message=message, finish_reason=cached.get('finish_reason', 'stop'))
+    return types.SimpleNamespace(choices=[choice], usage=None, cached=True)
+
+
+def _cached_chunks(cached: Dict[str, Any]) -> Iterator[Any]:
+    """ChatCompletionChunk look-alikes replaying a cached reply"""
+    delta = types.SimpleNamespace(role='assistant', content=cached['content'])
+    choice = types.SimpleNamespace(index=0, delta=delta, finish_reason=cached.get('finish_reason', 'stop'))
+    yield types.SimpleNamespace(choices=[choice], usage=None, cached=True)
+    yield types.SimpleNamespace(choices=[], usage=None, cached=True)
+
+
+def _recording_stream(stream, cache, key: str, request: Dict[str, Any]) -> Iterator[Any]:
+    """Pass chunks through and cache the reply once the stream completes"""
+    parts = []
+    finish_reason = None
+    usage = None
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None) or usage
+            if chunk.choices:
+                parts.append(chunk.choices[0].delta.content or '')
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+            yield chunk
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+    _store(cache, key, request, ''.join(parts), finish_reason, usage)
+
+
+def _classify(error: Exception):
+    """(retryable, retry_after_seconds) for an SDK or requests error"""
+    status = getattr(error, 'status_code', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+
+    retry_after = None
+    headers = getattr(response, 'headers', None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            pass
+
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500, retry_after
+
+    # No HTTP status: connection resets, DNS failures and timeouts are transient
+    name = type(error).__name__
+    transient = ('APIConnectionError', 'APITimeoutError', 'ConnectionError', 'Timeout',
+                 'ConnectTimeout', 'ReadTimeout', 'ChunkedEncodingError', 'RemoteDisconnected')
+    return name in transient, retry_after
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide LLM / image API client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
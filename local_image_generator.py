@@ -14,11 +14,16 @@ from diffusers import (
 from PIL import Image
 import time
 from typing import List, Dict, Any, Optional, Callable
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from datetime import datetime
 import os
 import config
 from prompt_enhancer import PromptEnhancer
+from model_manager import get_model_manager
+from batch_scheduler import get_batch_scheduler
+from image_writer import get_image_writer
+from cancellation import GenerationCancelled, raise_if_cancelled
+import metrics
 
 # Try to import Colab client (optional)
 try:
@@ -42,11 +47,21 @@ class LocalImageGenerator:
             lazy_load: If True, only load model on first generation (default from config)
         """
         self.progress_callback = progress_callback
-        self.pipe = None
         self.enhancer = PromptEnhancer()
         self.device = config.get_device()
         self.dtype = config.get_dtype()
-        self.ip_adapter_loaded = False
+
+        # The SDXL pipeline itself is process-wide: every generator instance
+        # (batch and streaming paths alike) shares one warm copy
+        self.model_manager = get_model_manager(loader=self._build_pipeline)
+
+        # Cross-request micro-batching in front of the pipeline (optional, CUDA only)
+        self.scheduler = None
+        if config.ENABLE_BATCH_SCHEDULER:
+            if self.device == "cuda":
+                self.scheduler = get_batch_scheduler(self.model_manager, self.device)
+            else:
+                print(f"⚠️  Batch scheduler needs CUDA, generating frames one at a time on {self.device}")
         
         # Colab client (if configured)
         self.colab_client = None
@@ -70,6 +85,16 @@ class LocalImageGenerator:
             else:
                 print("✓ Image generator initialized (model will load on first request)")
 
+    @property
+    def pipe(self):
+        """The shared SDXL pipeline (None until loaded)"""
+        return self.model_manager.pipe
+
+    @property
+    def ip_adapter_loaded(self) -> bool:
+        """Whether IP-Adapter weights are loaded into the shared pipeline"""
+        return self.model_manager.ip_adapter_loaded
+
     def _log_progress(self, message: str, step: int = 0, total: int = 100):
         """Log progress message and call callback if provided"""
         print(message)
@@ -82,13 +107,17 @@ class LocalImageGenerator:
             })
 
     def _load_model(self):
+        """Make sure the shared SDXL pipeline is resident and return it"""
+        return self.model_manager.ensure_loaded()
+
+    def _build_pipeline(self):
         """Load the Stable Diffusion XL model with optimizations"""
 
         self._log_progress("Loading Stable Diffusion XL model...", 0, 100)
 
         try:
             # Load SDXL pipeline with SPEED OPTIMIZATIONS
-            self.pipe = StableDiffusionXLPipeline.from_pretrained(
+            pipe = StableDiffusionXLPipeline.from_pretrained(
                 config.SDXL_MODEL_ID,
                 torch_dtype=self.dtype,
                 use_safetensors=True,
@@ -104,11 +133,11 @@ class LocalImageGenerator:
 
                 if scheduler_type == "euler_a":
                     # Euler Ancestral: Fast and high quality
-                    scheduler_config = self.pipe.scheduler.config
+                    scheduler_config = pipe.scheduler.config
                     if config.USE_KARRAS_SIGMAS:
                         scheduler_config.use_karras_sigmas = True
 
-                    self.pipe.scheduler = EulerAncestralDiscreteScheduler.from_config(
+                    pipe.scheduler = EulerAncestralDiscreteScheduler.from_config(
                         scheduler_config
                     )
                     self._log_progress("✓ Using Euler Ancestral scheduler (fast, high quality)", 25, 100)
@@ -116,17 +145,17 @@ class LocalImageGenerator:
                         self._log_progress("✓ Enabled Karras sigmas (better noise schedule)", 30, 100)
                 elif scheduler_type == "ddim":
                     # DDIM: Very fast, good quality
-                    self.pipe.scheduler = DDIMScheduler.from_config(
-                        self.pipe.scheduler.config
+                    pipe.scheduler = DDIMScheduler.from_config(
+                        pipe.scheduler.config
                     )
                     self._log_progress("✓ Using DDIM scheduler (very fast)", 25, 100)
                 else:
                     # Default: DPM-Solver++ (balanced)
-                    scheduler_config = self.pipe.scheduler.config
+                    scheduler_config = pipe.scheduler.config
                     if config.USE_KARRAS_SIGMAS:
                         scheduler_config.use_karras_sigmas = True
 
-                    self.pipe.scheduler = DPMSolverMultistepScheduler.from_config(
+                    pipe.scheduler = DPMSolverMultistepScheduler.from_config(
                         scheduler_config
                     )
                     self._log_progress("✓ Using DPM-Solver++ scheduler (balanced)", 25, 100)
@@ -134,28 +163,28 @@ class LocalImageGenerator:
                         self._log_progress("✓ Enabled Karras sigmas (better noise schedule)", 30, 100)
 
             # Move to device
-            self.pipe = self.pipe.to(self.device)
+            pipe = pipe.to(self.device)
             self._log_progress("✓ Moved model to MPS device", 40, 100)
 
             # Apply M1 optimizations
             if config.ENABLE_ATTENTION_SLICING:
-                self.pipe.enable_attention_slicing()
+                pipe.enable_attention_slicing()
                 self._log_progress("✓ Enabled attention slicing", 50, 100)
 
             if config.ENABLE_VAE_SLICING:
-                self.pipe.enable_vae_slicing()
+                pipe.enable_vae_slicing()
                 self._log_progress("✓ Enabled VAE slicing", 60, 100)
 
             if config.ENABLE_VAE_TILING:
-                self.pipe.enable_vae_tiling()
+                pipe.enable_vae_tiling()
                 self._log_progress("✓ Enabled VAE tiling", 70, 100)
 
             # 🚀 ULTRA FAST: Memory layout optimization for M1
             if hasattr(config, 'ENABLE_CHANNELS_LAST') and config.ENABLE_CHANNELS_LAST:
                 try:
                     # Convert UNet to channels_last memory format (faster on M1)
-                    if hasattr(self.pipe, 'unet'):
-                        self.pipe.unet = self.pipe.unet.to(memory_format=torch.channels_last)
+                    if hasattr(pipe, 'unet'):
+                        pipe.unet = pipe.unet.to(memory_format=torch.channels_last)
                         self._log_progress("✓ UNet channels_last enabled (M1 optimized)", 72, 100)
                 except Exception as e:
                     self._log_progress(f"⚠ Channels_last failed: {e}", 72, 100)
@@ -163,27 +192,27 @@ class LocalImageGenerator:
             # SPEED OPTIMIZATIONS
             if config.SKIP_SAFETY_CHECKER:
                 # Disable safety checker for faster generation
-                self.pipe.safety_checker = None
+                pipe.safety_checker = None
                 self._log_progress("✓ Safety checker disabled (faster generation)", 75, 100)
 
             # 🚀 ULTRA FAST: Enable CPU offload to save MPS memory
             if config.ENABLE_MODEL_CPU_OFFLOAD:
                 try:
-                    self.pipe.enable_model_cpu_offload()
+                    pipe.enable_model_cpu_offload()
                     self._log_progress("✓ CPU offload enabled (saves ~3GB MPS memory)", 77, 100)
                 except Exception as e:
                     self._log_progress(f"⚠ CPU offload failed: {e}", 77, 100)
 
             # Optimize for speed
-            if hasattr(self.pipe, 'set_progress_bar_config'):
-                self.pipe.set_progress_bar_config(disable=True)  # No progress bar overhead
+            if hasattr(pipe, 'set_progress_bar_config'):
+                pipe.set_progress_bar_config(disable=True)  # No progress bar overhead
 
             # Torch compile for M1 speed boost (PyTorch 2.0+)
             # Note: Currently disabled as torch.compile is not stable on MPS
             if config.ENABLE_TORCH_COMPILE and hasattr(torch, 'compile'):
                 try:
                     self._log_progress("Compiling model with torch.compile...", 75, 100)
-                    self.pipe.unet = torch.compile(self.pipe.unet, mode="reduce-overhead", backend="aot_eager")
+                    pipe.unet = torch.compile(pipe.unet, mode="reduce-overhead", backend="aot_eager")
                     self._log_progress("✓ Model compiled (15-25% faster generation)", 80, 100)
                 except Exception as e:
                     self._log_progress(f"⚠️  Torch compile not available: {e}", 80, 100)
@@ -191,7 +220,8 @@ class LocalImageGenerator:
             # Check if LoRA exists and load it
             if config.LORA_PATH.exists():
                 try:
-                    self.pipe.load_lora_weights(str(config.LORA_PATH))
+                    pipe.load_lora_weights(str(config.LORA_PATH))
+                    self.model_manager.lora_loaded = True
                     self._log_progress(f"✓ Loaded Aldar Köse LoRA (character consistency enabled)", 90, 100)
                 except Exception as e:
                     self._log_progress(f"⚠️  LoRA loading failed: {e}", 90, 100)
@@ -200,6 +230,7 @@ class LocalImageGenerator:
                 self._log_progress("ℹ️  Using base SDXL (LoRA optional, not found)", 90, 100)
 
             self._log_progress("✓ SDXL model loaded successfully!", 100, 100)
+            return pipe
 
         except Exception as e:
             error_msg = f"Failed to load SDXL model: {e}"
@@ -222,7 +253,7 @@ class LocalImageGenerator:
             ]:
                 try:
                     self.pipe.load_ip_adapter(**kwargs)
-                    self.ip_adapter_loaded = True
+                    self.model_manager.ip_adapter_loaded = True
                     self._log_progress("✓ IP-Adapter loaded", 1, 1)
                     break
                 except Exception as e:
@@ -240,7 +271,9 @@ class LocalImageGenerator:
         guidance_scale: float = None,
         seed: Optional[int] = None,
         ref_image: Optional["Image.Image"] = None,
-        ip_adapter_scale: Optional[float] = None
+        ip_adapter_scale: Optional[float] = None,
+        step_callback: Optional[Callable] = None,
+        cancel_token=None
     ) -> Image.Image:
         """
         Generate a single image from a prompt
@@ -253,33 +286,52 @@ class LocalImageGenerator:
             seed: Random seed for reproducibility
             ref_image: Optional reference image for IP-Adapter
             ip_adapter_scale: IP-Adapter strength (0.0-1.0)
+            step_callback: Optional (step, total_steps, latents, batch_index) hook, e.g. live previews
+            cancel_token: Optional CancelToken; checked on every denoising step
 
         Returns:
             PIL Image
+
+        Raises:
+            GenerationCancelled: If the token is cancelled before or during denoising
         """
-        
+        raise_if_cancelled(cancel_token)
+
         # Try Colab first if available
         if self.colab_client and self.colab_client.is_available():
             try:
-                return self.colab_client.generate_single(
+                image = self.colab_client.generate_single(
                     prompt=prompt,
                     negative_prompt=negative_prompt or config.NEGATIVE_PROMPT,
                     ref_image=ref_image,
                     ip_adapter_scale=ip_adapter_scale
                 )
+                metrics.FRAMES_GENERATED.inc(backend='colab')
+                return image
             except Exception as e:
                 print(f"⚠️  Colab generation failed: {e}")
                 print("   Falling back to local generation...")
 
-        # Lazy load model if not already loaded
-        if self.pipe is None:
-            print("Loading model for first generation...")
-            self._load_model()
-
         # Use config defaults if not specified
         num_inference_steps = num_inference_steps or config.NUM_INFERENCE_STEPS
         guidance_scale = guidance_scale or config.GUIDANCE_SCALE
         negative_prompt = negative_prompt or config.NEGATIVE_PROMPT
+        if seed is None:
+            seed = config.GENERATION_SEED
+
+        # Plain text-to-image frames go through the micro-batching scheduler,
+        # which groups them with frames from other storyboards
+        if self.scheduler is not None and ref_image is None:
+            future = self.scheduler.submit(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                num_inference_steps=num_inference_steps,
+                guidance_scale=guidance_scale,
+                seed=seed,
+                step_callback=step_callback,
+                cancel_token=cancel_token
+            )
+            return self._await_frame(future, cancel_token)
 
         # Set seed for reproducibility
         if seed is not None:
@@ -294,14 +346,24 @@ class LocalImageGenerator:
         import time
         start_time = time.time()
         print(f"🎨 Starting generation ({num_inference_steps} steps, {config.IMAGE_WIDTH}x{config.IMAGE_HEIGHT})...")
-
-        with torch.no_grad():
+        timer = metrics.DenoiseTimer(batch_size=1)
+
+        def on_step(step, timestep, latents):
+            timer.step()
+            if step % 2 == 0:
+                print(f"  Step {step+1}/{num_inference_steps}...", end='\r')
+            # Raising here aborts the denoising loop within one step
+            raise_if_cancelled(cancel_token)
+            if step_callback is not None:
+                step_callback(step, num_inference_steps, latents, 0)
+
+        with self.model_manager.acquire() as pipe, torch.no_grad():
             if ref_image is not None:
                 # Ensure IP-Adapter is ready
                 self._ensure_ip_adapter()
                 scale = ip_adapter_scale if ip_adapter_scale is not None else getattr(config, "IP_ADAPTER_SCALE", 0.6)
                 try:
-                    result = self.pipe(
+                    result = pipe(
                         prompt=prompt,
                         negative_prompt=negative_prompt,
                         num_inference_steps=num_inference_steps,
@@ -311,12 +373,13 @@ class LocalImageGenerator:
                         width=config.IMAGE_WIDTH,
                         image=ref_image,
                         ip_adapter_scale=scale,
-                        callback=lambda step, timestep, latents: print(f"  Step {step+1}/{num_inference_steps}...", end='\r') if step % 2 == 0 else None,
+                        callback=on_step,
                         callback_steps=1,
                     )
                 except TypeError:
-                    # Fallback if older diffusers signature; omit ip_adapter_scale
-                    result = self.pipe(
+                    # Fallback if older diffusers signature; omit ip_adapter_scale but keep
+                    # the step callback so previews and cancellation still work
+                    result = pipe(
                         prompt=prompt,
                         negative_prompt=negative_prompt,
                         num_inference_steps=num_inference_steps,
@@ -325,9 +388,11 @@ class LocalImageGenerator:
                         height=config.IMAGE_HEIGHT,
                         width=config.IMAGE_WIDTH,
                         image=ref_image,
+                        callback=on_step,
+                        callback_steps=1,
                     )
             else:
-                result = self.pipe(
+                result = pipe(
                     prompt=prompt,
                     negative_prompt=negative_prompt,
                     num_inference_steps=num_inference_steps,
@@ -335,11 +400,13 @@ class LocalImageGenerator:
                     generator=generator,
                     height=config.IMAGE_HEIGHT,
                     width=config.IMAGE_WIDTH,
-                    callback=lambda step, timestep, latents: print(f"  Step {step+1}/{num_inference_steps}...", end='\r') if step % 2 == 0 else None,
+                    callback=on_step,
                     callback_steps=1,
                 )
+            timer.finish()
 
         image = result.images[0]
+        metrics.FRAMES_GENERATED.inc(backend='sdxl')
 
         # 🚀 CODE OPTIMIZATION: Show generation time
         elapsed = time.time() - start_time
@@ -354,6 +421,48 @@ class LocalImageGenerator:
 
         return image
 
+    def warmup(self) -> float:
+        """
+        Load the pipeline and run one tiny generation so the first real
+        request doesn't pay for lazy initialization (kernel selection,
+        allocator growth, LoRA fusing); then load IP-Adapter if identity lock is on
+
+        Returns:
+            Seconds the warmup took
+        """
+        start_time = time.time()
+        self._load_model()
+
+        size = config.WARMUP_IMAGE_SIZE
+        with self.model_manager.acquire() as pipe, torch.no_grad():
+            result = pipe(
+                prompt="Aldar Kose on the Kazakh steppe",
+                negative_prompt=config.NEGATIVE_PROMPT,
+                num_inference_steps=config.WARMUP_STEPS,
+                guidance_scale=config.GUIDANCE_SCALE,
+                height=size,
+                width=size,
+            )
+            del result
+
+        if config.USE_IDENTITY_LOCK:
+            self._ensure_ip_adapter()
+
+        self.model_manager.warmed = True
+        return time.time() - start_time
+
+    def _await_frame(self, future, cancel_token=None) -> Image.Image:
+        """Wait for a scheduler future, giving up as soon as the token is cancelled"""
+        while True:
+            if cancel_token is not None and cancel_token.cancelled:
+                # Frames still pending are simply dropped by the dispatcher
+                future.cancel()
+                raise GenerationCancelled(cancel_token.reason or 'cancelled')
+            try:
+                return future.result(timeout=0.25)
+            except FutureTimeoutError:
+                continue
+
     def generate_parallel(
         self,
         prompts: List[str],
@@ -372,11 +481,6 @@ class LocalImageGenerator:
             List of PIL Images
         """
 
-        # Lazy load model if not already loaded
-        if self.pipe is None:
-            print("Loading model for first generation...")
-            self._load_model()
-
         batch_size = batch_size or config.PARALLEL_BATCH_SIZE
         num_prompts = len(prompts)
 
@@ -398,8 +502,8 @@ class LocalImageGenerator:
                 num_prompts
             )
 
-            # Generate batch
-            with torch.no_grad():
+            # Generate batch (keep the shared pipeline resident between frames)
+            with self.model_manager.hold(), torch.no_grad():
                 # For M1, process one at a time in the batch to avoid memory issues
                 batch_images = []
                 for prompt, neg_prompt in zip(batch_prompts, batch_negatives):
@@ -415,7 +519,9 @@ class LocalImageGenerator:
     def generate_from_frames(
         self,
         frames: List[Dict[str, Any]],
-        save_dir: Optional[Path] = None
+        save_dir: Optional[Path] = None,
+        cancel_token=None,
+        timeline=None
     ) -> List[Dict[str, Any]]:
         """
         Generate images for storyboard frames
@@ -423,6 +529,8 @@ class LocalImageGenerator:
         Args:
             frames: List of frame dictionaries from GPT-4
             save_dir: Optional directory to save images
+            cancel_token: Optional CancelToken; remaining frames are dropped once cancelled
+            timeline: Optional RequestTimeline receiving per-frame diffusion and save times
 
         Returns:
             List of frames with added 'image' and 'image_path' keys
@@ -432,7 +540,10 @@ class LocalImageGenerator:
         self._log_progress(f"Starting generation for {total_frames} frames...", 0, total_frames)
 
         # Enhance prompts
+        enhance_start = time.time()
         enhanced_prompts = self.enhancer.enhance_batch(frames)
+        if timeline is not None:
+            timeline.record_stage('prompt_enhancement', enhance_start, frames=total_frames)
 
         # Extract positive and negative prompts
         positive_prompts = [p['positive'] for p in enhanced_prompts]
@@ -442,58 +553,86 @@ class LocalImageGenerator:
         start_time = time.time()
         images = []
 
+        # Frames are encoded and saved on the writer pool while the next one renders
+        writer = get_image_writer()
+        save_dir = save_dir or config.OUTPUT_DIR
+        saves = []
+
         # Generate images one by one with progress tracking
-        for idx, (pos_prompt, neg_prompt) in enumerate(zip(positive_prompts, negative_prompts)):
-            frame_start = time.time()
-
-            # Log progress with ETA
-            if idx > 0:
-                elapsed = time.time() - start_time
-                avg_time_per_frame = elapsed / idx
-                remaining_frames = total_frames - idx
-                eta_seconds = avg_time_per_frame * remaining_frames
-                eta_str = f"{int(eta_seconds // 60)}m {int(eta_seconds % 60)}s"
-                self._log_progress(
-                    f"Generating frame {idx + 1}/{total_frames} (ETA: {eta_str})...",
-                    idx,
-                    total_frames
-                )
-            else:
+        # (hold keeps the shared pipeline resident between frames)
+        with self.model_manager.hold():
+            # With the scheduler, queue every frame up front so they can share batches
+            pending = None
+            if self.scheduler is not None and not self.colab_client:
+                pending = [
+                    self.scheduler.submit(
+                        prompt=pos_prompt,
+                        negative_prompt=neg_prompt,
+                        num_inference_steps=config.NUM_INFERENCE_STEPS,
+                        guidance_scale=config.GUIDANCE_SCALE,
+                        cancel_token=cancel_token
+                    )
+                    for pos_prompt, neg_prompt in zip(positive_prompts, negative_prompts)
+                ]
+
+            for idx, (pos_prompt, neg_prompt) in enumerate(zip(positive_prompts, negative_prompts)):
+                frame_start = time.time()
+
+                # Log progress with ETA
+                if idx > 0:
+                    elapsed = time.time() - start_time
+                    avg_time_per_frame = elapsed / idx
+                    remaining_frames = total_frames - idx
+                    eta_seconds = avg_time_per_frame * remaining_frames
+                    eta_str = f"{int(eta_seconds // 60)}m {int(eta_seconds % 60)}s"
+                    self._log_progress(
+                        f"Generating frame {idx + 1}/{total_frames} (ETA: {eta_str})...",
+                        idx,
+                        total_frames
+                    )
+                else:
+                    self._log_progress(
+                        f"Generating frame {idx + 1}/{total_frames}...",
+                        idx,
+                        total_frames
+                    )
+
+                # Generate single image (or collect it from the scheduler)
+                try:
+                    if pending is not None:
+                        image = self._await_frame(pending[idx], cancel_token)
+                    else:
+                        image = self.generate_single(pos_prompt, neg_prompt, cancel_token=cancel_token)
+                except GenerationCancelled:
+                    if pending is not None:
+                        for future in pending[idx + 1:]:
+                            future.cancel()
+                    raise
+                images.append(image)
+                frame_time = time.time() - frame_start
+                if timeline is not None:
+                    # With the scheduler this includes waiting for a batch slot
+                    timeline.record_diffusion(idx, frame_time, config.NUM_INFERENCE_STEPS)
+
+                saves.append(writer.submit(image, f'frame_{idx + 1:03d}', output_dir=save_dir))
+
+                # Log frame completion time
                 self._log_progress(
-                    f"Generating frame {idx + 1}/{total_frames}...",
-                    idx,
+                    f"✓ Frame {idx + 1} complete ({frame_time:.1f}s)",
+                    idx + 1,
                     total_frames
                 )
 
-            # Generate single image
-            image = self.generate_single(pos_prompt, neg_prompt)
-            images.append(image)
-
-            # Log frame completion time
-            frame_time = time.time() - frame_start
-            self._log_progress(
-                f"✓ Frame {idx + 1} complete ({frame_time:.1f}s)",
-                idx + 1,
-                total_frames
-            )
-
-        # Save images and update frames
-        save_dir = save_dir or config.OUTPUT_DIR
-        save_dir.mkdir(exist_ok=True, parents=True)
-
-        for idx, (frame, image) in enumerate(zip(frames, images)):
-            # Generate filename
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'frame_{idx + 1:03d}_{timestamp}.png'
-            filepath = save_dir / filename
+        # Wait for the saves to be durable and update frames
+        for idx, (frame, image, pending_save) in enumerate(zip(frames, images, saves)):
+            saved = pending_save.result()
+            if timeline is not None:
+                timeline.record_save(idx, saved)
 
-            # Save image
-            image.save(filepath, 'PNG', optimize=True)
-
-            # Update frame with image info
+            # Update frame with image info (original plus thumb/preview/print variants)
             frame['image'] = image
-            frame['image_path'] = filepath
-            frame['image_url'] = f'/static/generated/{filename}'
+            saved.wait_variants()
+            saved.apply_to(frame)
             frame['prompt_used'] = positive_prompts[idx]
 
         total_time = time.time() - start_time
@@ -509,7 +648,8 @@ class LocalImageGenerator:
     def regenerate_frame(
         self,
         frame: Dict[str, Any],
-        variation_type: str = 'angle'
+        variation_type: str = 'angle',
+        **generate_kwargs
     ) -> Image.Image:
         """
         Regenerate a single frame with variations
@@ -517,6 +657,7 @@ class LocalImageGenerator:
         Args:
             frame: Frame dictionary
             variation_type: Type of variation to apply
+            **generate_kwargs: Passed to generate_single (e.g. ref_image, cancel_token)
 
         Returns:
             New PIL Image
@@ -530,19 +671,12 @@ class LocalImageGenerator:
         import random
         seed = random.randint(0, 2**32 - 1)
 
-        return self.generate_single(varied_prompt, negative_prompt, seed=seed)
+        return self.generate_single(varied_prompt, negative_prompt, seed=seed, **generate_kwargs)
 
     def cleanup(self):
         """Clean up resources and free memory"""
-        if self.pipe is not None:
-            del self.pipe
-            self.pipe = None
-
-        # Clear CUDA/MPS cache
-        if torch.backends.mps.is_available():
-            torch.mps.empty_cache()
-        elif torch.cuda.is_available():
-            torch.cuda.empty_cache()
+        # Unloads the shared pipeline and clears the CUDA/MPS cache
+        self.model_manager.unload(reason='manual')
 
         self._log_progress("✓ Cleaned up resources", 100, 100)
 
@@ -0,0 +1,303 @@
+"""
+Prometheus Metrics
+A small in-process registry (counters, gauges, histograms) rendered in the
+Prometheus text exposition format at /metrics, so stage latencies, queue depth
+and memory can be scraped without extra dependencies
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Callable, Sequence, Tuple
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Bucket upper bounds in seconds
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+STEP_BUCKETS = (0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+JOB_BUCKETS = (1, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600, 900)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    """Base class: a named metric with optional labels"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values = {(): 0}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; can be read from a callback at scrape time"""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Optional[float]]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], Optional[float]]):
+        """Sample the gauge by calling function() on every scrape (None = no sample)"""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception as e:
+                print(f"⚠️  Metric {self.name} failed: {e}")
+                value = None
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, (('le', _format_value(float(bound))),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float],
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# ----- Stage latencies -----
+STORY_CREATION_SECONDS = REGISTRY.histogram(
+    'storyboard_story_creation_seconds', 'LLM round trip turning the user prompt into an Aldar Köse story',
+    LLM_BUCKETS)
+FRAME_PLANNING_SECONDS = REGISTRY.histogram(
+    'storyboard_frame_planning_seconds', 'LLM round trip planning the storyboard frames (incl. JSON parsing)',
+    LLM_BUCKETS)
+PLANNING_SECONDS = REGISTRY.histogram(
+    'storyboard_planning_seconds', 'Story + frame planning LLM time, by planning mode (two_step or single_call)',
+    LLM_BUCKETS, labelnames=('mode',))
+PROMPT_ENHANCEMENT_SECONDS = REGISTRY.histogram(
+    'storyboard_prompt_enhancement_seconds', 'Turning one frame into an SDXL prompt',
+    FAST_BUCKETS)
+UNET_STEP_SECONDS = REGISTRY.histogram(
+    'storyboard_unet_step_seconds', 'Wall time of one denoising step (UNet + scheduler) per pipe() call',
+    STEP_BUCKETS, labelnames=('batch_size',))
+VAE_DECODE_SECONDS = REGISTRY.histogram(
+    'storyboard_vae_decode_seconds', 'Time from the last denoising step until pipe() returns (VAE decode + postprocess)',
+    STAGE_BUCKETS, labelnames=('batch_size',))
+IMAGE_ENCODE_SECONDS = REGISTRY.histogram(
+    'storyboard_image_encode_seconds', 'Encoding one image (PNG/WebP/JPEG) on the writer pool',
+    FAST_BUCKETS, labelnames=('format', 'variant'))
+QUALITY_VALIDATION_SECONDS = REGISTRY.histogram(
+    'storyboard_quality_validation_seconds', 'Quality validation of one frame',
+    STAGE_BUCKETS)
+PDF_EXPORT_SECONDS = REGISTRY.histogram(
+    'storyboard_pdf_export_seconds', 'Rendering and storing one PDF export',
+    STAGE_BUCKETS)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    'storyboard_llm_request_seconds', 'OpenAI/HTTP call including retries, by operation and outcome',
+    LLM_BUCKETS, labelnames=('operation', 'outcome'))
+IMAGE_API_RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    'storyboard_image_api_rate_limit_wait_seconds', 'Time an image API call waited for a rate-limit token',
+    STAGE_BUCKETS)
+JOB_WAIT_SECONDS = REGISTRY.histogram(
+    'storyboard_job_wait_seconds', 'Time a job spent queued before a worker picked it up',
+    JOB_BUCKETS)
+JOB_DURATION_SECONDS = REGISTRY.histogram(
+    'storyboard_job_duration_seconds', 'Run time of a job on the worker',
+    JOB_BUCKETS, labelnames=('mode', 'status'))
+
+# ----- Counts -----
+FRAME_REGENERATIONS = REGISTRY.counter(
+    'storyboard_frame_regenerations_total', 'Frames regenerated after failing quality validation')
+FRAMES_GENERATED = REGISTRY.counter(
+    'storyboard_frames_generated_total', 'Frames generated, by backend', labelnames=('backend',))
+LLM_RETRIES = REGISTRY.counter(
+    'storyboard_llm_retries_total', 'Retried OpenAI/HTTP attempts, by operation', labelnames=('operation',))
+LLM_CACHE_REQUESTS = REGISTRY.counter(
+    'storyboard_llm_cache_requests_total', 'LLM cache lookups, by operation and result (hit/miss)',
+    labelnames=('operation', 'result'))
+JOBS_FINISHED = REGISTRY.counter(
+    'storyboard_jobs_finished_total', 'Jobs finished, by final status', labelnames=('status',))
+
+# ----- Gauges (sampled at scrape time, see app.py) -----
+QUEUE_DEPTH = REGISTRY.gauge('storyboard_queue_depth', 'Jobs waiting for a worker')
+ACTIVE_JOBS = REGISTRY.gauge('storyboard_active_jobs', 'Jobs currently running')
+MODEL_LOADED = REGISTRY.gauge('storyboard_model_loaded', '1 while the SDXL pipeline is resident')
+HOST_MEMORY_BYTES = REGISTRY.gauge('storyboard_host_memory_rss_bytes', 'Resident set size of the server process')
+ACCELERATOR_MEMORY_BYTES = REGISTRY.gauge(
+    'storyboard_accelerator_memory_allocated_bytes', 'Memory allocated on the GPU/MPS device')
+
+
+class DenoiseTimer:
+    """
+    Turns diffusers step callbacks into per-step UNet and VAE decode observations
+
+    Call step() from the step callback and finish() once pipe() returns. The
+    first step is not observed (it also covers prompt encoding); the time
+    after the last step is attributed to the VAE decode.
+    """
+
+    def __init__(self, batch_size: int = 1):
+        self.batch_size = str(batch_size)
+        self._last: Optional[float] = None
+
+    def step(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            UNET_STEP_SECONDS.observe(now - self._last, batch_size=self.batch_size)
+        self._last = now
+
+    def finish(self):
+        if self._last is not None:
+            VAE_DECODE_SECONDS.observe(time.perf_counter() - self._last, batch_size=self.batch_size)
+
+
+def render() -> str:
+    """The /metrics response body"""
+    return REGISTRY.render()
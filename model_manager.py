@@ -0,0 +1,269 @@
+"""
+Model Manager - Warm, shared SDXL pipeline residency
+Owns the single process-wide StableDiffusionXLPipeline, hands it out to every
+generation path and unloads it after CACHE_TIMEOUT seconds without use
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Iterator
+
+import config
+
+
+def host_rss_bytes() -> Optional[int]:
+    """Resident set size of this process in bytes (None if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except Exception:
+        return None
+
+
+def accelerator_memory_bytes() -> Optional[int]:
+    """Memory currently allocated on the GPU/MPS device (None if unknown)"""
+    # Reporting memory must not be what pulls torch into the web tier
+    if 'torch' not in sys.modules:
+        return None
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return int(torch.cuda.memory_allocated())
+        if torch.backends.mps.is_available() and hasattr(torch.mps, 'current_allocated_memory'):
+            return int(torch.mps.current_allocated_memory())
+    except Exception:
+        pass
+    return None
+
+
+def _empty_accelerator_cache():
+    """Release cached allocator blocks back to the device"""
+    try:
+        import torch
+        if torch.backends.mps.is_available():
+            torch.mps.empty_cache()
+        elif torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+class ModelManager:
+    """
+    Keeps one SDXL pipeline resident and serializes access to it
+
+    - acquire(): load on demand, lock the pipeline for one pipe() call
+    - hold(): keep the pipeline resident across several calls without locking it
+    - an idle watcher unloads the pipeline after idle_timeout seconds
+    """
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[], Any]] = None,
+        caching: bool = None,
+        idle_timeout: float = None
+    ):
+        """
+        Initialize the model manager
+
+        Args:
+            loader: Zero-argument function returning a ready pipeline
+            caching: Keep the pipeline warm between requests (default from config)
+            idle_timeout: Seconds of inactivity before unloading (default from config)
+        """
+        self.loader = loader
+        self.caching = caching if caching is not None else config.ENABLE_MODEL_CACHING
+        self.idle_timeout = idle_timeout if idle_timeout is not None else config.CACHE_TIMEOUT
+
+        self.pipe = None
+        self.ip_adapter_loaded = False
+        # Set by the loader / LocalImageGenerator.warmup(); cleared whenever the pipeline goes away
+        self.lora_loaded = False
+        self.warmed = False
+        self.last_load_seconds: Optional[float] = None
+
+        self._pipe_lock = threading.RLock()
+        self._state_lock = threading.Lock()
+        self._holds = 0
+        self._last_used = time.time()
+        self._loaded_at: Optional[float] = None
+        self._load_count = 0
+        self._events = deque(maxlen=50)
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """True while a pipeline is resident"""
+        return self.pipe is not None
+
+    def set_loader(self, loader: Callable[[], Any]):
+        """Register the pipeline loader if none is set yet"""
+        if self.loader is None:
+            self.loader = loader
+
+    def ensure_loaded(self):
+        """Load the pipeline if it is not resident and return it"""
+        with self._pipe_lock:
+            if self.pipe is None:
+                if self.loader is None:
+                    raise RuntimeError("ModelManager has no pipeline loader configured")
+                start = time.time()
+                self.lora_loaded = False
+                self.warmed = False
+                self.pipe = self.loader()
+                duration = time.time() - start
+                self._loaded_at = time.time()
+                self._load_count += 1
+                self.ip_adapter_loaded = False
+                self.last_load_seconds = duration
+                self._record('load', duration=duration)
+                print(f"✓ Model resident (load #{self._load_count} took {duration:.1f}s)")
+                self._start_watcher()
+            self._touch()
+            return self.pipe
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """
+        Exclusive access to the warm pipeline for one generation
+
+        Usage:
+            with manager.acquire() as pipe:
+                result = pipe(prompt=...)
+        """
+        with self.hold():
+            with self._pipe_lock:
+                pipe = self.ensure_loaded()
+                try:
+                    yield pipe
+                finally:
+                    self._touch()
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Keep the pipeline resident (not locked) for the duration of the block"""
+        with self._state_lock:
+            self._holds += 1
+        try:
+            yield
+        finally:
+            with self._state_lock:
+                self._holds -= 1
+                release = self._holds == 0
+            self._touch()
+            if release and not self.caching:
+                self.unload(reason='caching disabled')
+
+    def unload(self, reason: str = 'manual') -> bool:
+        """
+        Drop the pipeline and free accelerator memory
+
+        Returns:
+            True if a pipeline was unloaded
+        """
+        with self._pipe_lock:
+            if self.pipe is None:
+                return False
+            with self._state_lock:
+                if self._holds > 0 and reason != 'manual':
+                    return False
+            resident_for = time.time() - (self._loaded_at or time.time())
+            self.pipe = None
+            self.ip_adapter_loaded = False
+            self.lora_loaded = False
+            self.warmed = False
+            self._loaded_at = None
+            gc.collect()
+            _empty_accelerator_cache()
+            self._record('unload', reason=reason, resident_seconds=round(resident_for, 1))
+            print(f"✓ Model unloaded ({reason}, resident for {resident_for:.0f}s)")
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Residency state, memory usage and recent load/unload events"""
+        idle_for = time.time() - self._last_used
+        return {
+            'loaded': self.is_loaded,
+            'warmed': self.warmed,
+            'lora_loaded': self.lora_loaded,
+            'ip_adapter_loaded': self.ip_adapter_loaded,
+            'last_load_seconds': round(self.last_load_seconds, 1) if self.last_load_seconds else None,
+            'caching': self.caching,
+            'idle_timeout': self.idle_timeout,
+            'idle_seconds': round(idle_for, 1),
+            'active_holds': self._holds,
+            'load_count': self._load_count,
+            'loaded_at': datetime.fromtimestamp(self._loaded_at).isoformat() if self._loaded_at else None,
+            'host_rss_bytes': host_rss_bytes(),
+            'accelerator_allocated_bytes': accelerator_memory_bytes(),
+            'events': list(self._events),
+        }
+
+    def _touch(self):
+        self._last_used = time.time()
+
+    def _record(self, event: str, **details):
+        self._events.append({
+            'event': event,
+            'at': datetime.now().isoformat(),
+            'host_rss_bytes': host_rss_bytes(),
+            **details
+        })
+
+    def _start_watcher(self):
+        """Start the idle-eviction thread once"""
+        if self._watcher is not None or not self.caching or self.idle_timeout <= 0:
+            return
+        self._watcher = threading.Thread(target=self._watch_idle, name="model-idle-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch_idle(self):
+        """Unload the pipeline once it has been idle for idle_timeout seconds"""
+        interval = max(1.0, min(60.0, self.idle_timeout / 4))
+        while True:
+            time.sleep(interval)
+            if self.pipe is None or self._holds > 0:
+                continue
+            if time.time() - self._last_used < self.idle_timeout:
+                continue
+            # Never block a running generation; try again on the next tick
+            if self._pipe_lock.acquire(blocking=False):
+                try:
+                    if time.time() - self._last_used >= self.idle_timeout:
+                        self.unload(reason=f'idle for {self.idle_timeout}s')
+                finally:
+                    self._pipe_lock.release()
+
+
+_manager: Optional[ModelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager(loader: Optional[Callable[[], Any]] = None) -> ModelManager:
+    """
+    Process-wide model manager
+
+    Args:
+        loader: Pipeline loader to register if the manager has none yet
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ModelManager(loader=loader)
+        elif loader is not None:
+            _manager.set_loader(loader)
+        return _manager
@@ -4,19 +4,34 @@ Transforms GPT-4 frame descriptions into optimized SDXL prompts with character c
 """
 
 import json
+import threading
+import time
 from pathlib import Path
 from typing import Dict, Any
 import config
-
-# Import CLIP tokenizer for accurate token counting
-try:
-    from transformers import CLIPTokenizer
-    TOKENIZER = CLIPTokenizer.from_pretrained("openai/clip-vit-large-patch14")
-    TOKENIZER_AVAILABLE = True
-except Exception as e:
-    print(f"Warning: CLIP tokenizer not available: {e}")
-    TOKENIZER = None
-    TOKENIZER_AVAILABLE = False
+import metrics
+from scene_rules import get_scene_rules
+
+# CLIP tokenizer for accurate token counting, loaded on first use
+# (importing transformers and fetching the tokenizer costs seconds at startup)
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """Return the shared CLIP tokenizer, or None if it can't be loaded"""
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            try:
+                from transformers import CLIPTokenizer
+                _tokenizer = CLIPTokenizer.from_pretrained("openai/clip-vit-large-patch14")
+            except Exception as e:
+                print(f"Warning: CLIP tokenizer not available: {e}")
+                _tokenizer = None
+            _tokenizer_loaded = True
+        return _tokenizer
 
 
 class PromptEnhancer:
@@ -65,8 +80,9 @@ class PromptEnhancer:
         Returns:
             Number of tokens
         """
-        if TOKENIZER_AVAILABLE and TOKENIZER is not None:
-            tokens = TOKENIZER.encode(text, add_special_tokens=False)
+        tokenizer = get_tokenizer()
+        if tokenizer is not None:
+            tokens = tokenizer.encode(text, add_special_tokens=False)
             return len(tokens)
         else:
             # Fallback: rough estimate (1 token ≈ 4 characters)
@@ -86,13 +102,14 @@ class PromptEnhancer:
         if max_tokens is None:
             max_tokens = self.MAX_TOKENS
 
-        if not TOKENIZER_AVAILABLE or TOKENIZER is None:
+        tokenizer = get_tokenizer()
+        if tokenizer is None:
             # Fallback: character-based truncation
             max_chars = max_tokens * 4
             return text[:max_chars]
 
         # Tokenize the text
-        tokens = TOKENIZER.encode(text, add_special_tokens=False)
+        tokens = tokenizer.encode(text, add_special_tokens=False)
 
         # If already within limit, return as is
         if len(tokens) <= max_tokens:
@@ -100,7 +117,7 @@ class PromptEnhancer:
 
         # Truncate tokens and decode back
         truncated_tokens = tokens[:max_tokens]
-        truncated_text = TOKENIZER.decode(truncated_tokens)
+        truncated_text = tokenizer.decode(truncated_tokens)
 
         return truncated_text
 
@@ -136,6 +153,7 @@ class PromptEnhancer:
         Returns:
             Enhanced prompt string optimized for SDXL (under 75 tokens)
         """
+        start = time.perf_counter()
 
         # Extract frame details
         description = frame.get('description', '')
@@ -223,6 +241,7 @@ class PromptEnhancer:
             enhanced_prompt = self._clean_prompt(enhanced_prompt)
             print(f"✓ Truncated prompt: {enhanced_prompt}")
 
+        metrics.PROMPT_ENHANCEMENT_SECONDS.observe(time.perf_counter() - start)
         return enhanced_prompt
 
     def _is_non_english(self, text: str) -> bool:
@@ -250,38 +269,8 @@ class PromptEnhancer:
         Returns:
             Simple English visual description
         """
-        # Common Kazakh story elements mapped to English
-        keywords = {
-            'жәрмеңке': 'marketplace',
-            'базар': 'market',
-            'ауыл': 'village',
-            'дала': 'steppe',
-            'шапан': 'robe',
-            'тымақ': 'hat',
-            'бай': 'rich man',
-            'қой': 'sheep',
-            'ат': 'horse',
-            'киіз үй': 'yurt',
-            'көше': 'street',
-            'адам': 'person',
-            'адамдар': 'people',
-        }
-
-        # Extract English keywords from description
-        english_parts = []
-        description_lower = description.lower()
-
-        for kazakh, english in keywords.items():
-            if kazakh in description_lower:
-                english_parts.append(english)
-
-        # If we found keywords, use them
-        if english_parts:
-            # Limit to first 3 keywords to stay under token limit
-            return ", ".join(english_parts[:3])
-
-        # Fallback: generic scene
-        return "Kazakh folk scene"
+        # Kazakh terms mapped to English in models/scene_rules.json ("translations")
+        return get_scene_rules().translate(description)
 
     def _simplify_description(self, description: str) -> str:
         """
@@ -465,39 +454,8 @@ class PromptEnhancer:
             Dictionary with categorized elements
         """
 
-        # Simple keyword extraction (can be enhanced with NLP)
-        elements = {
-            'characters': [],
-            'objects': [],
-            'locations': [],
-            'actions': []
-        }
-
-        # Character keywords
-        character_keywords = ['aldar', 'köse', 'merchant', 'villager', 'person', 'people', 'character']
-        for keyword in character_keywords:
-            if keyword.lower() in description.lower():
-                elements['characters'].append(keyword)
-
-        # Object keywords
-        object_keywords = ['yurt', 'horse', 'dombra', 'bread', 'tea', 'carpet', 'hat', 'robe']
-        for keyword in object_keywords:
-            if keyword.lower() in description.lower():
-                elements['objects'].append(keyword)
-
-        # Location keywords
-        location_keywords = ['steppe', 'village', 'marketplace', 'bazaar', 'road', 'path', 'yurt']
-        for keyword in location_keywords:
-            if keyword.lower() in description.lower():
-                elements['locations'].append(keyword)
-
-        # Action keywords (verbs)
-        action_keywords = ['walk', 'ride', 'sit', 'stand', 'talk', 'smile', 'play', 'give', 'take']
-        for keyword in action_keywords:
-            if keyword.lower() in description.lower():
-                elements['actions'].append(keyword)
-
-        return elements
+        # Keyword tables in models/scene_rules.json ("elements")
+        return get_scene_rules().key_elements(description)
 
 
 # Helper function for quick testing
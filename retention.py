@@ -0,0 +1,285 @@
+"""
+Retention and Garbage Collection
+Deletes old generated images and exported PDFs in the background by age and
+total size, while keeping anything a cached storyboard or live job references
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Iterable
+
+import config
+from artifact_store import get_artifact_store, SIDECAR_SUFFIX
+
+
+# Files that belong to another file and are removed together with it
+COMPANION_SUFFIXES = (SIDECAR_SUFFIX, '.gz', '.br')
+
+
+class RetentionPolicy:
+    """Age and size limits for one directory"""
+
+    def __init__(self, name: str, directory: Path, max_age_days: float, max_bytes: int):
+        self.name = name
+        self.directory = Path(directory)
+        self.max_age_seconds = max_age_days * 86400
+        self.max_bytes = max_bytes
+
+
+def default_policies() -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy('generated', config.OUTPUT_DIR,
+                        config.RETENTION_GENERATED_MAX_AGE_DAYS, config.RETENTION_GENERATED_MAX_BYTES),
+        RetentionPolicy('exports', config.EXPORTS_DIR,
+                        config.RETENTION_EXPORTS_MAX_AGE_DAYS, config.RETENTION_EXPORTS_MAX_BYTES),
+    ]
+
+
+class RetentionCollector:
+    """
+    Background garbage collector for static/generated and static/exports
+
+    Each pass, per directory:
+      1. delete unreferenced files older than max_age
+      2. if still over max_bytes, delete the oldest unreferenced files
+    Files younger than RETENTION_MIN_AGE are never touched, nor is anything
+    returned by a reference provider (cached storyboards, live jobs). A pass
+    deletes at most RETENTION_MAX_DELETES_PER_PASS files; the rest waits
+    for the next pass.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[List[RetentionPolicy]] = None,
+        interval: float = None,
+        min_age: float = None,
+        max_deletes: int = None
+    ):
+        """
+        Initialize the collector
+
+        Args:
+            policies: Directories and their limits (default from config)
+            interval: Seconds between passes
+            min_age: Grace period in seconds for new files
+            max_deletes: Maximum files deleted per pass
+        """
+        self.policies = policies or default_policies()
+        self.interval = interval or config.RETENTION_INTERVAL
+        self.min_age = min_age if min_age is not None else config.RETENTION_MIN_AGE
+        self.max_deletes = max_deletes or config.RETENTION_MAX_DELETES_PER_PASS
+
+        self._providers: List[Callable[[], Iterable[str]]] = []
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.passes = 0
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last_pass: Optional[Dict[str, Any]] = None
+
+    def add_reference_provider(self, provider: Callable[[], Iterable[str]]):
+        """Register a callable returning paths that must be kept"""
+        self._providers.append(provider)
+
+    def pin(self, path):
+        """Protect a path until unpin() (nestable)"""
+        key = os.path.abspath(path)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, path):
+        key = os.path.abspath(path)
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+
+    @contextmanager
+    def pinned(self, paths: Iterable):
+        """Keep paths alive for the duration of a with-block"""
+        paths = [p for p in paths if p]
+        for path in paths:
+            self.pin(path)
+        try:
+            yield
+        finally:
+            for path in paths:
+                self.unpin(path)
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="retention-gc", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def collect(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Run one collection pass over every directory
+
+        Args:
+            dry_run: Report what would be deleted without deleting
+
+        Returns:
+            Summary with files deleted and bytes reclaimed per directory
+        """
+        start = time.time()
+        keep = self._referenced_paths()
+        budget = self.max_deletes
+        report = {'started_at': start, 'dry_run': dry_run, 'directories': {}}
+
+        for policy in self.policies:
+            result = self._collect_directory(policy, keep, budget, dry_run)
+            budget -= result['files_deleted']
+            report['directories'][policy.name] = result
+
+        report['files_deleted'] = sum(r['files_deleted'] for r in report['directories'].values())
+        report['bytes_reclaimed'] = sum(r['bytes_reclaimed'] for r in report['directories'].values())
+        report['seconds'] = round(time.time() - start, 3)
+
+        if not dry_run:
+            self.passes += 1
+            self.files_deleted += report['files_deleted']
+            self.bytes_reclaimed += report['bytes_reclaimed']
+        self.last_pass = report
+
+        if report['files_deleted']:
+            verb = "would remove" if dry_run else "removed"
+            print(f"🧹 Retention: {verb} {report['files_deleted']} file(s), "
+                  f"{report['bytes_reclaimed'] / 1024 / 1024:.1f}MB reclaimed")
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pinned = len(self._pins)
+        return {
+            'passes': self.passes,
+            'files_deleted': self.files_deleted,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'pinned_paths': pinned,
+            'last_pass': self.last_pass,
+        }
+
+    def _referenced_paths(self) -> set:
+        with self._lock:
+            keep = set(self._pins)
+        for provider in self._providers:
+            try:
+                keep.update(os.path.abspath(p) for p in provider())
+            except Exception as e:
+                # Without a complete reference set, deleting anything is unsafe
+                raise RuntimeError(f"reference provider failed: {e}") from e
+        return keep
+
+    def _scan(self, directory: Path) -> List[tuple]:
+        """(mtime, size incl. companions, path) for every primary file, oldest first"""
+        entries = []
+        if not directory.exists():
+            return entries
+        for root, _, files in os.walk(directory):
+            names = set(files)
+            for name in files:
+                if name.startswith('.') or name.endswith(COMPANION_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                size = stat.st_size
+                for suffix in COMPANION_SUFFIXES:
+                    if name + suffix in names:
+                        try:
+                            size += os.path.getsize(path + suffix)
+                        except OSError:
+                            pass
+                entries.append((stat.st_mtime, size, path))
+        entries.sort()
+        return entries
+
+    def _collect_directory(self, policy: RetentionPolicy, keep: set, budget: int, dry_run: bool) -> Dict[str, Any]:
+        now = time.time()
+        entries = self._scan(policy.directory)
+        total_bytes = sum(size for _, size, _ in entries)
+        grace_cutoff = now - self.min_age
+        age_cutoff = now - policy.max_age_seconds
+        store = get_artifact_store(policy.directory)
+
+        deleted = 0
+        reclaimed = 0
+        for mtime, size, path in entries:
+            if deleted >= budget:
+                break
+            expired = mtime < age_cutoff
+            over_size = total_bytes > policy.max_bytes
+            if not (expired or over_size):
+                # Entries are oldest first: nothing later qualifies either
+                break
+            if mtime > grace_cutoff or os.path.abspath(path) in keep:
+                continue
+
+            if dry_run:
+                freed = size
+            else:
+                freed = store.remove_if_older(path, cutoff=grace_cutoff)
+                if not freed:
+                    continue
+            deleted += 1
+            reclaimed += freed
+            total_bytes -= size
+
+        return {
+            'files_scanned': len(entries),
+            'files_deleted': deleted,
+            'bytes_reclaimed': reclaimed,
+            'bytes_remaining': total_bytes,
+        }
+
+    def _run_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                print(f"⚠️  Retention pass failed: {e}")
+
+
+_collector: Optional[RetentionCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_retention_collector() -> RetentionCollector:
+    """Process-wide retention collector (keeps cached storyboards' images if RETENTION_KEEP_REFERENCED)"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = RetentionCollector()
+            from storyboard_cache import get_storyboard_cache
+            cache = get_storyboard_cache()
+            if cache is not None and config.RETENTION_KEEP_REFERENCED:
+                _collector.add_reference_provider(cache.referenced_paths)
+        return _collector
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    # Standalone runs can't see a live server's jobs; the RETENTION_MIN_AGE
+    # grace period is what protects their files here
+    parser = argparse.ArgumentParser(description="Run one retention pass over static/generated and static/exports")
+    parser.add_argument('--dry-run', action='store_true', help="Report without deleting")
+    args = parser.parse_args()
+
+    print(json.dumps(get_retention_collector().collect(dry_run=args.dry_run), indent=2))
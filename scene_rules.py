@@ -0,0 +1,222 @@
+"""
+Scene Rule Engine
+Keyword tables for scene classification (action, setting, Kazakh-to-English
+terms, key elements) loaded from models/scene_rules.json and compiled into one
+Aho-Corasick automaton, so a frame is classified in a single pass over each
+text field however many keywords the tables hold
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Set, Union
+
+import config
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a set of keywords
+
+    find() walks the text once and returns every keyword occurring in it as
+    a substring, matching the `keyword in text` checks it replaces.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Node 0 is the root; each node has transitions, a failure link and outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+
+        for keyword in set(keywords):
+            if keyword:
+                self._add(keyword)
+        self._link()
+
+    def _add(self, keyword: str):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            node = nxt
+        self._out[node].add(keyword)
+
+    def _link(self):
+        """Breadth-first failure links; each node inherits the outputs of its fallback"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] |= self._out[self._fail[child]]
+
+    def find(self, text: str) -> Set[str]:
+        """Every keyword that occurs in text"""
+        found = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class SceneRules:
+    """
+    Compiled scene rules
+
+    Every keyword of every table goes into one KeywordMatcher. Each text
+    field of a frame is lowercased and scanned once; the tables then
+    evaluate against the set of keywords found, in their file order:
+
+        action / setting: first rule with any keyword present, else default
+        translations: matched terms in order, up to max_terms
+        elements: matched keywords per category
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        """
+        Compile rules
+
+        Args:
+            data: Parsed scene_rules.json
+        """
+        self.data = data
+        self.action = data.get('action') or {}
+        self.setting = data.get('setting') or {}
+        self.translations = data.get('translations') or {}
+        self.elements = data.get('elements') or {}
+
+        keywords = []
+        for table in (self.action, self.setting):
+            for rule in table.get('rules', []):
+                rule['keywords'] = [k.lower() for k in rule.get('keywords', [])]
+                keywords.extend(rule['keywords'])
+        self.translations['terms'] = [(term.lower(), english) for term, english in self.translations.get('terms', [])]
+        keywords.extend(term for term, _ in self.translations['terms'])
+        categories = self.elements.get('categories', {})
+        for words in categories.values():
+            keywords.extend(word.lower() for word in words)
+
+        self.keyword_count = len(set(keywords))
+        self.matcher = KeywordMatcher(keywords)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SceneRules":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def scan(self, text: str) -> Set[str]:
+        """Keywords (from any table) present in text"""
+        return self.matcher.find((text or '').lower())
+
+    def _first_rule(self, table: Dict[str, Any], found: Set[str]) -> Dict[str, Any]:
+        for rule in table.get('rules', []):
+            if any(keyword in found for keyword in rule['keywords']):
+                return rule
+        return table.get('default') or {}
+
+    def action_rule(self, description: str, found: Optional[Set[str]] = None) -> Dict[str, Any]:
+        return self._first_rule(self.action, self.scan(description) if found is None else found)
+
+    def setting_rule(self, setting: str, found: Optional[Set[str]] = None) -> Dict[str, Any]:
+        return self._first_rule(self.setting, self.scan(setting) if found is None else found)
+
+    def action_prompt(self, description: str, found: Optional[Set[str]] = None) -> str:
+        """Cinematic action description for a frame description"""
+        rule = self.action_rule(description, found)
+        return rule.get('prompt', '{description}').format(description=description)
+
+    def setting_prompt(self, setting: str, key_objects: list, found: Optional[Set[str]] = None) -> str:
+        """Vivid environment description for a frame setting and its key objects"""
+        rule = self.setting_rule(setting, found)
+        objects = ', '.join(key_objects) if key_objects else rule.get('default_objects', '')
+        return rule.get('prompt', 'Scene set in {setting} with {objects} visible').format(
+            setting=setting, objects=objects)
+
+    def translate(self, description: str, found: Optional[Set[str]] = None) -> str:
+        """Simple English keywords for a non-English description"""
+        found = self.scan(description) if found is None else found
+        english = [english for term, english in self.translations.get('terms', []) if term in found]
+        if english:
+            return ", ".join(english[:self.translations.get('max_terms', 3)])
+        return self.translations.get('fallback', 'Kazakh folk scene')
+
+    def key_elements(self, description: str, found: Optional[Set[str]] = None) -> Dict[str, list]:
+        """Keywords present in a description, by category"""
+        found = self.scan(description) if found is None else found
+        return {
+            category: [word for word in words if word.lower() in found]
+            for category, words in self.elements.get('categories', {}).items()
+        }
+
+    def classify(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Classify one frame: one scan of its description and one of its setting
+
+        Returns:
+            {'action', 'setting': rule names, 'action_prompt', 'setting_prompt',
+             'translation', 'elements'}
+        """
+        description = frame.get(self.action.get('field', 'description'), '') or ''
+        setting = frame.get(self.setting.get('field', 'setting'), '') or ''
+        description_found = self.scan(description)
+        setting_found = self.scan(setting)
+        return {
+            'action': self.action_rule(description, description_found).get('name'),
+            'setting': self.setting_rule(setting, setting_found).get('name'),
+            'action_prompt': self.action_prompt(description, description_found),
+            'setting_prompt': self.setting_prompt(setting, frame.get('key_objects', []), setting_found),
+            'translation': self.translate(description, description_found),
+            'elements': self.key_elements(description, description_found),
+        }
+
+    def classify_frames(self, frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """classify() every frame of a storyboard"""
+        return [self.classify(frame) for frame in frames]
+
+
+_rules: Optional[SceneRules] = None
+_rules_mtime: Optional[float] = None
+_rules_lock = threading.Lock()
+
+
+def get_scene_rules() -> SceneRules:
+    """
+    Process-wide compiled rules from config.SCENE_RULES_PATH
+
+    The file is recompiled when it changes on disk, so vocabulary edits
+    apply without a restart. A missing or invalid file leaves only the
+    default action/setting prompts.
+    """
+    global _rules, _rules_mtime
+    path = config.SCENE_RULES_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _rules_lock:
+        if _rules is None or mtime != _rules_mtime:
+            try:
+                _rules = SceneRules.load(path)
+                print(f"✓ Scene rules compiled ({_rules.keyword_count} keywords)")
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Scene rules unavailable ({path}): {e}")
+                if _rules is None:
+                    _rules = SceneRules({})
+            _rules_mtime = mtime
+        return _rules
@@ -11,13 +11,18 @@ const framesContainer = document.getElementById('framesContainer');
 const downloadBtn = document.getElementById('downloadBtn');
 const downloadPdfBtn = document.getElementById('downloadPdfBtn');
 const newStoryBtn = document.getElementById('newStoryBtn');
+const previewsToggle = document.getElementById('previewsToggle');
 
 // State
 let currentStoryboard = null;
+let activeJobId = null;
+let activeStream = null; // AbortController for the in-flight stream
 
 // Event Listeners
 generateBtn.addEventListener('click', generateStoryboardStream);
 newStoryBtn.addEventListener('click', resetForm);
+// Closing the tab frees the GPU for whoever is queued next
+window.addEventListener('pagehide', cancelActiveJob);
 downloadBtn.addEventListener('click', downloadAllImages);
 downloadPdfBtn.addEventListener('click', downloadPDF);
 
@@ -62,6 +67,9 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 });
 
+// How many times to reattach to a running job after the stream drops
+const MAX_STREAM_RETRIES = 5;
+
 // Streaming generation: render frames as they arrive
 async function generateStoryboardStream() {
     const prompt = promptInput.value.trim();
@@ -77,11 +85,17 @@ async function generateStoryboardStream() {
         return;
     }
 
+    // A new story replaces the old one: stop its remaining frames first
+    cancelActiveJob();
+
     // Hide error and show loading
     hideError();
     showLoading();
     disableButton(generateBtn);
 
+    const controller = new AbortController();
+    activeStream = controller;
+
     try {
     // Prepare UI for streaming
     outputSection.style.display = 'block';
@@ -89,12 +103,15 @@ async function generateStoryboardStream() {
     storyText.innerHTML = '';
 
         // Start streaming from server
-        const payload = { prompt };
+        // Live latent previews cost a decode per step: only when the user opted in
+        // (the toggle starts from the server's ENABLE_LATENT_PREVIEWS default)
+        const payload = { prompt, previews: Boolean(previewsToggle && previewsToggle.checked) };
 
         const response = await fetch('/api/generate/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
+            body: JSON.stringify(payload),
+            signal: controller.signal
         });
 
         if (!response.ok || !response.body) {
@@ -110,71 +127,168 @@ async function generateStoryboardStream() {
             framesContainer.appendChild(sk);
         }
 
-        // Read NDJSON chunks
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
-        let buffer = '';
+        // Read NDJSON chunks; if the connection drops, resume the same job
+        // from the last event ID instead of starting a new storyboard
         const frames = [];
+        let jobId = activeJobId = response.headers.get('X-Job-Id');
+        let lastEventId = 0;
+        let finished = false;
+        let retries = 0;
+        let reader = response.body.getReader();
+        const decoder = new TextDecoder();
 
-        while (true) {
-            const { value, done } = await reader.read();
-            if (done) break;
-            buffer += decoder.decode(value, { stream: true });
-
-            // Process complete lines
-            let newlineIndex;
-            while ((newlineIndex = buffer.indexOf('\n')) >= 0) {
-                const line = buffer.slice(0, newlineIndex).trim();
-                buffer = buffer.slice(newlineIndex + 1);
-                if (!line) continue;
-
-                let event;
-                try { event = JSON.parse(line); } catch { continue; }
-
-                if (event.type === 'story') {
-                    storyText.innerHTML = `
-                        <strong>Aldar Köse Story:</strong><br>
-                        ${escapeHtml(event.aldar_story)}
-                    `;
-                    // If we rendered too many skeletons, trim to total_frames
-                    const total = Math.max(0, Number(event.total_frames || SKELETON_COUNT));
-                    while (framesContainer.children.length > total) {
-                        framesContainer.removeChild(framesContainer.lastChild);
-                    }
-                } else if (event.type === 'frame') {
-                    const idx = event.index;
-                    const frame = event.frame;
-                    frames.push(frame);
-
-                    // If there is a skeleton at this index, replace it; else append
-                    const frameNum = frame.frame_number || (idx + 1);
-                    const card = createFrameCard(frame, frameNum);
-                    if (idx < framesContainer.children.length) {
-                        framesContainer.replaceChild(card, framesContainer.children[idx]);
-                    } else {
-                        framesContainer.appendChild(card);
-                    }
-                    // Scroll as new frames appear
-                    card.scrollIntoView({ behavior: 'smooth', block: 'end' });
-                } else if (event.type === 'error') {
-                    throw new Error(event.message || 'Generation error');
-                } else if (event.type === 'complete') {
-                    currentStoryboard = { storyboard: frames, metadata: { aldar_story: storyText.textContent } };
-                    // Remove any remaining skeletons at the end
-                    const realCount = frames.length;
-                    while (framesContainer.children.length > realCount) {
-                        framesContainer.removeChild(framesContainer.lastChild);
+        while (!finished) {
+            let buffer = '';
+            try {
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+
+                    // Process complete lines
+                    let newlineIndex;
+                    while ((newlineIndex = buffer.indexOf('\n')) >= 0) {
+                        const line = buffer.slice(0, newlineIndex).trim();
+                        buffer = buffer.slice(newlineIndex + 1);
+                        if (!line) continue;
+
+                        let event;
+                        try { event = JSON.parse(line); } catch { continue; }
+                        if (event.id) lastEventId = Math.max(lastEventId, event.id);
+                        retries = 0;
+
+                        if (event.type === 'job') {
+                            jobId = activeJobId = event.job_id;
+                        } else if (event.type === 'story') {
+                            storyText.innerHTML = `
+                                <strong>Aldar Köse Story:</strong><br>
+                                ${escapeHtml(event.aldar_story)}
+                            `;
+                            // If we rendered too many skeletons, trim to total_frames
+                            const total = Math.max(0, Number(event.total_frames || SKELETON_COUNT));
+                            while (framesContainer.children.length > total) {
+                                framesContainer.removeChild(framesContainer.lastChild);
+                            }
+                        } else if (event.type === 'plan') {
+                            // Streamed frame plan is complete: match skeletons to the real frame count
+                            const total = Math.max(0, Number(event.total_frames) || 0);
+                            while (framesContainer.children.length < total) {
+                                framesContainer.appendChild(createSkeletonCard(framesContainer.children.length + 1));
+                            }
+                            while (framesContainer.children.length > Math.max(total, frames.length)) {
+                                framesContainer.removeChild(framesContainer.lastChild);
+                            }
+                        } else if (event.type === 'preview') {
+                            // Show the low-res preview inside the skeleton card for this frame
+                            const sk = framesContainer.children[event.index];
+                            if (sk && sk.classList.contains('skeleton-card')) {
+                                const placeholder = sk.querySelector('.skeleton-image');
+                                if (placeholder) {
+                                    placeholder.style.backgroundImage = `url(${event.image})`;
+                                    placeholder.classList.add('has-preview');
+                                }
+                            }
+                        } else if (event.type === 'regenerating') {
+                            // Frame failed the quality check and is rendering again: drop its stale preview
+                            const sk = framesContainer.children[event.index];
+                            const placeholder = sk && sk.classList.contains('skeleton-card') && sk.querySelector('.skeleton-image');
+                            if (placeholder) {
+                                placeholder.style.backgroundImage = '';
+                                placeholder.classList.remove('has-preview');
+                            }
+                        } else if (event.type === 'frame') {
+                            const idx = event.index;
+                            const frame = event.frame;
+                            // Remote frames arrive in completion order: place them by index
+                            frames[idx] = frame;
+
+                            // Pad with skeletons up to this index, then replace its card
+                            while (framesContainer.children.length <= idx) {
+                                framesContainer.appendChild(createSkeletonCard(framesContainer.children.length + 1));
+                            }
+                            const frameNum = frame.frame_number || (idx + 1);
+                            const card = createFrameCard(frame, frameNum);
+                            framesContainer.replaceChild(card, framesContainer.children[idx]);
+                            // Scroll as new frames appear
+                            card.scrollIntoView({ behavior: 'smooth', block: 'end' });
+                        } else if (event.type === 'frame_variants') {
+                            // Thumb/preview/print derivatives arrive after the frame itself
+                            const frame = frames[event.index];
+                            if (frame) {
+                                frame.image_variants = event.image_variants;
+                                frame.image_variant_paths = event.image_variant_paths;
+                                const card = createFrameCard(frame, frame.frame_number || (event.index + 1));
+                                framesContainer.replaceChild(card, framesContainer.children[event.index]);
+                            }
+                        } else if (event.type === 'stats') {
+                            // Per-stage timeline of this storyboard (LLM calls, diffusion, saves)
+                            console.debug('Storyboard timings', event.timings);
+                        } else if (event.type === 'error') {
+                            finished = true;
+                            throw new Error(event.message || 'Generation error');
+                        } else if (event.type === 'cancelled') {
+                            finished = true;
+                            throw new Error('Generation was cancelled');
+                        } else if (event.type === 'gap') {
+                            // Resumed too late: the frames we missed are no longer buffered
+                            finished = true;
+                            throw new Error(event.message || 'This storyboard can no longer be resumed');
+                        } else if (event.type === 'complete') {
+                            finished = true;
+                            const storyboard = frames.filter(Boolean);
+                            currentStoryboard = { storyboard, metadata: { aldar_story: storyText.textContent } };
+                            // Remove any remaining skeletons at the end
+                            const realCount = frames.length;
+                            while (framesContainer.children.length > realCount) {
+                                framesContainer.removeChild(framesContainer.lastChild);
+                            }
+                        }
                     }
                 }
+                if (finished || !jobId) break;
+            } catch (streamError) {
+                if (controller.signal.aborted) return;
+                if (finished || !jobId || retries >= MAX_STREAM_RETRIES) throw streamError;
+            }
+
+            // Stream ended early (network drop): reattach to the job
+            retries += 1;
+            updateLoadingText('Connection lost, resuming...');
+            await sleep(1000 * retries);
+            if (controller.signal.aborted) return;
+            const resumed = await fetch(`/api/jobs/${jobId}/stream?after=${lastEventId}`, {
+                signal: controller.signal
+            });
+            if (!resumed.ok || !resumed.body) {
+                throw new Error('Lost connection to the generation job');
             }
+            reader = resumed.body.getReader();
         }
 
     } catch (error) {
+        if (controller.signal.aborted) return;
         console.error('Generation error:', error);
         showError(`Error: ${error.message}`);
     } finally {
-        hideLoading();
-        enableButton(generateBtn);
+        if (activeStream === controller) {
+            activeStream = null;
+            activeJobId = null;
+            hideLoading();
+            enableButton(generateBtn);
+        }
+    }
+}
+
+// Cancel the storyboard currently being generated (if any)
+function cancelActiveJob() {
+    if (activeStream) {
+        activeStream.abort();
+        activeStream = null;
+    }
+    if (activeJobId) {
+        // keepalive lets the request finish even while the page unloads
+        fetch(`/api/jobs/${activeJobId}`, { method: 'DELETE', keepalive: true }).catch(() => {});
+        activeJobId = null;
     }
 }
 
@@ -231,12 +345,24 @@ function createFrameCard(frame, frameNumber) {
         ? frame.key_objects.map(obj => `<span class="meta-tag">${escapeHtml(obj)}</span>`).join('')
         : '';
 
+    // Cards are ~300-400px wide: load the 512px WebP preview (or 256px thumb),
+    // not the full-size original
+    const variants = frame.image_variants || {};
+    const src = variants.preview || frame.image_url;
+    const srcset = [
+        variants.thumb ? `${variants.thumb} 256w` : '',
+        variants.preview ? `${variants.preview} 512w` : '',
+        variants.original ? `${variants.original} 1024w` : ''
+    ].filter(Boolean).join(', ');
+
     card.innerHTML = `
         <img
-            src="${escapeHtml(frame.image_url)}"
+            src="${escapeHtml(src)}"
+            ${srcset ? `srcset="${escapeHtml(srcset)}" sizes="(max-width: 768px) 100vw, 400px"` : ''}
             alt="Frame ${frameNumber}"
             class="frame-image"
             loading="lazy"
+            decoding="async"
         >
         <div class="frame-content">
             <span class="frame-number">Frame ${frameNumber}</span>
@@ -280,8 +406,8 @@ async function downloadPDF() {
         const storyboardData = {
             storyboard: currentStoryboard.storyboard.map(frame => ({
                 ...frame,
-                // Convert image_url to absolute path for PDF generator
-                image_path: frame.image_url ? frame.image_url.replace('/static/generated/', 'static/generated/') : null
+                // Convert the print-size JPEG (or the original) URL to a path for the PDF generator
+                image_path: pdfImageUrl(frame) ? pdfImageUrl(frame).replace('/static/generated/', 'static/generated/') : null
             })),
             metadata: currentStoryboard.metadata || {}
         };
@@ -365,8 +491,16 @@ async function downloadImage(url, filename) {
     }
 }
 
+// Image the PDF should embed: the print JPEG derivative when available
+function pdfImageUrl(frame) {
+    return (frame.image_variants && frame.image_variants.print) || frame.image_url;
+}
+
 // Reset form for new story
 function resetForm() {
+    cancelActiveJob();
+    hideLoading();
+    enableButton(generateBtn);
     promptInput.value = '';
     outputSection.style.display = 'none';
     framesContainer.innerHTML = '';
@@ -0,0 +1,146 @@
+"""
+Static Asset Serving
+Serves generated images and exported PDFs with strong ETags, conditional GET
+(304), byte ranges and precompressed variants, so repeat views cost almost nothing
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from flask import abort, request, send_file
+from werkzeug.security import safe_join
+
+import config
+from artifact_store import ArtifactStore, CONTENT_ADDRESSED_RE, SIDECAR_SUFFIX
+
+
+# Precompressed siblings, best first: <file>.br, <file>.gz
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Files stored next to an artifact that are never served by their own name
+COMPANION_SUFFIXES = (SIDECAR_SUFFIX, '.tmp') + tuple(suffix for _, suffix in ENCODINGS)
+
+# Always sent as-is: PDF viewers fetch byte ranges of the real file
+UNCOMPRESSED_TYPES = {'application/pdf'}
+
+# path -> (size, mtime, etag), least recently used first; capped at ETAG_CACHE_MAX_ENTRIES
+_etag_cache: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def file_etag(path: str, relpath: str) -> str:
+    """
+    Strong ETag for a file
+
+    Content-addressed files already carry their sha256 in the name; other
+    files are hashed once and memoized per path until their size or mtime
+    changes. The memo is an LRU of at most ETAG_CACHE_MAX_ENTRIES paths.
+    """
+    match = CONTENT_ADDRESSED_RE.match(relpath.replace(os.sep, '/'))
+    if match:
+        return match.group(1)
+
+    stat = os.stat(path)
+    with _etag_lock:
+        cached = _etag_cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime):
+            _etag_cache.move_to_end(path)
+            return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+    with _etag_lock:
+        _etag_cache[path] = (stat.st_size, stat.st_mtime, etag)
+        _etag_cache.move_to_end(path)
+        while len(_etag_cache) > config.ETAG_CACHE_MAX_ENTRIES:
+            _etag_cache.popitem(last=False)
+    return etag
+
+
+def _pick_encoding(path: str, mimetype: str) -> Tuple[str, Optional[str]]:
+    """
+    Best precompressed variant the client accepts, as (path, content-encoding)
+
+    Range requests always get the identity file, so byte offsets refer to the
+    content the client asked for rather than to a compressed stream.
+    """
+    if not config.SERVE_PRECOMPRESSED or request.range is not None or mimetype in UNCOMPRESSED_TYPES:
+        return path, None
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def is_companion_file(filename: str) -> bool:
+    """True for sidecars, compressed variants and temp files stored next to artifacts"""
+    name = os.path.basename(filename)
+    return name.startswith('.') or name.endswith(COMPANION_SUFFIXES)
+
+
+def serve_static_file(directory, filename: str):
+    """
+    Serve a file from a static directory
+
+    - Content-addressed files (see ArtifactStore) are marked immutable for a year
+    - Everything else must be revalidated, which is cheap thanks to the ETag
+    - Range requests (206) and If-None-Match / If-Modified-Since (304) are
+      handled by send_file(conditional=True)
+    - Sidecars, precompressed variants and temp files are not served directly
+    """
+    path = safe_join(os.fspath(directory), filename)
+    if path is None or not os.path.isfile(path) or is_companion_file(filename):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    etag = file_etag(path, filename)
+    body_path, encoding = _pick_encoding(path, mimetype)
+    if encoding:
+        # Each representation needs its own validator
+        etag = f"{etag}-{encoding}"
+
+    resp = send_file(
+        body_path,
+        mimetype=mimetype,
+        etag=etag,
+        conditional=True,
+        last_modified=os.path.getmtime(path),
+        max_age=config.STATIC_MAX_AGE
+    )
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    if config.SERVE_PRECOMPRESSED:
+        resp.vary.add('Accept-Encoding')
+
+    if ArtifactStore.is_content_addressed(filename):
+        resp.headers['Cache-Control'] = f'public, max-age={config.IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        resp.headers['Cache-Control'] = f'public, max-age={config.STATIC_MAX_AGE}, must-revalidate'
+    return resp
+
+
+def write_gzip_variant(path, level: int = 9) -> Optional[str]:
+    """Write <path>.gz next to a file if it actually saves space; returns the variant path"""
+    path = os.fspath(path)
+    variant = path + '.gz'
+    if os.path.exists(variant):
+        return variant
+    with open(path, 'rb') as f:
+        data = f.read()
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if len(compressed) >= len(data) * 0.9:
+        return None
+    tmp_path = f"{variant}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(compressed)
+    os.replace(tmp_path, variant)
+    return variant
@@ -0,0 +1,162 @@
+"""
+Storyboard Result Cache
+Persistent cache of finished storyboards keyed by the normalized user prompt
+plus a hash of every setting that affects the generated output
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import config
+from artifact_store import frame_file_paths
+from disk_cache import DiskLRUCache
+
+
+_lora_hash_cache: Dict[tuple, str] = {}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold and collapse whitespace so trivial edits share a cache entry"""
+    return ' '.join(prompt.casefold().split())
+
+
+def _file_hash(path: Path) -> Optional[str]:
+    """sha256 of a file, memoized on (path, size, mtime)"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    memo_key = (str(path), stat.st_size, stat.st_mtime)
+    if memo_key not in _lora_hash_cache:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        _lora_hash_cache[memo_key] = digest.hexdigest()
+    return _lora_hash_cache[memo_key]
+
+
+def generation_fingerprint(use_local: bool) -> Dict[str, Any]:
+    """Everything that changes what a storyboard looks like for the same prompt"""
+    return {
+        'backend': 'local_sdxl' if use_local else 'dalle',
+        'gpt_model': config.GPT_MODEL,
+        'planning_mode': config.PLANNING_MODE,
+        'sdxl_model_id': config.SDXL_MODEL_ID,
+        'lora_hash': _file_hash(config.LORA_PATH),
+        'lora_scale': config.LORA_SCALE,
+        'steps': config.NUM_INFERENCE_STEPS,
+        'guidance': config.GUIDANCE_SCALE,
+        'scheduler': [config.USE_FAST_SCHEDULER, config.SCHEDULER_TYPE, config.USE_KARRAS_SIGMAS],
+        'resolution': [config.IMAGE_WIDTH, config.IMAGE_HEIGHT],
+        'character_traits': config.CHARACTER_TRAITS,
+        'negative_prompt': config.NEGATIVE_PROMPT,
+        'style_lock': config.STYLE_LOCK,
+        'identity_lock': [config.USE_IDENTITY_LOCK, config.IDENTITY_REFERENCE_IMAGE, config.IP_ADAPTER_SCALE],
+        'seed': config.GENERATION_SEED,
+        'image_format': config.IMAGE_FORMAT,
+        'derivatives': config.IMAGE_DERIVATIVES if config.ENABLE_IMAGE_DERIVATIVES else None,
+    }
+
+
+class StoryboardCache(DiskLRUCache):
+    """
+    On-disk storyboard cache with O(1) lookup and LRU eviction
+
+    Entries are stored by DiskLRUCache; the size budget also counts the
+    images each storyboard references.
+    """
+
+    def __init__(self, cache_dir: Path = None, max_entries: int = None, max_bytes: int = None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding one JSON file per storyboard
+            max_entries: Maximum cached storyboards
+            max_bytes: Maximum total size (entry JSON + referenced images)
+        """
+        super().__init__(
+            cache_dir or config.STORYBOARD_CACHE_DIR,
+            max_entries or config.STORYBOARD_CACHE_MAX_ENTRIES,
+            max_bytes or config.STORYBOARD_CACHE_MAX_BYTES
+        )
+
+    def make_key(self, prompt: str, use_local: bool) -> str:
+        """Cache key: normalized prompt + generation settings fingerprint"""
+        payload = json.dumps({
+            'prompt': normalize_prompt(prompt),
+            'config': generation_fingerprint(use_local),
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached storyboard, or None if missing or its images are gone"""
+        entry = self._read_entry(key)
+        if entry is None:
+            self._record_miss()
+            return None
+
+        # Images may have been garbage-collected since the entry was written
+        for frame in entry.get('storyboard', []):
+            if any(not os.path.exists(path) for path in frame_file_paths(frame)):
+                self.delete(key)
+                self._record_miss()
+                return None
+
+        self._record_hit(key)
+        return entry
+
+    def put(self, key: str, storyboard: List[Dict[str, Any]], metadata: Dict[str, Any]):
+        """Store a finished storyboard (frames must already be JSON-safe)"""
+        image_bytes = 0
+        for frame in storyboard:
+            for path in frame_file_paths(frame):
+                if os.path.exists(path):
+                    image_bytes += os.path.getsize(path)
+
+        self._write_entry(key, {
+            'key': key,
+            'storyboard': storyboard,
+            'metadata': metadata,
+            'image_bytes': image_bytes,
+            'cached_at': time.time(),
+        }, extra_bytes=image_bytes)
+
+    def referenced_paths(self) -> set:
+        """Absolute image paths (originals and derivatives) referenced by any cached storyboard"""
+        paths = set()
+        for entry_path in self._entry_paths():
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for frame in entry.get('storyboard', []):
+                paths.update(os.path.abspath(path) for path in frame_file_paths(frame))
+        return paths
+
+    def _entry_size(self, entry_path: Path, size: int) -> int:
+        """Entry file plus the images it references"""
+        with open(entry_path, 'r', encoding='utf-8') as f:
+            return size + json.load(f).get('image_bytes', 0)
+
+
+_cache: Optional[StoryboardCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_storyboard_cache() -> Optional[StoryboardCache]:
+    """Process-wide storyboard cache (None when disabled in config)"""
+    global _cache
+    if not config.ENABLE_STORYBOARD_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = StoryboardCache()
+        return _cache
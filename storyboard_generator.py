@@ -6,25 +6,63 @@ Uses local SDXL for high-quality image generation with character consistency
 
 import os
 import json
+import base64
 import random
+import threading
+import time
+import importlib.util
+from concurrent.futures import as_completed
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Callable
-import openai
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
 from dotenv import load_dotenv
-
-# Import local generation modules
-try:
-    from local_image_generator import LocalImageGenerator
-    from quality_validator import QualityValidator
-    import config
-    LOCAL_GENERATION_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️  Local generation not available: {e}")
+import config
+from stream_pipeline import FramePipeline, ConcurrentFramePipeline, Validated
+from image_writer import get_image_writer
+from artifact_store import get_artifact_store
+from storyboard_cache import get_storyboard_cache
+from latent_preview import PreviewThrottle
+from cancellation import GenerationCancelled, raise_if_cancelled
+import metrics
+from timeline import RequestTimeline
+from llm_client import get_llm_client
+from frame_planner import stream_frame_plan, plan_storyboard
+from image_api_executor import get_image_api_executor
+from scene_rules import get_scene_rules
+
+# The local generation stack (torch, diffusers, transformers) is imported on
+# first use, not at startup; here we only check that it is installed
+LOCAL_GENERATION_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None for name in ('torch', 'diffusers')
+)
+if not LOCAL_GENERATION_AVAILABLE:
+    print("⚠️  Local generation not available: torch/diffusers not installed")
     print("   Falling back to DALL-E (if API key is available)")
-    LOCAL_GENERATION_AVAILABLE = False
 
 load_dotenv()
 
+# Prompt variation for each successive regeneration of a low-quality frame
+REGENERATION_VARIATIONS = ('composition', 'angle', 'lighting')
+
+
+def serialize_frame(frame: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make a frame JSON-safe: drop in-memory PIL images and stringify paths
+
+    Args:
+        frame: Frame dictionary, possibly holding 'image', 'saved_image' and Path values
+
+    Returns:
+        Copy of the frame that can be passed to json.dumps/jsonify
+    """
+    safe = {}
+    for key, value in frame.items():
+        if key in ('image', 'saved_image'):
+            continue
+        if isinstance(value, os.PathLike):
+            value = os.fspath(value)
+        safe[key] = value
+    return safe
+
 
 class StoryboardGenerator:
     """Generates Aldar Köse storyboards from any user prompt"""
@@ -38,25 +76,17 @@ class StoryboardGenerator:
             use_local: Use local SDXL generation (True) or DALL-E (False)
         """
         self.api_key = os.getenv('OPENAI_API_KEY')
-        if self.api_key:
-            openai.api_key = self.api_key
 
         self.progress_callback = progress_callback
         self.use_local = use_local and LOCAL_GENERATION_AVAILABLE
 
-        # Initialize local generator if available
-        self.local_generator = None
-        self.quality_validator = None
+        # Local generator and validator are created on first use (see local_generator)
+        self._local_generator = None
+        self._quality_validator = None
+        self._local_lock = threading.Lock()
 
         if self.use_local:
-            try:
-                self.local_generator = LocalImageGenerator(progress_callback=progress_callback)
-                self.quality_validator = QualityValidator()
-                print("✓ Using local SDXL image generation")
-            except Exception as e:
-                print(f"⚠️  Local generation failed to initialize: {e}")
-                print("   Falling back to DALL-E")
-                self.use_local = False
+            print("✓ Using local SDXL image generation (loaded on first request)")
 
         # Aldar Köse character description (consistent across all frames)
         self.character_description = (
@@ -70,113 +100,590 @@ class StoryboardGenerator:
         # Available shot types
         self.shot_types = ['establishing', 'wide', 'medium', 'two-shot', 'close-up', 'over-shoulder']
 
-    def generate(self, user_prompt: str) -> Dict[str, Any]:
+    @property
+    def local_generator(self):
+        """Shared LocalImageGenerator, imported and created on first access (None if unavailable)"""
+        if self._local_generator is None and self.use_local:
+            self._init_local_stack()
+        return self._local_generator
+
+    @local_generator.setter
+    def local_generator(self, value):
+        self._local_generator = value
+
+    @property
+    def loaded_local_generator(self):
+        """The local generator if it has already been created, without triggering the import"""
+        return self._local_generator
+
+    @property
+    def quality_validator(self):
+        """QualityValidator for local frames, created together with the local generator"""
+        if self._local_generator is None and self.use_local:
+            self._init_local_stack()
+        return self._quality_validator
+
+    def _init_local_stack(self):
+        """Import torch/diffusers and build the local generator; falls back to DALL-E on failure"""
+        with self._local_lock:
+            if self._local_generator is not None or not self.use_local:
+                return
+            try:
+                from local_image_generator import LocalImageGenerator
+                from quality_validator import QualityValidator
+                local_generator = LocalImageGenerator(progress_callback=self.progress_callback)
+                self._quality_validator = QualityValidator()
+                self._local_generator = local_generator
+            except Exception as e:
+                print(f"⚠️  Local generation failed to initialize: {e}")
+                print("   Falling back to DALL-E")
+                self.use_local = False
+
+    def generate(self, user_prompt: str, cancel_token=None, request_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Generate storyboard from user prompt
         Automatically creates an Aldar Köse story from any input
-        """
-        # Step 1: Create Aldar Köse story from user prompt
-        aldar_story = self._create_aldar_story(user_prompt)
 
-        # Step 2: Generate storyboard frames
-        frames = self._generate_frames(aldar_story)
+        Args:
+            user_prompt: The user's story idea
+            cancel_token: Optional CancelToken; raises GenerationCancelled once cancelled
+            request_id: ID the request's timeline is logged under (e.g. the job ID)
+
+        Returns:
+            {'storyboard': frames, 'metadata': {..., 'timings': stage timeline}}
+        """
+        timeline = RequestTimeline(request_id, prompt=user_prompt)
+
+        # Repeated prompts with unchanged settings are served from the cache
+        cache = get_storyboard_cache()
+        cache_key = cache.make_key(user_prompt, self.use_local) if cache else None
+        if cache:
+            with timeline.span('cache_lookup'):
+                cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"⚡ Storyboard cache hit ({cache_key[:12]})")
+                timeline.cache_hit = True
+                return {
+                    'storyboard': cached['storyboard'],
+                    'metadata': {**cached['metadata'], 'cache_hit': True, 'timings': timeline.finish()}
+                }
+
+        planned = self._plan_storyboard(user_prompt, timeline=timeline)
+        if planned:
+            # Steps 1 + 2 in one schema-constrained call
+            aldar_story, frames = planned
+        else:
+            planning_start = time.perf_counter()
+            # Step 1: Create Aldar Köse story from user prompt
+            with timeline.span('story'):
+                aldar_story = self._create_aldar_story(user_prompt, timeline=timeline)
+            raise_if_cancelled(cancel_token)
+
+            # Step 2: Generate storyboard frames
+            with timeline.span('frame_planning') as span:
+                frames = self._generate_frames(aldar_story, timeline=timeline)
+                span['frames'] = len(frames)
+            metrics.PLANNING_SECONDS.observe(time.perf_counter() - planning_start, mode='two_step')
+        raise_if_cancelled(cancel_token)
+        if not frames:
+            raise ValueError("The story plan contained no frames")
 
         # Step 3: Generate images for each frame
-        frames_with_images = self._generate_images(frames)
+        with timeline.span('images'):
+            frames_with_images = self._generate_images(frames, cancel_token=cancel_token, timeline=timeline)
+        self._await_variants(frames_with_images)
+
+        metadata = {
+            'original_prompt': user_prompt,
+            'aldar_story': aldar_story,
+            'num_frames': len(frames_with_images),
+            'generated_at': datetime.now().isoformat()
+        }
+        if cache and self._cacheable(frames_with_images):
+            # Re-derive the key: the backend may have fallen back to DALL-E meanwhile
+            cache.put(cache.make_key(user_prompt, self.use_local), [serialize_frame(f) for f in frames_with_images], metadata)
 
         return {
             'storyboard': frames_with_images,
-            'metadata': {
+            'metadata': {**metadata, 'timings': timeline.finish()}
+        }
+
+    def generate_events(
+        self,
+        user_prompt: str,
+        previews: bool = False,
+        cancel_token=None,
+        request_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate a storyboard frame by frame, yielding NDJSON-ready events
+
+        Args:
+            user_prompt: The user's story idea
+            previews: Emit live latent previews while each frame denoises (local SDXL only)
+            cancel_token: Optional CancelToken; raises GenerationCancelled within
+                one denoising step of cancellation
+            request_id: ID the request's timeline is logged under (e.g. the job ID)
+
+        Events:
+          {"type":"story", "aldar_story": str, "total_frames": null}
+          {"type":"plan", "total_frames": int}  (once the streamed plan is complete)
+          {"type":"preview", "index": i, "step": s, "total_steps": n, "image": data-url}
+          {"type":"frame", "frame": {..frame data..}, "index": i, "total": n}
+          {"type":"stats", "timings": {..stage timeline..}}
+          {"type":"complete", "success": true}
+
+        Raises:
+            ValueError: The plan came back without any frames (after the
+                story event; the job worker turns this into an "error" event)
+        """
+        timeline = RequestTimeline(request_id, prompt=user_prompt)
+
+        # Cache hit: replay the stored storyboard through the same protocol
+        cache = get_storyboard_cache()
+        cache_key = cache.make_key(user_prompt, self.use_local) if cache else None
+        if cache:
+            with timeline.span('cache_lookup'):
+                cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"⚡ Storyboard cache hit ({cache_key[:12]})")
+                timeline.cache_hit = True
+                yield from self._replay_cached(cached, timeline)
+                return
+
+        planned = self._plan_storyboard(user_prompt, timeline=timeline)
+        if planned:
+            # Story and frames from one call: the frame count is known up front
+            aldar_story, planned_list = planned
+        else:
+            planning_start = time.perf_counter()
+            # Step 1: story
+            with timeline.span('story'):
+                aldar_story = self._create_aldar_story(user_prompt, timeline=timeline)
+        raise_if_cancelled(cancel_token)
+
+        # With a streamed plan, the frame count is only known once it is
+        # complete (announced by a "plan" event)
+        yield {
+            "type": "story",
+            "aldar_story": aldar_story,
+            "total_frames": len(planned_list) if planned else None
+        }
+
+        # Step 3: images per-frame
+        # Use the shared local generator (one warm SDXL pipeline per process)
+        local_gen = self.local_generator if self.use_local else None
+        ref_img = None
+
+        if config.USE_IDENTITY_LOCK:
+            try:
+                if local_gen is None:
+                    # Create the local generator once and keep it; the pipeline
+                    # itself is owned by the process-wide model manager
+                    from local_image_generator import LocalImageGenerator as _LocalGen
+                    local_gen = self.local_generator = _LocalGen()
+
+                ref_img = self._identity_reference()
+            except Exception as _e:
+                # Local stack not available; will fall back to API path below
+                print(f"Identity lock requested, but local generator unavailable: {_e}")
+
+        # Prefer local generation whenever the local generator is ready.
+        # Stages run concurrently: while frame N is encoded and written,
+        # frame N+1's prompt is ready and its denoising has already started.
+        if local_gen is not None:
+            timeline.backend = 'local'
+            pipeline = self._local_frame_pipeline(local_gen, ref_img, timeline, cancel_token, previews=previews)
+        else:
+            # DALL·E (or placeholder) path: frames are independent API calls, so
+            # they run concurrently and stream back in completion order
+            timeline.backend = 'dalle'
+            pipeline = ConcurrentFramePipeline(
+                lambda idx, frame: self._generate_dalle_frame(idx, frame, timeline=timeline),
+                get_image_api_executor(),
+                cancel_token=cancel_token
+            )
+        plan = {'total': None, 'truncated': False}
+
+        def planned_frames():
+            # Step 2: frames (structure only), consumed by the prepare stage
+            # while the plan streams in, so frame 1 renders before it ends
+            count = 0
+            for frame in planned_list if planned else self._stream_frames(aldar_story, timeline=timeline, plan=plan):
+                raise_if_cancelled(cancel_token)
+                count += 1
+                yield frame
+            plan['total'] = count
+            if not planned:
+                metrics.PLANNING_SECONDS.observe(time.perf_counter() - planning_start, mode='two_step')
+            if count:
+                pipeline.publish(count - 1, {"type": "plan", "total_frames": count})
+
+        # Frames go out as soon as their original is stored; thumb/preview/print
+        # derivatives follow as 'frame_variants' events once they are encoded
+        def publish_variants(saved, idx):
+            if saved.variants:
+                pipeline.publish(idx, self._variants_event(idx, saved))
+
+        finished = {}
+        variants_sent = set()
+        with timeline.span('images'):
+            for kind, idx, item in pipeline.run(planned_frames()):
+                if kind == 'event':
+                    if item.get('type') == 'frame_variants':
+                        if idx in variants_sent or idx not in finished:
+                            continue
+                        variants_sent.add(idx)
+                        finished[idx]['saved_image'].apply_to(finished[idx])
+                    yield item
+                    continue
+                frame = finished[idx] = item
+                yield {
+                    "type": "frame",
+                    "frame": frame,
+                    "index": idx,
+                    "total": plan['total']
+                }
+                if frame.get('saved_image') is not None:
+                    frame['saved_image'].on_variants(lambda saved, idx=idx: publish_variants(saved, idx))
+
+        if plan['total'] == 0:
+            # Nothing to render; the job worker reports this as an "error" event
+            raise ValueError("The story plan contained no frames")
+
+        # Derivatives that were still encoding when the last frame went out
+        for idx in sorted(finished):
+            saved = finished[idx].get('saved_image')
+            if saved is not None and idx not in variants_sent and saved.wait_variants():
+                yield self._variants_event(idx, saved)
+        finished = self._await_variants([finished[idx] for idx in sorted(finished)])
+
+        if cache and self._cacheable(finished, truncated=plan['truncated']):
+            cache.put(cache.make_key(user_prompt, self.use_local), [serialize_frame(f) for f in finished], {
                 'original_prompt': user_prompt,
                 'aldar_story': aldar_story,
-                'num_frames': len(frames_with_images),
+                'num_frames': len(finished),
                 'generated_at': datetime.now().isoformat()
-            }
+            })
+
+        yield {"type": "stats", "timings": timeline.finish()}
+        yield {"type": "complete", "success": True}
+
+    def _replay_cached(self, cached: Dict[str, Any], timeline: RequestTimeline) -> Iterator[Dict[str, Any]]:
+        """Emit a cached storyboard as story/frame/stats/complete events"""
+        frames = cached['storyboard']
+        yield {
+            "type": "story",
+            "aldar_story": cached['metadata'].get('aldar_story', ''),
+            "total_frames": len(frames)
+        }
+        for idx, frame in enumerate(frames):
+            yield {"type": "frame", "frame": frame, "index": idx, "total": len(frames)}
+        yield {"type": "stats", "timings": timeline.finish()}
+        yield {"type": "complete", "success": True, "cached": True}
+
+    def _local_frame_pipeline(self, local_gen, ref_img, timeline: RequestTimeline,
+                              cancel_token=None, previews: bool = False) -> FramePipeline:
+        """
+        Local SDXL frame pipeline shared by generate() and generate_events()
+
+        Prompts are enhanced, frames denoised, scored (with regeneration of
+        low-quality frames when validation is on) and saved on separate
+        threads, so while frame N is validated and written, frame N+1 is
+        already denoising.
+
+        Args:
+            local_gen: LocalImageGenerator
+            ref_img: Identity reference image for the IP-Adapter, or None
+            timeline: RequestTimeline receiving per-frame timings
+            cancel_token: Optional CancelToken checked on every denoising step
+            previews: Publish latent preview events while denoising
+        """
+        def prepare(idx, frame):
+            # Enhance prompt to fit within 75 token limit
+            start = time.perf_counter()
+            enhanced_prompt = local_gen.enhancer.enhance(frame)
+            frame['prompt_used'] = enhanced_prompt
+            timeline.record_frame(idx, prompt_seconds=round(time.perf_counter() - start, 3))
+            return enhanced_prompt
+
+        def render(idx, frame, enhanced_prompt):
+            step_callback = None
+            if previews:
+                step_callback = PreviewThrottle(
+                    lambda preview: pipeline.publish(idx, {"type": "preview", "index": idx, **preview})
+                )
+            # Generate with enhanced prompt (LoRA is applied automatically if present)
+            start = time.perf_counter()
+            image = local_gen.generate_single(
+                prompt=enhanced_prompt,
+                ref_image=ref_img,
+                ip_adapter_scale=config.IP_ADAPTER_SCALE if ref_img is not None else None,
+                step_callback=step_callback,
+                cancel_token=cancel_token
+            )
+            timeline.record_diffusion(idx, time.perf_counter() - start, config.NUM_INFERENCE_STEPS)
+            return image
+
+        validate = regenerate = None
+        if self.quality_validator and config.ENABLE_QUALITY_VALIDATION:
+            # Scored on the validate thread while the next frame denoises;
+            # failed frames are re-rendered ahead of new ones
+            def validate(idx, frame, img, attempt):
+                return self._score_frame(idx, frame, img, timeline)
+
+            def regenerate(idx, frame, attempt):
+                pipeline.publish(idx, {"type": "regenerating", "index": idx, "attempt": attempt})
+                return self._regenerate_image(
+                    idx, frame, attempt, timeline,
+                    ref_image=ref_img,
+                    ip_adapter_scale=config.IP_ADAPTER_SCALE if ref_img is not None else None,
+                    cancel_token=cancel_token
+                )
+
+        def save(idx, frame, result):
+            img = result.rendered if validate else result
+            # Encoded on the writer pool; returns once the file is durable
+            name = f'frame_{idx + 1:03d}_regen' if validate and result.regenerations else f'frame_{idx + 1:03d}'
+            saved = get_image_writer().save(img, name)
+            timeline.record_save(idx, saved)
+            if validate:
+                self._record_quality(frame, idx, result, timeline)
+            return self._finish_frame(frame, idx, saved)
+
+        pipeline = FramePipeline(
+            prepare, render, save,
+            validate=validate,
+            regenerate=regenerate,
+            max_regenerations=config.MAX_REGENERATION_ATTEMPTS
+        )
+        return pipeline
+
+    def _identity_reference(self):
+        """Identity lock reference image from the project root (None if disabled or unreadable)"""
+        if not config.USE_IDENTITY_LOCK:
+            return None
+        from PIL import Image as _Image
+        ref_path = os.path.join(os.getcwd(), config.IDENTITY_REFERENCE_IMAGE)
+        if not os.path.exists(ref_path):
+            print(f"Reference image not found: {ref_path}")
+            return None
+        try:
+            ref_img = _Image.open(ref_path).convert('RGB')
+            print(f"✓ Using identity lock with {config.IDENTITY_REFERENCE_IMAGE} (scale={config.IP_ADAPTER_SCALE})")
+            return ref_img
+        except Exception as _e:
+            print(f"Failed to load reference image {ref_path}: {_e}")
+            return None
+
+    @staticmethod
+    def _cacheable(frames: List[Dict[str, Any]], truncated: bool = False) -> bool:
+        """
+        Whether a finished storyboard may be cached
+
+        Template frames (GPT planning failed), placeholder images (DALL·E
+        failed) and plans whose stream broke off part-way (truncated) come
+        from transient outages; caching them would keep serving the degraded
+        storyboard for that prompt.
+        """
+        if truncated:
+            print(f"ℹ️  Not caching storyboard: frame plan was truncated after {len(frames)} frames")
+            return False
+        degraded = sum(1 for frame in frames if frame.get('fallback') or frame.get('placeholder'))
+        if degraded:
+            print(f"ℹ️  Not caching storyboard: {degraded}/{len(frames)} fallback or placeholder frames")
+        return bool(frames) and not degraded
+
+    def _finish_frame(self, frame: Dict[str, Any], idx: int, saved) -> Dict[str, Any]:
+        """
+        Attach the saved image and frame number to a frame
+
+        The frame is ready once its original is stored; while the derivatives
+        are still encoding, the SavedImage rides along as 'saved_image' so the
+        caller can publish them later (see _await_variants).
+        """
+        saved.apply_to(frame)
+        frame['saved_image'] = saved
+        frame['frame_number'] = idx + 1
+        return frame
+
+    @staticmethod
+    def _variants_event(idx: int, saved) -> Dict[str, Any]:
+        """'frame_variants' event carrying a frame's thumb/preview/print URLs"""
+        fields = saved.apply_to({})
+        return {
+            "type": "frame_variants",
+            "index": idx,
+            "image_variants": fields['image_variants'],
+            "image_variant_paths": fields['image_variant_paths'],
         }
 
-    def _create_aldar_story(self, user_prompt: str) -> str:
+    @staticmethod
+    def _await_variants(frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Wait for every frame's derivatives and record them on the frame"""
+        for frame in frames:
+            saved = frame.pop('saved_image', None)
+            if saved is not None:
+                saved.wait_variants()
+                saved.apply_to(frame)
+        return frames
+
+    def _create_aldar_story(self, user_prompt: str, timeline: Optional[RequestTimeline] = None) -> str:
         """Convert any user prompt into an Aldar Köse story"""
 
         if not self.api_key:
             # Fallback: Manual injection
             return f"Алдар Көсе {user_prompt}"
 
+        model = config.GPT_MODEL if LOCAL_GENERATION_AVAILABLE else "gpt-4o-mini"
+        start = time.perf_counter()
         try:
             # Use GPT to create a proper Aldar Köse story
-            from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=config.GPT_MODEL if LOCAL_GENERATION_AVAILABLE else "gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a Kazakh folklore expert. "
-                            "Transform any user input into a short Aldar Köse story (2-4 sentences). "
-                            "Aldar Köse is a clever, witty, generous Kazakh folk hero who uses his intelligence "
-                            "to help people, teach lessons, and outsmart the greedy or unjust. "
-                            "Keep the story culturally authentic with Kazakh settings (steppe, yurts, bazaars). "
-                            "Respond in the same language as the user's input (Kazakh, Russian, or English)."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Create an Aldar Köse story based on this idea: {user_prompt}"
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=300
-            )
+            with metrics.STORY_CREATION_SECONDS.time():
+                response = get_llm_client().chat(
+                    'story',
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": self._get_story_system_prompt()
+                        },
+                        {
+                            "role": "user",
+                            "content": f"Create an Aldar Köse story based on this idea: {user_prompt}"
+                        }
+                    ],
+                    temperature=0.7,
+                    max_tokens=300
+                )
+            if timeline:
+                timeline.record_llm('story', model, time.perf_counter() - start, response)
 
             return response.choices[0].message.content.strip()
 
         except Exception as e:
             print(f"GPT story creation failed: {e}")
+            if timeline:
+                timeline.record_llm('story', model, time.perf_counter() - start, error=str(e))
             return f"Алдар Көсе {user_prompt}"
 
-    def _generate_frames(self, story: str) -> List[Dict[str, Any]]:
+    def _generate_frames(self, story: str, timeline: Optional[RequestTimeline] = None) -> List[Dict[str, Any]]:
         """Generate 6-10 storyboard frames from the story"""
 
         if not self.api_key:
             # Fallback: Template-based generation
             return self._generate_fallback_frames(story)
 
+        model = config.GPT_MODEL if LOCAL_GENERATION_AVAILABLE else "gpt-4o-mini"
+        start = time.perf_counter()
+        response = None
         try:
             # Use GPT to generate structured frames
-            from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=config.GPT_MODEL if LOCAL_GENERATION_AVAILABLE else "gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self._get_storyboard_system_prompt()
-                    },
-                    {
-                        "role": "user",
-                        "content": story
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-
-            # Parse JSON response
-            content = response.choices[0].message.content.strip()
-
-            # Extract JSON from response (in case there's extra text)
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0].strip()
-
-            frames = json.loads(content)
+            with metrics.FRAME_PLANNING_SECONDS.time():
+                response = get_llm_client().chat(
+                    'frame_planning',
+                    model=model,
+                    messages=self._frame_planning_messages(story),
+                    temperature=0.7,
+                    max_tokens=2000
+                )
+
+                # Parse JSON response
+                content = response.choices[0].message.content.strip()
+
+                # Extract JSON from response (in case there's extra text)
+                if '```json' in content:
+                    content = content.split('```json')[1].split('```')[0].strip()
+                elif '```' in content:
+                    content = content.split('```')[1].split('```')[0].strip()
+
+                frames = json.loads(content)
+            if timeline:
+                timeline.record_llm('frame_planning', model, time.perf_counter() - start, response)
             return frames
 
         except Exception as e:
             print(f"GPT frame generation failed: {e}")
+            if timeline:
+                # A reply that failed to parse still cost its tokens
+                timeline.record_llm('frame_planning', model, time.perf_counter() - start, response, error=str(e))
             return self._generate_fallback_frames(story)
 
+    def _stream_frames(self, story: str, timeline: Optional[RequestTimeline] = None,
+                       plan: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield storyboard frames one by one while the plan is still being written
+
+        Each frame is parsed out of the streamed completion as soon as its
+        JSON object closes (see frame_planner.py). Falls back to the
+        one-shot planner when streaming is disabled or there is no API key,
+        and to template frames if the stream produced none. A stream that
+        broke off part-way sets plan['truncated'].
+        """
+        if not self.api_key or not config.STREAM_FRAME_PLANNING:
+            started = time.time()
+            frames = self._generate_frames(story, timeline=timeline)
+            if timeline:
+                timeline.record_stage('frame_planning', started, frames=len(frames))
+            yield from frames
+            return
+
+        model = config.GPT_MODEL if LOCAL_GENERATION_AVAILABLE else "gpt-4o-mini"
+        count = 0
+        for frame in stream_frame_plan(self._frame_planning_messages(story), model, timeline=timeline, plan=plan):
+            count += 1
+            yield frame
+        if count == 0:
+            yield from self._generate_fallback_frames(story)
+
+    def _frame_planning_messages(self, story: str) -> List[Dict[str, str]]:
+        """Chat messages asking GPT to plan the frames of a story"""
+        return [
+            {
+                "role": "system",
+                "content": self._get_storyboard_system_prompt()
+            },
+            {
+                "role": "user",
+                "content": story
+            }
+        ]
+
+    def _plan_storyboard(self, user_prompt: str,
+                         timeline: Optional[RequestTimeline] = None) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Story and frames in one call when PLANNING_MODE is "single_call"
+
+        Returns:
+            (story, frames), or None to use the two-step story + frame planning
+        """
+        if config.PLANNING_MODE != 'single_call' or not self.api_key:
+            return None
+        model = config.GPT_MODEL if LOCAL_GENERATION_AVAILABLE else "gpt-4o-mini"
+        planning_start = time.perf_counter()
+        planned = plan_storyboard(
+            user_prompt,
+            self._get_story_system_prompt(),
+            self._get_storyboard_system_prompt(),
+            model,
+            timeline=timeline
+        )
+        if planned:
+            # Failed attempts fall back to two_step and are not counted as either mode
+            metrics.PLANNING_SECONDS.observe(time.perf_counter() - planning_start, mode='single_call')
+        return planned
+
+    def _get_story_system_prompt(self) -> str:
+        """System prompt for turning a user prompt into an Aldar Köse story"""
+        return (
+            "You are a Kazakh folklore expert. "
+            "Transform any user input into a short Aldar Köse story (2-4 sentences). "
+            "Aldar Köse is a clever, witty, generous Kazakh folk hero who uses his intelligence "
+            "to help people, teach lessons, and outsmart the greedy or unjust. "
+            "Keep the story culturally authentic with Kazakh settings (steppe, yurts, bazaars). "
+            "Respond in the same language as the user's input (Kazakh, Russian, or English)."
+        )
+
     def _get_storyboard_system_prompt(self) -> str:
         """System prompt for GPT storyboard generation"""
         return """You are the Storyboard Planner for an Aldar Köse image generator.
@@ -282,16 +789,19 @@ Return ONLY the JSON array. No prose, no explanations."""
             }
         ]
 
-        # Return varied number of frames (6-8)
+        # Return varied number of frames (6-8); marked so the storyboard is never cached
         num_frames = min(len(templates), random.randint(6, 8))
-        return templates[:num_frames]
+        return [{**template, 'fallback': True} for template in templates[:num_frames]]
 
-    def _generate_images(self, frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _generate_images(self, frames: List[Dict[str, Any]], cancel_token=None,
+                         timeline: Optional[RequestTimeline] = None) -> List[Dict[str, Any]]:
         """
         Generate images for each frame using local SDXL or DALL-E fallback
 
         Args:
             frames: List of frame dictionaries
+            cancel_token: Optional CancelToken shared with the image generator
+            timeline: Optional RequestTimeline receiving per-frame timings
 
         Returns:
             Frames with added image information
@@ -299,13 +809,16 @@ Return ONLY the JSON array. No prose, no explanations."""
 
         if self.use_local and self.local_generator:
             # Use local parallel generation
-            return self._generate_images_local(frames)
+            return self._generate_images_local(frames, cancel_token=cancel_token, timeline=timeline)
         else:
             # Fallback to DALL-E sequential generation
-            return self._generate_images_dalle(frames)
+            return self._generate_images_dalle(frames, cancel_token=cancel_token, timeline=timeline)
 
-    def _generate_images_local(self, frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generate images using local SDXL in parallel"""
+    def _generate_images_local(self, frames: List[Dict[str, Any]], cancel_token=None,
+                               timeline: Optional[RequestTimeline] = None) -> List[Dict[str, Any]]:
+        """Generate images using local SDXL (prepare, render, validate and save stages overlap)"""
+        if timeline:
+            timeline.backend = 'local'
 
         print(f"🎨 Starting LOCAL SDXL generation for {len(frames)} frames...")
 
@@ -318,92 +831,122 @@ Return ONLY the JSON array. No prose, no explanations."""
             })
 
         try:
-            # Generate all frames in parallel
-            print(f"📊 Calling local_generator.generate_from_frames()...")
-            frames_with_images = self.local_generator.generate_from_frames(frames)
+            # Same staged pipeline as the stream: each frame is scored while the
+            # next one denoises, and failed frames are regenerated right away
+            pipeline = self._local_frame_pipeline(
+                self.local_generator, self._identity_reference(), timeline, cancel_token
+            )
+            finished = {}
+            with self.local_generator.model_manager.hold():
+                for kind, idx, frame in pipeline.run(frames):
+                    if kind != 'frame':
+                        continue
+                    finished[idx] = frame
+                    if self.progress_callback:
+                        self.progress_callback({
+                            'step': 'generating_images',
+                            'message': f'Frame {idx + 1}/{len(frames)} complete',
+                            'current': len(finished),
+                            'total': len(frames)
+                        })
             print(f"✅ Local generation completed successfully!")
+            return [finished[idx] for idx in sorted(finished)]
 
-            # Validate quality and regenerate if needed
-            if self.quality_validator and config.ENABLE_QUALITY_VALIDATION:
-                frames_with_images = self._validate_and_regenerate(frames_with_images)
-
-            return frames_with_images
-
+        except GenerationCancelled:
+            # Never fall back to DALL-E for a storyboard nobody is waiting for
+            raise
         except Exception as e:
             print(f"❌ Local generation failed: {e}")
             import traceback
             traceback.print_exc()
             print("   Falling back to DALL-E...")
-            return self._generate_images_dalle(frames)
-
-    def _validate_and_regenerate(self, frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Validate image quality and regenerate poor images"""
-
-        for idx, frame in enumerate(frames):
-            if 'image' not in frame:
-                continue
-
-            # Validate image
-            is_valid, metrics = self.quality_validator.validate(
-                frame['image'],
-                frame.get('description', '')
-            )
-
-            quality_score = self.quality_validator.get_quality_score(metrics)
-
-            if not is_valid and config.MAX_REGENERATION_ATTEMPTS > 0:
-                print(f"⚠️  Frame {idx + 1} quality too low ({quality_score:.1f}/100), regenerating...")
-
-                # Regenerate with variation
-                new_image = self.local_generator.regenerate_frame(frame, variation_type='composition')
-
-                # Save regenerated image
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f'frame_{idx + 1:03d}_{timestamp}_regen.png'
-                filepath = config.OUTPUT_DIR / filename
-
-                new_image.save(filepath, 'PNG', optimize=True)
-
-                # Update frame
-                frame['image'] = new_image
-                frame['image_path'] = filepath
-                frame['image_url'] = f'/static/generated/{filename}'
-                frame['regenerated'] = True
-
-                print(f"✓ Frame {idx + 1} regenerated successfully")
-
-        return frames
-
-    def _generate_images_dalle(self, frames: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Fallback: Generate images using DALL-E sequentially"""
-
-        frames_with_images = []
-
-        for idx, frame in enumerate(frames):
-            frame_number = idx + 1
-
-            if self.progress_callback:
-                self.progress_callback({
-                    'step': 'generating_images',
-                    'message': f'Generating frame {frame_number} of {len(frames)} with DALL-E...',
-                    'current': frame_number,
-                    'total': len(frames)
-                })
-
-            # Build image prompt
-            image_prompt = self._build_image_prompt(frame)
-
-            # Generate image
-            image_path = self._generate_single_image(image_prompt, frame_number)
-
-            # Add image path to frame
-            frame['image_url'] = f'/static/generated/{os.path.basename(image_path)}'
-            frame['frame_number'] = frame_number
-
-            frames_with_images.append(frame)
+            return self._generate_images_dalle(frames, cancel_token=cancel_token, timeline=timeline)
+
+    def _score_frame(self, idx: int, frame: Dict[str, Any], image,
+                     timeline: Optional[RequestTimeline] = None) -> Tuple[bool, float]:
+        """Validate one image against its frame description; returns (is_valid, quality_score)"""
+        start = time.perf_counter()
+        with metrics.QUALITY_VALIDATION_SECONDS.time():
+            is_valid, quality_metrics = self.quality_validator.validate(image, frame.get('description', ''))
+        quality_score = self.quality_validator.get_quality_score(quality_metrics)
+        if timeline:
+            timeline.add_frame_time(idx, 'validation_seconds', time.perf_counter() - start)
+        return is_valid, quality_score
+
+    def _regenerate_image(self, idx: int, frame: Dict[str, Any], attempt: int,
+                          timeline: Optional[RequestTimeline] = None, **generate_kwargs):
+        """Render a frame again with the prompt variation for this attempt"""
+        variation = REGENERATION_VARIATIONS[(attempt - 1) % len(REGENERATION_VARIATIONS)]
+        print(f"⚠️  Frame {idx + 1} quality too low, regenerating "
+              f"({attempt}/{config.MAX_REGENERATION_ATTEMPTS}, {variation})...")
+
+        metrics.FRAME_REGENERATIONS.inc()
+        start = time.perf_counter()
+        image = self.local_generator.regenerate_frame(frame, variation_type=variation, **generate_kwargs)
+        if timeline:
+            timeline.add_frame_time(idx, 'regeneration_seconds', time.perf_counter() - start)
+        return image
+
+    def _record_quality(self, frame: Dict[str, Any], idx: int, result: Validated,
+                        timeline: Optional[RequestTimeline] = None):
+        """Annotate a frame with its final quality score and regeneration count"""
+        frame['quality_score'] = round(result.score, 1)
+        if result.regenerations:
+            frame['regenerated'] = True
+            frame['regeneration_attempts'] = result.regenerations
+            status = "passed" if result.passed else "kept best attempt"
+            print(f"✓ Frame {idx + 1} regenerated {result.regenerations}x ({status}, {result.score:.1f}/100)")
+        if timeline:
+            timeline.record_frame(idx, quality_score=round(result.score, 1),
+                                  regeneration_attempts=result.regenerations)
+
+    def _generate_images_dalle(self, frames: List[Dict[str, Any]], cancel_token=None,
+                               timeline: Optional[RequestTimeline] = None) -> List[Dict[str, Any]]:
+        """Fallback: Generate images using DALL-E, all frames concurrently (see image_api_executor.py)"""
+
+        if timeline:
+            timeline.backend = 'dalle'
+
+        executor = get_image_api_executor()
+        futures = {
+            executor.submit(self._generate_dalle_frame, idx, frame, timeline, cancel_token=cancel_token): idx
+            for idx, frame in enumerate(frames)
+        }
+        frames_with_images = [None] * len(frames)
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                idx = futures[future]
+                frames_with_images[idx] = future.result()
+                if self.progress_callback:
+                    self.progress_callback({
+                        'step': 'generating_images',
+                        'message': f'Generated frame {idx + 1} ({done} of {len(frames)}) with DALL-E',
+                        'current': done,
+                        'total': len(frames)
+                    })
+        finally:
+            # Cancelled or failed: don't start the calls still waiting
+            for future in futures:
+                future.cancel()
 
         return frames_with_images
 
+    def _generate_dalle_frame(self, idx: int, frame: Dict[str, Any],
+                              timeline: Optional[RequestTimeline] = None) -> Dict[str, Any]:
+        """Generate, store and attach one DALL·E frame (runs on the image API executor)"""
+        start = time.perf_counter()
+        artifact, placeholder = self._generate_single_image(self._build_image_prompt(frame), idx + 1)
+        if placeholder:
+            frame['placeholder'] = True
+        if timeline:
+            timeline.record_diffusion(idx, time.perf_counter() - start, None)
+
+        # Add image path (and thumb/preview/print variants) to frame
+        saved = get_image_writer().adopt(artifact.path, artifact.url, f'frame_{idx + 1:03d}')
+        if timeline:
+            timeline.record_save(idx, saved)
+        return self._finish_frame(frame, idx, saved)
+
     def _build_image_prompt(self, frame: Dict[str, Any]) -> str:
         """Build DETAILED image prompt from frame description"""
 
@@ -411,10 +954,7 @@ Return ONLY the JSON array. No prose, no explanations."""
         import config as _cfg
 
         # Core visual description
-        description = frame['description']
-        setting = frame['setting']
         shot_type = frame['shot_type']
-        key_objects = frame.get('key_objects', [])
 
         # Essential character traits
         traits = _cfg.CHARACTER_TRAITS
@@ -423,11 +963,10 @@ Return ONLY the JSON array. No prose, no explanations."""
             f"{traits['hair']}, {traits['facial_hair']}, wearing {traits['clothing']} and {traits['hat']}"
         )
 
-        # 🎯 DETAILED ACTION: Make it very specific!
-        action_detail = self._enhance_action_description(description, shot_type)
-
-        # 🎯 DETAILED SETTING: Make environment clear
-        setting_detail = self._enhance_setting_description(setting, key_objects)
+        # 🎯 DETAILED ACTION + SETTING: one pass of the scene rules over the frame
+        scene = get_scene_rules().classify(frame)
+        action_detail = scene['action_prompt']
+        setting_detail = scene['setting_prompt']
 
         # Compact style description
         style = (
@@ -446,199 +985,54 @@ Return ONLY the JSON array. No prose, no explanations."""
         
         return prompt
 
-    def _enhance_action_description(self, description: str, shot_type: str) -> str:
+    def _generate_single_image(self, prompt: str, frame_number: int) -> Tuple[Any, bool]:
         """
-        Enhance action description to be more visual and cinematically specific.
-        Ensures actions are clearly depicted, not just character portraits.
-        """
-        description_lower = description.lower()
-
-        # RIDING/MOVEMENT actions
-        if any(word in description_lower for word in ['riding', 'мініп', 'есек', 'donkey', 'horse', 'at']):
-            return (
-                f"Dynamic full body shot showing Aldar Köse actively riding a small brown donkey, "
-                f"seated on the donkey's back with motion and movement clearly visible, "
-                f"traveling across the landscape"
-            )
-
-        # TALKING/CONVERSATION actions
-        if any(word in description_lower for word in ['talking', 'speaking', 'айтып', 'сөйлес', 'conversation']):
-            return (
-                f"Medium shot showing Aldar Köse engaged in animated conversation, "
-                f"gesturing expressively with hands, interacting with others, "
-                f"facial expressions showing engagement"
-            )
+        Generate a single image using DALL-E 3
 
-        # LAUGHING/CELEBRATING actions
-        if any(word in description_lower for word in ['laughing', 'celebrating', 'күлкі', 'смех']):
-            return (
-                f"Joyful scene showing Aldar Köse laughing heartily, "
-                f"body language expressing happiness and mirth, "
-                f"interacting warmly with surrounding people"
-            )
-
-        # TRICKING/OUTSMARTING actions
-        if any(word in description_lower for word in ['trick', 'outsmart', 'алдау', 'clever']):
-            return (
-                f"Clever composition showing Aldar Köse executing a cunning plan, "
-                f"sly expression and knowing smile, dynamic pose showing action, "
-                f"visual storytelling of the trickster moment"
-            )
-
-        # WALKING/TRAVELING actions
-        if any(word in description_lower for word in ['walking', 'traveling', 'journey', 'жүру', 'саяхат']):
-            return (
-                f"Full body shot of Aldar Köse actively walking/traveling, "
-                f"showing movement and progression through the environment, "
-                f"dynamic pose with clear sense of motion"
-            )
-
-        # MARKETPLACE/BAZAAR scenes
-        if any(word in description_lower for word in ['market', 'bazaar', 'базар', 'trade']):
-            return (
-                f"Busy marketplace scene with Aldar Köse in the center of activity, "
-                f"interacting with merchants and goods, vibrant market atmosphere, "
-                f"showing action and interaction, not just standing"
-            )
-
-        # CAMPFIRE/STORYTELLING scenes
-        if any(word in description_lower for word in ['campfire', 'fire', 'от', 'storytelling']):
-            return (
-                f"Warm campfire scene showing Aldar Köse actively telling stories, "
-                f"animated gestures and expressions, gathered audience listening, "
-                f"firelight illuminating the scene"
-            )
-
-        # DEFAULT: Make it dynamic and action-focused
-        return (
-            f"Dynamic scene showing Aldar Köse in action: {description}, "
-            f"clear body language and movement, active pose showing what is happening, "
-            f"not just a portrait"
-        )
-
-    def _enhance_setting_description(self, setting: str, key_objects: list) -> str:
-        """
-        Enhance environment/setting description to be more vivid and specific.
-        Adds atmospheric details and composition guidance.
+        Returns:
+            (Artifact in the content-addressed store, True if it is a placeholder);
+            identical placeholders are stored once
         """
-        setting_lower = setting.lower()
-
-        # STEPPE/GRASSLAND settings
-        if any(word in setting_lower for word in ['steppe', 'дала', 'grassland', 'prairie']):
-            objects_str = ', '.join(key_objects) if key_objects else 'rolling hills, scattered yurts'
-            return (
-                f"Set in vast golden steppe landscape with endless horizons, "
-                f"{objects_str} visible in the scene, "
-                f"distant mountains on the horizon, clear blue sky, "
-                f"traditional Kazakh environment"
-            )
 
-        # PALACE/KHAN settings
-        if any(word in setting_lower for word in ['palace', 'khan', 'сарай', 'орда']):
-            objects_str = ', '.join(key_objects) if key_objects else 'ornate decorations, throne, pillars'
-            return (
-                f"Inside an opulent palace interior with rich decorations, "
-                f"{objects_str} prominently featured, "
-                f"intricate patterns and Kazakh architectural details, "
-                f"atmosphere of wealth and power"
-            )
-
-        # VILLAGE/SETTLEMENT settings
-        if any(word in setting_lower for word in ['village', 'settlement', 'ауыл', 'yurt']):
-            objects_str = ', '.join(key_objects) if key_objects else 'traditional yurts, people, livestock'
-            return (
-                f"Traditional Kazakh village setting with {objects_str}, "
-                f"white felt yurts clustered together, communal atmosphere, "
-                f"people and daily life activities visible, "
-                f"warm community environment"
-            )
-
-        # MARKETPLACE/BAZAAR settings
-        if any(word in setting_lower for word in ['market', 'bazaar', 'базар']):
-            objects_str = ', '.join(key_objects) if key_objects else 'colorful stalls, goods, merchants'
-            return (
-                f"Bustling marketplace filled with activity, "
-                f"{objects_str} creating a vibrant scene, "
-                f"colorful fabrics, food displays, busy atmosphere, "
-                f"traditional Central Asian bazaar"
-            )
-
-        # MOUNTAIN/HIGHLAND settings
-        if any(word in setting_lower for word in ['mountain', 'тау', 'highland']):
-            objects_str = ', '.join(key_objects) if key_objects else 'rocky peaks, winding paths'
-            return (
-                f"Dramatic mountain landscape with {objects_str}, "
-                f"steep terrain and majestic peaks, "
-                f"crisp mountain air atmosphere, "
-                f"natural beauty of Kazakh highlands"
-            )
-
-        # RIVER/WATER settings
-        if any(word in setting_lower for word in ['river', 'өзен', 'water', 'lake']):
-            objects_str = ', '.join(key_objects) if key_objects else 'flowing water, riverbanks'
-            return (
-                f"Scenic waterside location with {objects_str}, "
-                f"clear flowing water reflecting the sky, "
-                f"natural riverside environment, "
-                f"peaceful water setting"
-            )
-
-        # DEFAULT: Enhance with atmospheric details
-        objects_str = ', '.join(key_objects) if key_objects else 'environmental details'
-        return (
-            f"Scene set in {setting} with {objects_str} visible, "
-            f"clear environmental context and atmosphere, "
-            f"detailed background establishing the location"
-        )
-
-    def _generate_single_image(self, prompt: str, frame_number: int) -> str:
-        """Generate a single image using DALL-E 3"""
-
-        output_dir = 'static/generated'
-        os.makedirs(output_dir, exist_ok=True)
-
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        image_filename = f'frame_{frame_number:03d}_{timestamp}.png'
-        image_path = os.path.join(output_dir, image_filename)
+        store = get_artifact_store()
+        name = f'frame_{frame_number:03d}'
 
         if not self.api_key:
             # Create placeholder
-            self._create_placeholder(image_path, frame_number)
-            return image_path
+            metrics.FRAMES_GENERATED.inc(backend='placeholder')
+            return store.put_bytes(self._create_placeholder(frame_number), '.png', kind='frame',
+                                   metadata={'name': name, 'source': 'placeholder'}), True
 
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
-            response = client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1
-            )
-
-            # Download and save image
-            import requests
-            image_url = response.data[0].url
-            img_data = requests.get(image_url).content
-
-            with open(image_path, 'wb') as f:
-                f.write(img_data)
-
-            print(f"Generated image {frame_number}: {image_filename}")
-            return image_path
+            client = get_llm_client()
+            response = client.generate_image(prompt, model="dall-e-3", size="1024x1024", quality="standard",
+                                             response_format=config.DALLE_RESPONSE_FORMAT)
+
+            # b64_json carries the image in the response; a URL needs a second round trip
+            image = response.data[0]
+            if getattr(image, 'b64_json', None):
+                img_data = base64.b64decode(image.b64_json)
+            else:
+                img_data = client.download(image.url)
+
+            artifact = store.put_bytes(img_data, '.png', kind='frame', metadata={'name': name, 'source': 'dalle'})
+            metrics.FRAMES_GENERATED.inc(backend='dalle')
+            print(f"Generated image {frame_number}: {artifact.relpath}")
+            return artifact, False
 
         except Exception as e:
             print(f"Image generation failed for frame {frame_number}: {e}")
-            self._create_placeholder(image_path, frame_number)
-            return image_path
+            metrics.FRAMES_GENERATED.inc(backend='placeholder')
+            return store.put_bytes(self._create_placeholder(frame_number), '.png', kind='frame',
+                                   metadata={'name': name, 'source': 'placeholder'}), True
 
-    def _create_placeholder(self, image_path: str, frame_number: int):
-        """Create a placeholder image"""
-        try:
-            from PIL import Image, ImageDraw, ImageFont
+    def _create_placeholder(self, frame_number: int) -> bytes:
+        """Render a placeholder image as PNG bytes"""
+        import io
+        from PIL import Image, ImageDraw
 
-            img = Image.new('RGB', (1024, 1024), color=(240, 230, 200))
+        img = Image.new('RGB', (1024, 1024), color=(240, 230, 200))
+        try:
             draw = ImageDraw.Draw(img)
 
             # Draw text
@@ -650,7 +1044,9 @@ Return ONLY the JSON array. No prose, no explanations."""
             position = ((1024 - text_width) // 2, (1024 - text_height) // 2)
             draw.text(position, text, fill=(100, 80, 60))
 
-            img.save(image_path)
-
         except Exception as e:
             print(f"Placeholder creation failed: {e}")
+
+        buffer = io.BytesIO()
+        img.save(buffer, 'PNG')
+        return buffer.getvalue()
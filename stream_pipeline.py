@@ -0,0 +1,344 @@
+"""
+Stage-Pipelined Frame Rendering
+Overlaps CPU-side prompt preparation and image encoding/saving with diffusion,
+so frame N+1 starts denoising while frame N is still being written to disk;
+remote backends instead run frames concurrently (ConcurrentFramePipeline)
+"""
+
+import queue
+import threading
+from typing import Dict, Any, Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import config
+
+
+_DONE = object()
+
+
+class StageError(Exception):
+    """Wraps an exception raised inside one of the pipeline stages"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"{stage} stage failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Validated(NamedTuple):
+    """What the save stage receives when the pipeline validates frames"""
+    rendered: Any  # The accepted render, or the best-scoring one if none passed
+    score: Optional[float]
+    passed: bool
+    regenerations: int  # Renders after the first
+
+
+class FramePipeline:
+    """
+    Three-stage pipeline with bounded queues between stages
+
+        prepare (CPU thread) -> render (accelerator thread) -> save (CPU thread)
+
+    Each stage runs on its own thread; the caller's thread only consumes
+    finished frames, so results are yielded the moment a frame is saved.
+    Bounded queues keep at most `depth` frames buffered between stages.
+    Stages can also publish() side events (e.g. live previews), which are
+    interleaved with finished frames in the output.
+
+    With a `validate` callable, a fourth stage scores each render on its
+    own CPU thread:
+
+        render -> validate -> save
+          ^---------'  (failed: regenerate, up to max_regenerations times)
+
+    Failed frames go back to the render thread, ahead of new frames, with
+    their own attempt counter; frames that pass move on to save, so one bad
+    frame never holds back the others.
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[[int, Dict[str, Any]], Any],
+        render: Callable[[int, Dict[str, Any], Any], Any],
+        save: Callable[[int, Dict[str, Any], Any], Dict[str, Any]],
+        depth: int = None,
+        validate: Callable[[int, Dict[str, Any], Any, int], Tuple[bool, Optional[float]]] = None,
+        regenerate: Callable[[int, Dict[str, Any], int], Any] = None,
+        max_regenerations: int = 0
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            prepare: (index, frame) -> render input, e.g. an enhanced prompt
+            render: (index, frame, prepared) -> rendered output, e.g. a PIL Image
+            save: (index, frame, rendered) -> finished frame dict; receives a
+                Validated instead of the render when `validate` is set
+            depth: Max items buffered between two stages
+            validate: Optional (index, frame, rendered, attempt) -> (passed, score)
+            regenerate: (index, frame, attempt) -> new render, for frames that failed
+            max_regenerations: Regenerations allowed per frame
+        """
+        self.prepare = prepare
+        self.render = render
+        self.save = save
+        self.depth = max(1, depth or config.STREAM_PIPELINE_DEPTH)
+        self.validate = validate
+        self.regenerate = regenerate
+        self.max_regenerations = max_regenerations if regenerate else 0
+        self._stop = threading.Event()
+        self._output_q: queue.Queue = queue.Queue()
+        self._pending_lock = threading.Lock()
+        self._pending = 0  # Renders handed to the validate stage and not yet decided
+
+    def publish(self, index: int, event: Dict[str, Any]):
+        """Send a side event for frame `index` to the consumer (thread-safe)"""
+        if not self._stop.is_set():
+            self._output_q.put(('event', index, event))
+
+    def run(self, frames: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+        """
+        Push frames through all stages
+
+        `frames` may be a generator (e.g. a plan that is still streaming in);
+        it is consumed on the prepare thread, one frame at a time.
+
+        Yields:
+            ('frame', index, finished_frame) in the order frames finish saving,
+            interleaved with ('event', index, event) for published side events
+        """
+        self._stop.clear()
+        prepared_q: queue.Queue = queue.Queue(maxsize=self.depth)
+        rendered_q: queue.Queue = queue.Queue(maxsize=self.depth)
+        output_q = self._output_q = queue.Queue()
+
+        def feed_frames():
+            for idx, frame in enumerate(frames):
+                yield idx, frame, None
+
+        stages = [
+            ('prepare', self._stage_loop, ('prepare', lambda: feed_frames(), prepared_q,
+                                           lambda idx, frame, _: self.prepare(idx, frame), output_q)),
+        ]
+        if self.validate is None:
+            stages += [
+                ('render', self._stage_loop, ('render', lambda: self._drain(prepared_q), rendered_q,
+                                              lambda idx, frame, prepared: self.render(idx, frame, prepared),
+                                              output_q)),
+                ('save', self._stage_loop, ('save', lambda: self._drain(rendered_q), output_q,
+                                            lambda idx, frame, rendered: self.save(idx, frame, rendered),
+                                            output_q)),
+            ]
+        else:
+            validated_q: queue.Queue = queue.Queue(maxsize=self.depth)
+            retry_q: queue.Queue = queue.Queue()  # Unbounded: the validate stage must never block on it
+            self._pending = 0
+            stages += [
+                ('render', self._render_loop, (prepared_q, retry_q, rendered_q, output_q)),
+                ('validate', self._validate_loop, (rendered_q, retry_q, validated_q, output_q)),
+                ('save', self._stage_loop, ('save', lambda: self._drain(validated_q), output_q,
+                                            lambda idx, frame, result: self.save(idx, frame, result),
+                                            output_q)),
+            ]
+
+        for name, target, args in stages:
+            thread = threading.Thread(target=target, args=args, name=f"frame-pipeline-{name}", daemon=True)
+            thread.start()
+
+        try:
+            while True:
+                item = output_q.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, StageError):
+                    raise item.error
+                if item[0] == 'event':
+                    yield item
+                    continue
+                idx, _, finished = item
+                yield 'frame', idx, finished
+        finally:
+            # Consumer finished or went away: unblock and stop every stage
+            self._stop.set()
+
+    def _drain(self, source: queue.Queue) -> Iterator[Tuple[int, Dict[str, Any], Any]]:
+        """Read items from an upstream queue until it signals completion"""
+        while not self._stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def _put(self, target: queue.Queue, item: Any) -> bool:
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _stage_loop(self, name, source, target, work, output_q):
+        try:
+            for idx, frame, payload in source():
+                result = work(idx, frame, payload)
+                if not self._put(target, (idx, frame, result)):
+                    return
+            self._put(target, _DONE)
+        except BaseException as e:
+            self._stop.set()
+            output_q.put(StageError(name, e))
+
+    def _render_loop(self, prepared_q, retry_q, rendered_q, output_q):
+        """Render new frames and regenerations (first); done once no frame can come back"""
+        try:
+            upstream_done = False
+            while not self._stop.is_set():
+                retry = None
+                try:
+                    retry = retry_q.get_nowait()
+                except queue.Empty:
+                    if upstream_done:
+                        with self._pending_lock:
+                            if self._pending == 0 and retry_q.empty():
+                                break
+                        try:
+                            retry = retry_q.get(timeout=0.1)
+                        except queue.Empty:
+                            continue
+
+                if retry is not None:
+                    idx, frame, attempt, best = retry
+                    rendered = self.regenerate(idx, frame, attempt)
+                else:
+                    try:
+                        item = prepared_q.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is _DONE:
+                        upstream_done = True
+                        continue
+                    idx, frame, prepared = item
+                    attempt, best = 0, None
+                    rendered = self.render(idx, frame, prepared)
+
+                with self._pending_lock:
+                    self._pending += 1
+                if not self._put(rendered_q, (idx, frame, (rendered, attempt, best))):
+                    return
+            self._put(rendered_q, _DONE)
+        except BaseException as e:
+            self._stop.set()
+            output_q.put(StageError('render', e))
+
+    def _validate_loop(self, rendered_q, retry_q, validated_q, output_q):
+        """Score renders; pass them on, or send them back for another attempt"""
+        try:
+            for idx, frame, (rendered, attempt, best) in self._drain(rendered_q):
+                passed, score = self.validate(idx, frame, rendered, attempt)
+                if best is None or (score is not None and (best[0] is None or score > best[0])):
+                    best = (score, rendered)
+                retry = not passed and attempt < self.max_regenerations
+                with self._pending_lock:
+                    if retry:
+                        retry_q.put((idx, frame, attempt + 1, best))
+                    self._pending -= 1
+                if retry:
+                    continue
+                result = Validated(rendered, score, True, attempt) if passed else Validated(best[1], best[0], False, attempt)
+                if not self._put(validated_q, (idx, frame, result)):
+                    return
+            self._put(validated_q, _DONE)
+        except BaseException as e:
+            self._stop.set()
+            output_q.put(StageError('validate', e))
+
+
+class ConcurrentFramePipeline:
+    """
+    One blocking call per frame on a shared executor, results in completion order
+
+    For backends where a frame is a remote call (DALL·E) rather than local
+    compute. A feeder thread submits frames as they arrive (the plan may
+    still be streaming); the executor bounds how many run at once. Output
+    follows FramePipeline's protocol, so consumers can use either.
+    """
+
+    def __init__(self, work: Callable[[int, Dict[str, Any]], Dict[str, Any]], executor, cancel_token=None):
+        """
+        Initialize the pipeline
+
+        Args:
+            work: (index, frame) -> finished frame dict
+            executor: ImageAPIExecutor (see image_api_executor.py)
+            cancel_token: Optional CancelToken checked before each call starts
+        """
+        self.work = work
+        self.executor = executor
+        self.cancel_token = cancel_token
+        self._stop = threading.Event()
+        self._output_q: queue.Queue = queue.Queue()
+
+    def publish(self, index: int, event: Dict[str, Any]):
+        """Send a side event for frame `index` to the consumer (thread-safe)"""
+        if not self._stop.is_set():
+            self._output_q.put(('event', index, event))
+
+    def run(self, frames: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+        """
+        Submit every frame and yield results as they complete
+
+        Yields:
+            ('frame', index, finished_frame) in completion order, interleaved
+            with ('event', index, event) for published side events
+        """
+        self._stop.clear()
+        output_q = self._output_q = queue.Queue()
+        futures = []
+        futures_lock = threading.Lock()
+
+        def on_done(idx, future):
+            if future.cancelled() or self._stop.is_set():
+                return
+            error = future.exception()
+            output_q.put(StageError('render', error) if error else ('frame', idx, future.result()))
+
+        def feed():
+            count = 0
+            try:
+                for idx, frame in enumerate(frames):
+                    if self._stop.is_set():
+                        return
+                    future = self.executor.submit(self.work, idx, frame, cancel_token=self.cancel_token)
+                    with futures_lock:
+                        futures.append(future)
+                    future.add_done_callback(lambda f, idx=idx: on_done(idx, f))
+                    count += 1
+                output_q.put(('submitted', count, None))
+            except BaseException as e:
+                output_q.put(StageError('prepare', e))
+
+        threading.Thread(target=feed, name="frame-pipeline-feed", daemon=True).start()
+
+        total = None
+        finished = 0
+        try:
+            while total is None or finished < total:
+                item = output_q.get()
+                if isinstance(item, StageError):
+                    raise item.error
+                if item[0] == 'submitted':
+                    total = item[1]
+                    continue
+                if item[0] == 'frame':
+                    finished += 1
+                yield item
+        finally:
+            # Consumer finished or went away: drop calls that haven't started
+            self._stop.set()
+            with futures_lock:
+                for future in futures:
+                    future.cancel()
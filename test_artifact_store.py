@@ -0,0 +1,141 @@
+"""
+Behavior tests for the content-addressed artifact store (artifact_store.py)
+Run with `python test_artifact_store.py` (or pytest)
+"""
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import config
+from artifact_store import ArtifactStore, get_artifact_store
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def test_writers_run_in_parallel():
+    """Writes of different content are not serialized on the store lock"""
+    _section("Test 1: Parallel writes")
+
+    real_fsync = os.fsync
+
+    def slow_fsync(fd):
+        time.sleep(0.2)
+        real_fsync(fd)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ArtifactStore(root, '/static/generated')
+        os.fsync = slow_fsync
+        try:
+            threads = [threading.Thread(target=store.put_bytes, args=(f"frame {i}".encode(), '.png'))
+                       for i in range(4)]
+            start = time.time()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.time() - start
+        finally:
+            os.fsync = real_fsync
+        assert store.stats()['writes'] == 4
+        assert elapsed < 0.6, elapsed
+    print(f"✓ 4 writes with a 200ms fsync each took {elapsed * 1000:.0f}ms")
+
+
+def test_artifact_store_dedup_and_atomic_writes():
+    """Same bytes are stored once; no temp files are left behind"""
+    _section("Test 2: ArtifactStore dedup and atomic writes")
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ArtifactStore(root, '/static/generated')
+        first = store.put_bytes(b'frame bytes', '.PNG', kind='frame', metadata={'name': 'frame_001'})
+        second = store.put_bytes(b'frame bytes', '.png', kind='frame', metadata={'name': 'frame_002'})
+
+        assert not first.deduplicated and second.deduplicated
+        assert first.path == second.path and first.url == second.url
+        assert first.url == f"/static/generated/{first.sha256[:2]}/{first.sha256}.png"
+        assert ArtifactStore.is_content_addressed(first.relpath)
+        assert store.read_metadata(first.relpath)['name'] == 'frame_001'
+        assert store.stats()['writes'] == 1 and store.stats()['dedup_hits'] == 1
+        print("✓ Identical bytes share one file; the first sidecar is kept")
+
+        def put(i):
+            store.put_bytes(f"frame {i % 4}".encode(), '.png')
+
+        threads = [threading.Thread(target=put, args=(i,)) for i in range(32)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        names = [name for _, _, files in os.walk(root) for name in files]
+        assert not [name for name in names if name.endswith('.tmp')]
+        assert len([name for name in names if name.endswith('.png')]) == 5
+        print("✓ Concurrent writers leave complete files and no temp files")
+
+        source = Path(root) / 'render.pdf'
+        source.write_bytes(b'%PDF-1.4')
+        exported = store.put_file(source, kind='export')
+        assert exported.path.read_bytes() == b'%PDF-1.4' and not source.exists()
+        print("✓ put_file moves a rendered file into the store")
+
+
+def test_url_prefix_follows_the_served_directory():
+    """Stores get the URL of the route serving their directory, never a guessed one"""
+    _section("Test 3: URL prefixes")
+
+    with tempfile.TemporaryDirectory() as generated, tempfile.TemporaryDirectory() as exports, \
+            _Override(OUTPUT_DIR=Path(generated), EXPORTS_DIR=Path(exports)):
+        assert get_artifact_store().url_prefix == '/static/generated'
+        assert get_artifact_store(exports).url_prefix == '/static/exports'
+    print("✓ OUTPUT_DIR and EXPORTS_DIR map to their routes wherever they live")
+
+    assert get_artifact_store(config.BASE_DIR / 'static' / 'renders').url_prefix == '/static/renders'
+    print("✓ Other directories under static/ get matching /static/... URLs")
+
+    with tempfile.TemporaryDirectory() as elsewhere:
+        try:
+            get_artifact_store(elsewhere)
+            raise AssertionError("get_artifact_store() should have raised")
+        except ValueError as e:
+            assert 'url_prefix' in str(e)
+        assert get_artifact_store(elsewhere, url_prefix='/media/').url_prefix == '/media'
+    print("✓ Unserved directories need an explicit url_prefix")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing artifact store")
+    print("=" * 60)
+    print()
+
+    test_writers_run_in_parallel()
+    test_artifact_store_dedup_and_atomic_writes()
+    test_url_prefix_follows_the_served_directory()
+
+    print()
+    print("=" * 60)
+    print("All artifact store tests passed!")
+    print("=" * 60)
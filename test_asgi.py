@@ -0,0 +1,207 @@
+"""
+Behavior tests for the ASGI entry point's job stream pump (asgi.py)
+Jobs are fed by hand, so no API key or GPU is needed; run with
+`python test_asgi.py` (or pytest)
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from flask import Flask, jsonify, request
+
+import config
+from app import job_stream_response
+from asgi import StoryboardASGI
+from job_queue import Job
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def _server(jobs, max_threads=2):
+    """ASGI app over a Flask app that streams hand-made jobs"""
+    flask_app = Flask(__name__)
+
+    @flask_app.route('/jobs/<job_id>/stream')
+    def stream(job_id):
+        return job_stream_response(jobs[job_id], after=int(request.args.get('after', 0)))
+
+    @flask_app.route('/health')
+    def health():
+        return jsonify({'ok': True})
+
+    return StoryboardASGI(flask_app, max_threads=max_threads)
+
+
+def _scope(path, query=b''):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': []}
+
+
+class _Client:
+    """Records sent messages; sends http.disconnect once disconnect() is called"""
+
+    def __init__(self):
+        self.messages = []
+        self.requested = False
+        self.gone = None
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.gone.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    def disconnect(self, loop):
+        loop.call_soon_threadsafe(self.gone.set)
+
+    @property
+    def status(self):
+        return self.messages[0]['status']
+
+    @property
+    def events(self):
+        body = b''.join(m.get('body', b'') for m in self.messages[1:])
+        return [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+
+    @property
+    def complete(self):
+        return bool(self.messages) and self.messages[-1].get('more_body') is False
+
+
+async def _request(server, scope, client):
+    client.gone = asyncio.Event()
+    await server(scope, client.receive, client.send)
+
+
+def _finished_job(*events):
+    job = Job("a fox and a merchant")
+    for event in events:
+        job.emit(event)
+    job.mark_finished()
+    return job
+
+
+def test_stream_is_written_and_resumable():
+    """Buffered and live events are pumped in order; ?after= resumes"""
+    _section("Test 1: Streamed events and resume")
+
+    job = Job("a fox and a merchant")
+    job.emit({"type": "story", "aldar_story": "..."})
+    server = _server({job.id: job})
+
+    def finish_later():
+        time.sleep(0.1)
+        job.emit({"type": "frame", "index": 0, "frame": {"image_url": "/a.png"}})
+        job.emit({"type": "complete", "success": True})
+        job.mark_finished()
+
+    threading.Thread(target=finish_later).start()
+    client = _Client()
+    asyncio.run(_request(server, _scope(f'/jobs/{job.id}/stream'), client))
+    assert client.status == 200 and client.complete
+    assert [e['type'] for e in client.events] == ['story', 'frame', 'complete']
+    print("✓ Events emitted while streaming arrived in order; the body was closed")
+
+    client = _Client()
+    asyncio.run(_request(server, _scope(f'/jobs/{job.id}/stream', b'after=2'), client))
+    assert [e['id'] for e in client.events] == [3]
+    print("✓ ?after=2 replayed only event 3")
+
+
+def test_disconnect_detaches_and_cancels():
+    """A client that goes away stops the pump; the job is cancelled after the grace period"""
+    _section("Test 2: Disconnect")
+
+    job = Job("abandoned", options={'cancel_on_disconnect': True})
+    job.emit({"type": "story", "aldar_story": "..."})
+    server = _server({job.id: job})
+    client = _Client()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.1, client.disconnect, loop)
+        await asyncio.wait_for(_request(server, _scope(f'/jobs/{job.id}/stream'), client), 5)
+
+    with _Override(CANCEL_ON_DISCONNECT_GRACE=0.05):
+        asyncio.run(run())
+        deadline = time.time() + 5
+        while not job.cancel_token.cancelled and time.time() < deadline:
+            time.sleep(0.01)
+    assert [e['type'] for e in client.events] == ['story'] and not client.complete
+    assert job.cancel_token.cancelled and job.cancel_token.reason == 'client disconnected'
+    print("✓ Pump stopped on http.disconnect and the orphaned job was cancelled")
+
+    job = _finished_job({"type": "complete", "success": True})
+    job.options['cancel_on_disconnect'] = True
+    client = _Client()
+    asyncio.run(_request(_server({job.id: job}), _scope(f'/jobs/{job.id}/stream'), client))
+    assert client.complete and not job.cancel_token.cancelled
+    print("✓ A stream that ran to completion cancels nothing")
+
+
+def test_open_streams_do_not_hold_threads():
+    """Plain requests are answered while streams are open, even with one HTTP thread"""
+    _section("Test 3: Streams run on the event loop")
+
+    waiting = [Job(f"waiting {i}") for i in range(3)]
+    server = _server({job.id: job for job in waiting}, max_threads=1)
+    streams = [_Client() for _ in waiting]
+    health = _Client()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        tasks = [asyncio.ensure_future(_request(server, _scope(f'/jobs/{job.id}/stream'), client))
+                 for job, client in zip(waiting, streams)]
+        await asyncio.sleep(0.1)
+        await asyncio.wait_for(_request(server, _scope('/health'), health), 5)
+        for client in streams:
+            client.disconnect(loop)
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    asyncio.run(run())
+    assert health.status == 200 and health.complete
+    assert json.loads(b''.join(m.get('body', b'') for m in health.messages[1:])) == {'ok': True}
+    assert all(client.status == 200 for client in streams)
+    print("✓ /health answered while 3 streams were open on a 1-thread pool")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing ASGI stream pump")
+    print("=" * 60)
+    print()
+
+    test_stream_is_written_and_resumable()
+    test_disconnect_detaches_and_cancels()
+    test_open_streams_do_not_hold_threads()
+
+    print()
+    print("=" * 60)
+    print("All ASGI tests passed!")
+    print("=" * 60)
@@ -0,0 +1,126 @@
+"""
+Behavior tests for cross-request micro-batching (batch_scheduler.py)
+pipe() is replaced by a recorder, so no torch or GPU is needed; run with
+`python test_batch_scheduler.py` (or pytest)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from batch_scheduler import BatchScheduler
+from cancellation import CancelToken, GenerationCancelled
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _GatedManager:
+    """Model manager stand-in whose acquire() blocks until opened"""
+
+    def __init__(self, open_=True):
+        self.gate = threading.Event()
+        if open_:
+            self.gate.set()
+
+    @contextmanager
+    def acquire(self):
+        self.gate.wait(5)
+        yield 'pipe'
+
+
+class _RecordingScheduler(BatchScheduler):
+    """Renders each prompt as its upper-cased text and records every batch"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def _render(self, pipe, batch):
+        self.batches.append([request.prompt for request in batch])
+        return [request.prompt.upper() for request in batch]
+
+
+def _submit(scheduler, prompt, width=64, steps=2, cancel_token=None):
+    return scheduler.submit(prompt, '', steps, 5.0, width=width, height=64, cancel_token=cancel_token)
+
+
+def test_compatible_frames_share_a_batch():
+    """Frames are grouped by resolution/steps/guidance within the wait window"""
+    _section("Test 1: Grouping by batch key")
+
+    scheduler = _RecordingScheduler(_GatedManager(), 'cpu', max_batch_size=4, max_wait=0.1)
+    futures = [_submit(scheduler, p) for p in ('a', 'b', 'c')]
+    futures.append(_submit(scheduler, 'wide', width=128))
+    results = [f.result(5) for f in futures]
+
+    assert results == ['A', 'B', 'C', 'WIDE']
+    assert sorted(scheduler.batches) == [['a', 'b', 'c'], ['wide']]
+    print(f"✓ Batches: {scheduler.batches}")
+
+
+def test_batch_size_and_memory_limits():
+    """Groups are split by max_batch_size and by the pixel budget"""
+    _section("Test 2: Batch limits")
+
+    scheduler = _RecordingScheduler(_GatedManager(), 'cpu', max_batch_size=2, max_wait=0.1)
+    futures = [_submit(scheduler, str(i)) for i in range(5)]
+    for f in futures:
+        f.result(5)
+    assert [len(b) for b in scheduler.batches] == [2, 2, 1]
+    print("✓ 5 frames with max_batch_size=2 ran as 2 + 2 + 1")
+
+    scheduler = _RecordingScheduler(_GatedManager(), 'cpu', max_batch_size=8, max_wait=0.1,
+                                    max_batch_pixels=3 * 64 * 64)
+    futures = [_submit(scheduler, str(i)) for i in range(4)]
+    for f in futures:
+        f.result(5)
+    assert [len(b) for b in scheduler.batches] == [3, 1]
+    print("✓ Pixel budget of 3 frames split 4 frames into 3 + 1")
+
+
+def test_cancelled_frames_are_dropped_before_pipe():
+    """Frames cancelled while their batch waited for the pipeline are never rendered"""
+    _section("Test 3: Cancellation")
+
+    manager = _GatedManager(open_=False)
+    scheduler = _RecordingScheduler(manager, 'cpu', max_batch_size=4, max_wait=0.01)
+    gone, kept = CancelToken(), CancelToken()
+    gone_future = _submit(scheduler, 'gone', cancel_token=gone)
+    kept_future = _submit(scheduler, 'kept', cancel_token=kept)
+
+    time.sleep(0.1)  # The batch is now waiting for the pipeline
+    gone.cancel('client disconnected')
+    manager.gate.set()
+
+    assert kept_future.result(5) == 'KEPT'
+    assert isinstance(gone_future.exception(5), GenerationCancelled)
+    assert scheduler.batches == [['kept']]
+    print("✓ Cancelled member failed with GenerationCancelled, the rest rendered without it")
+
+    scheduler = _RecordingScheduler(_GatedManager(), 'cpu', max_batch_size=4, max_wait=0.1)
+    token = CancelToken()
+    token.cancel('before dispatch')
+    abandoned = _submit(scheduler, 'abandoned', cancel_token=token)
+    assert isinstance(abandoned.exception(5), GenerationCancelled)
+    assert scheduler.batches == []
+    print("✓ A batch whose members were all cancelled never reaches pipe()")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing batch scheduler")
+    print("=" * 60)
+    print()
+
+    test_compatible_frames_share_a_batch()
+    test_batch_size_and_memory_limits()
+    test_cancelled_frames_are_dropped_before_pipe()
+
+    print()
+    print("=" * 60)
+    print("All batch scheduler tests passed!")
+    print("=" * 60)
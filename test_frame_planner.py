@@ -0,0 +1,145 @@
+"""
+Behavior tests for streamed frame planning (frame_planner.py)
+The LLM client is replaced by canned chunks; run with
+`python test_frame_planner.py` (or pytest)
+"""
+
+import json
+import random
+import types
+
+import frame_planner
+from frame_planner import FrameArrayParser, MAX_FRAMES, stream_frame_plan
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+def _frame(n, **changes):
+    frame = {
+        'rhyme': f"Rhyme {n}",
+        'moral': 'wisdom',
+        'shot_type': 'wide',
+        'setting': 'steppe',
+        'key_objects': ['horse'],
+        'lighting_hint': 'golden hour',
+        'description': f"Aldar Köse, scene {n}",
+    }
+    frame.update(changes)
+    return {key: value for key, value in frame.items() if value is not None}
+
+
+class _FakeClient:
+    """chat_stream() replays a reply in small chunks, optionally failing part-way"""
+
+    def __init__(self, reply, fail_after=None):
+        self.reply = reply
+        self.fail_after = fail_after
+
+    def chat_stream(self, name, **kwargs):
+        for start in range(0, len(self.reply), 20):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise ConnectionError("stream reset")
+            delta = types.SimpleNamespace(content=self.reply[start:start + 20])
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+
+def _plan(reply, fail_after=None):
+    """(frames, plan status) from stream_frame_plan over a canned reply"""
+    saved = frame_planner.get_llm_client
+    frame_planner.get_llm_client = lambda: _FakeClient(reply, fail_after)
+    try:
+        plan = {}
+        frames = list(stream_frame_plan([], 'gpt-test', plan=plan))
+        return frames, plan
+    finally:
+        frame_planner.get_llm_client = saved
+
+
+def test_frame_array_parser_chunk_boundaries():
+    """Objects come out the same no matter where the reply is split"""
+    _section("Test 1: FrameArrayParser chunk boundaries")
+
+    frames = [
+        {"frame": 1, "description": "Aldar rides in {laughing}", "rhyme": "a [bracket] \"quote\""},
+        {"frame": 2, "description": "The bai counts coins \\ slowly", "setting": "bazaar"},
+        {"frame": 3, "nested": {"a": [1, 2, {"b": "}"}]}},
+    ]
+    reply = "```json\n" + json.dumps(frames, ensure_ascii=False) + "\n```"
+
+    for size in [1, 2, 3, 7, 16, len(reply)]:
+        parser = FrameArrayParser()
+        parsed = []
+        for start in range(0, len(reply), size):
+            parsed.extend(parser.feed(reply[start:start + size]))
+        assert parsed == frames, f"chunk size {size}"
+        assert parser.finished and parser.skipped == 0
+
+    rng = random.Random(7)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(1, len(reply)), 5))
+        parser = FrameArrayParser()
+        parsed = []
+        for start, end in zip([0] + cuts, cuts + [len(reply)]):
+            parsed.extend(parser.feed(reply[start:end]))
+        assert parsed == frames
+    print("✓ Same frames for fixed and random chunk boundaries (strings, escapes, nesting)")
+
+    parser = FrameArrayParser()
+    parsed = parser.feed('[{"frame": 1}, {"frame": 2,, }, {"frame": 3}]')
+    assert parsed == [{"frame": 1}, {"frame": 3}] and parser.skipped == 1
+    print("✓ Malformed objects are skipped and counted")
+
+
+def test_streamed_frames_are_validated():
+    """Frames that break the schema are dropped before anyone renders them"""
+    _section("Test 2: Schema validation")
+
+    good = [_frame(1), _frame(3)]
+    reply = json.dumps([good[0], _frame(2, shot_type=None), good[1], _frame(4, moral='greed')])
+    frames, plan = _plan(reply)
+    assert frames == good and plan == {'truncated': False}
+    print("✓ Frames missing shot_type or with an unknown moral were dropped")
+
+
+def test_plan_is_capped_at_max_frames():
+    """At most MAX_FRAMES frames are yielded; a capped plan is not truncated"""
+    _section("Test 3: MAX_FRAMES cap")
+
+    frames, plan = _plan(json.dumps([_frame(i) for i in range(MAX_FRAMES + 3)]))
+    assert len(frames) == MAX_FRAMES and not plan['truncated']
+    print(f"✓ {MAX_FRAMES + 3} planned frames capped at {MAX_FRAMES}")
+
+
+def test_broken_stream_marks_the_plan_truncated():
+    """A stream that fails or stops before ']' keeps its frames but flags the plan"""
+    _section("Test 4: Truncated plans")
+
+    reply = json.dumps([_frame(i) for i in range(6)])
+    frames, plan = _plan(reply, fail_after=len(reply) // 2)
+    assert 0 < len(frames) < 6 and plan['truncated']
+    print(f"✓ Stream reset after {len(frames)} frames: plan marked truncated")
+
+    frames, plan = _plan(reply[:len(reply) // 2])
+    assert 0 < len(frames) < 6 and plan['truncated']
+    print("✓ Reply cut off before ']' (max_tokens): plan marked truncated")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing frame planner")
+    print("=" * 60)
+    print()
+
+    test_frame_array_parser_chunk_boundaries()
+    test_streamed_frames_are_validated()
+    test_plan_is_capped_at_max_frames()
+    test_broken_stream_marks_the_plan_truncated()
+
+    print()
+    print("=" * 60)
+    print("All frame planner tests passed!")
+    print("=" * 60)
@@ -0,0 +1,58 @@
+"""
+Behavior tests for image API rate limiting (image_api_executor.py)
+Run with `python test_image_api_executor.py` (or pytest); needs no API key
+"""
+
+import threading
+import time
+
+from cancellation import CancelToken, GenerationCancelled
+from image_api_executor import TokenBucket
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+def test_token_bucket():
+    """Burst up to capacity, then one token per 1/rate seconds"""
+    _section("Test 1: TokenBucket")
+
+    bucket = TokenBucket(rate=20, capacity=3)
+    waits = [bucket.acquire() for _ in range(3)]
+    assert all(w < 0.01 for w in waits)
+    start = time.monotonic()
+    bucket.acquire()
+    waited = time.monotonic() - start
+    assert 0.03 <= waited < 0.2, waited
+    print(f"✓ Burst of 3 free, 4th waited {waited * 1000:.0f}ms (rate 20/s)")
+
+    assert TokenBucket(rate=0, capacity=1).acquire() == 0.0
+    print("✓ Rate 0 disables limiting")
+
+    slow = TokenBucket(rate=0.1, capacity=1)
+    slow.acquire()
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel, args=('test',)).start()
+    try:
+        slow.acquire(cancel_token=token)
+        raise AssertionError("acquire() should have been cancelled")
+    except GenerationCancelled:
+        pass
+    print("✓ Waiting acquire() stops when cancelled")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing image API executor")
+    print("=" * 60)
+    print()
+
+    test_token_bucket()
+
+    print()
+    print("=" * 60)
+    print("All image API executor tests passed!")
+    print("=" * 60)
@@ -0,0 +1,175 @@
+"""
+Behavior tests for the background image writer (image_writer.py)
+Run with `python test_image_writer.py` (or pytest); needs Pillow only
+"""
+
+import tempfile
+import threading
+
+from PIL import Image
+
+import config
+from image_writer import ImageWriter
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def _image(color='red', size=(64, 48)):
+    return Image.new('RGB', size, color)
+
+
+class _GatedWriter(ImageWriter):
+    """Holds every derivative pass until release is set; fails it if fail is set"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.fail = False
+
+    def _write_derivatives(self, image, stem, output_dir):
+        self.release.wait(5)
+        if self.fail:
+            raise OSError("disk full")
+        return super()._write_derivatives(image, stem, output_dir)
+
+
+_DERIVATIVES = {
+    'thumb': {'max_size': 16, 'format': 'webp'},
+    'print': {'max_size': None, 'format': 'jpeg'},
+}
+
+
+def test_saves_every_format():
+    """Each format round-trips through the pool to a content-addressed file"""
+    _section("Test 1: Output formats")
+
+    with tempfile.TemporaryDirectory() as root, _Override(OUTPUT_DIR=root, ENABLE_IMAGE_DERIVATIVES=False):
+        writer = ImageWriter(max_workers=2, default_format='png')
+        for image_format, pil_format in [('png', 'PNG'), ('webp_lossless', 'WEBP'), ('jpeg', 'JPEG')]:
+            saved = writer.submit(_image(), 'frame_001', image_format=image_format).result(10)
+            assert saved.path.exists() and saved.path.name == f"{saved.sha256}{saved.path.suffix}"
+            assert saved.url == f"/static/generated/{saved.sha256[:2]}/{saved.path.name}"
+            with Image.open(saved.path) as stored:
+                assert stored.format == pil_format and stored.size == (64, 48)
+            assert not saved.variants_pending and saved.variants == {}
+        assert set(writer.stats()) == {'png', 'webp_lossless', 'jpeg'}
+    print("✓ png, lossless webp and jpeg stored and decodable; stats per format")
+
+
+def test_identical_frames_are_deduplicated():
+    """Saving the same pixels twice reuses the stored file"""
+    _section("Test 2: Deduplication")
+
+    with tempfile.TemporaryDirectory() as root, _Override(OUTPUT_DIR=root, ENABLE_IMAGE_DERIVATIVES=False):
+        writer = ImageWriter(max_workers=2, default_format='png')
+        first = writer.save(_image('blue'), 'frame_001')
+        second = writer.save(_image('blue'), 'frame_002')
+        assert not first.deduplicated and second.deduplicated and first.path == second.path
+    print("✓ Second save of the same image was deduplicated")
+
+
+def test_unknown_format_is_rejected():
+    """Bad formats fail at submit time, not on the pool"""
+    _section("Test 3: Unknown formats")
+
+    try:
+        ImageWriter(default_format='gif')
+        raise AssertionError("ImageWriter() should have raised")
+    except ValueError:
+        pass
+    try:
+        ImageWriter(max_workers=1, default_format='png').submit(_image(), 'x', image_format='bmp')
+        raise AssertionError("submit() should have raised")
+    except ValueError:
+        pass
+    print("✓ ValueError for unknown formats")
+
+
+def test_variants_follow_the_original():
+    """The original resolves first; derivatives arrive later via on_variants / wait_variants"""
+    _section("Test 4: Derivatives")
+
+    with tempfile.TemporaryDirectory() as root, _Override(OUTPUT_DIR=root, ENABLE_IMAGE_DERIVATIVES=True,
+                                                          IMAGE_DERIVATIVES=_DERIVATIVES):
+        writer = _GatedWriter(max_workers=2, default_format='png')
+        saved = writer.save(_image('green'), 'frame_001')
+        assert saved.path.exists() and saved.variants_pending and saved.variants == {}
+        assert saved.apply_to({})['image_variants'] == {'original': saved.url}
+        print("✓ Original delivered while its derivatives were still pending")
+
+        delivered = threading.Event()
+        saved.on_variants(lambda s: delivered.set())
+        assert not delivered.is_set()
+        writer.release.set()
+        assert delivered.wait(5) and not saved.variants_pending
+        assert set(saved.wait_variants()) == {'thumb', 'print'}
+        with Image.open(saved.variants['thumb'].path) as thumb:
+            assert thumb.format == 'WEBP' and max(thumb.size) == 16
+        with Image.open(saved.variants['print'].path) as full:
+            assert full.format == 'JPEG' and full.size == (64, 48)
+        print("✓ on_variants fired once thumb (16px webp) and print (full-size jpeg) were stored")
+
+        frame = saved.apply_to({'description': 'Aldar at the bazaar'})
+        assert set(frame['image_variants']) == {'original', 'thumb', 'print'}
+        assert frame['image_variants']['thumb'] == saved.variants['thumb'].url
+        assert frame['image_variant_paths']['print'] == str(saved.variants['print'].path)
+        print("✓ apply_to records every variant's URL and path")
+
+        called = []
+        saved.on_variants(called.append)
+        assert called == [saved]
+        print("✓ on_variants after completion runs right away")
+
+
+def test_failed_variants_leave_the_original():
+    """A failed derivative pass is logged and leaves the frame with its original only"""
+    _section("Test 5: Failed derivatives")
+
+    with tempfile.TemporaryDirectory() as root, _Override(OUTPUT_DIR=root, ENABLE_IMAGE_DERIVATIVES=True,
+                                                          IMAGE_DERIVATIVES=_DERIVATIVES):
+        writer = _GatedWriter(max_workers=1, default_format='png')
+        writer.fail = True
+        writer.release.set()
+        saved = writer.save(_image('yellow'), 'frame_001')
+        assert saved.wait_variants(5) == {} and saved.path.exists()
+        assert saved.apply_to({})['image_variants'] == {'original': saved.url}
+    print("✓ wait_variants() returned no variants; the original is still served")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing image writer")
+    print("=" * 60)
+    print()
+
+    test_saves_every_format()
+    test_identical_frames_are_deduplicated()
+    test_unknown_format_is_rejected()
+    test_variants_follow_the_original()
+    test_failed_variants_leave_the_original()
+
+    print()
+    print("=" * 60)
+    print("All image writer tests passed!")
+    print("=" * 60)
@@ -0,0 +1,200 @@
+"""
+Behavior tests for the background job queue (job_queue.py)
+Run with `python test_job_queue.py` (or pytest); needs no API key or GPU
+"""
+
+import threading
+import time
+
+import config
+from job_queue import Job, JobQueue, QueueFullError, frames_from_events
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_jobs_run_on_worker():
+    """A submitted job runs on a worker thread and records its events"""
+    _section("Test 1: Jobs run on the worker")
+
+    def handler(job):
+        job.emit({"type": "frame", "index": 0, "frame": {"image_url": "/a.png"}})
+        job.emit({"type": "complete", "success": True})
+
+    jobs = JobQueue(handler, max_size=4, num_workers=1)
+    job = jobs.submit("a fox and a merchant")
+    _wait_until(lambda: job.finished)
+
+    assert job.status == job.STATUS_COMPLETED
+    assert [e['type'] for e in job.events()] == ['frame', 'complete']
+    assert jobs.get(job.id) is job and jobs.workers_alive() == 1
+    print("✓ Job completed on the worker and is available for polling")
+
+
+def test_failed_jobs_report_errors():
+    """Handler exceptions become an 'error' event and a failed status"""
+    _section("Test 2: Failed jobs")
+
+    def handler(job):
+        raise ValueError("no frames")
+
+    jobs = JobQueue(handler, max_size=4, num_workers=1)
+    job = jobs.submit("broken")
+    _wait_until(lambda: job.finished)
+    assert job.status == job.STATUS_FAILED and job.error == "no frames"
+    assert job.events()[-1] == {'id': 1, 'type': 'error', 'message': 'no frames'}
+    print("✓ Error event emitted, status 'failed'")
+
+
+def test_full_queue_rejects_and_cancelled_jobs_never_run():
+    """Submissions beyond max_size raise; jobs cancelled while queued are skipped"""
+    _section("Test 3: Backpressure and cancellation while queued")
+
+    release = threading.Event()
+    ran = []
+
+    def handler(job):
+        ran.append(job.prompt)
+        release.wait(5)
+
+    jobs = JobQueue(handler, max_size=1, num_workers=1)
+    first = jobs.submit("first")
+    _wait_until(lambda: first.status == first.STATUS_RUNNING)
+    queued = jobs.submit("queued")
+    try:
+        jobs.submit("rejected")
+        raise AssertionError("submit() should have raised QueueFullError")
+    except QueueFullError as e:
+        assert e.retry_after >= 1
+    print("✓ Full queue answers QueueFullError with a Retry-After estimate")
+
+    assert jobs.cancel(queued.id) is queued
+    release.set()
+    _wait_until(lambda: queued.finished)
+    assert queued.status == queued.STATUS_CANCELLED and ran == ["first"]
+    print("✓ Job cancelled while queued never reached the handler")
+
+
+def test_job_replay_and_resume():
+    """Events get monotonic IDs and a client can resume after the last one it saw"""
+    _section("Test 4: Job replay buffer and resume")
+
+    job = Job("a fox and a merchant")
+    job.emit({"type": "story", "aldar_story": "..."})
+    job.emit({"type": "frame", "index": 0, "frame": {"image_url": "/a.png"}})
+    job.emit({"type": "frame_variants", "index": 0,
+              "image_variants": {"original": "/a.png", "thumb": "/a.webp"}, "image_variant_paths": {}})
+    job.emit({"type": "complete", "success": True})
+    job.mark_finished()
+
+    events = list(job.iter_events(after=0))
+    assert [e['id'] for e in events] == [1, 2, 3, 4]
+    resumed = list(job.iter_events(after=2))
+    assert [e['type'] for e in resumed] == ['frame_variants', 'complete']
+    print("✓ Resume after event 2 replays only events 3-4")
+
+    frames = frames_from_events(job.events())
+    assert frames == [{"image_url": "/a.png", "image_variants": {"original": "/a.png", "thumb": "/a.webp"},
+                       "image_variant_paths": {}}]
+    print("✓ Late derivative URLs are merged into the job's frames")
+
+
+def test_job_buffer_trimming():
+    """Only previews are evicted; frames survive an over-budget buffer"""
+    _section("Test 5: Replay buffer trimming")
+
+    with _Override(REPLAY_BUFFER_MAX_EVENTS=4, REPLAY_BUFFER_MAX_BYTES=10 ** 9):
+        job = Job("trim")
+        job.emit({"type": "story", "aldar_story": "..."})
+        for i in range(3):
+            job.emit({"type": "preview", "index": i, "image": "data:..."})
+            job.emit({"type": "frame", "index": i, "frame": {"image_url": f"/{i}.png"}})
+        types = [e['type'] for e in job.events()]
+    assert 'preview' not in types
+    assert types.count('frame') == 3
+    print(f"✓ Over budget: previews dropped, kept {types}")
+
+    job.emit({"type": "complete", "success": True})
+    job.mark_finished()
+    job.release_buffer()
+    resumed = list(job.iter_events(after=1))
+    assert resumed[0]['type'] == 'gap' and resumed[0]['after'] == 1
+    assert resumed[-1]['type'] == 'complete'
+    assert list(job.iter_events(after=job.last_event_id - 1))[0]['type'] == 'complete'
+    print("✓ Resuming from before a released buffer gets an explicit 'gap' event")
+
+
+def test_on_created_events_come_first():
+    """Events emitted by on_created precede anything the worker emits"""
+    _section("Test 6: Resume handle before worker events")
+
+    def handler(job):
+        job.emit({"type": "story", "aldar_story": "..."})
+
+    jobs = JobQueue(handler, max_size=4, num_workers=1)
+    for _ in range(20):
+        job = jobs.submit("race", on_created=lambda j: j.emit({"type": "job", "job_id": j.id}))
+        _wait_until(lambda: job.finished)
+        assert [e['type'] for e in job.events()] == ['job', 'story']
+    print("✓ The 'job' event was first in every run")
+
+
+def test_finished_jobs_expire_on_a_timer():
+    """Replay buffers are released without waiting for another submit()/get()"""
+    _section("Test 7: Timed expiry")
+
+    with _Override(JOB_EXPIRY_INTERVAL=0.05, REPLAY_BUFFER_TTL=0):
+        jobs = JobQueue(lambda job: job.emit({"type": "story", "aldar_story": "..."}),
+                        max_size=4, num_workers=1)
+        job = jobs.submit("expire")
+        _wait_until(lambda: job.finished)
+        _wait_until(lambda: job.buffer_released)
+    assert [e['type'] for e in job.events()] == []
+    print("✓ Buffer released by the janitor with no further requests")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing job queue")
+    print("=" * 60)
+    print()
+
+    test_jobs_run_on_worker()
+    test_failed_jobs_report_errors()
+    test_full_queue_rejects_and_cancelled_jobs_never_run()
+    test_job_replay_and_resume()
+    test_job_buffer_trimming()
+    test_on_created_events_come_first()
+    test_finished_jobs_expire_on_a_timer()
+
+    print()
+    print("=" * 60)
+    print("All job queue tests passed!")
+    print("=" * 60)
@@ -0,0 +1,68 @@
+"""
+Behavior tests for LLM call retries (llm_client.py)
+Run with `python test_llm_client.py` (or pytest); needs no API key or network
+"""
+
+from llm_client import _classify
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = _FakeResponse(status_code, headers)
+
+
+class _RequestsError(Exception):
+    """Like requests.HTTPError: the status only lives on .response"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _FakeResponse(status_code, headers)
+
+
+def test_llm_client_classify():
+    """Transient failures are retried, client errors are not"""
+    _section("Test 1: llm_client retry decisions")
+
+    for status in (408, 409, 429, 500, 502, 503):
+        assert _classify(_StatusError(status))[0], status
+    for status in (400, 401, 403, 404, 422):
+        assert not _classify(_StatusError(status))[0], status
+    print("✓ 408/409/429/5xx retried, other 4xx not")
+
+    assert _classify(_StatusError(429, {'retry-after': '7'})) == (True, 7.0)
+    assert _classify(_RequestsError(503, {'retry-after': 'soon'})) == (True, None)
+    assert _classify(_RequestsError(404)) == (False, None)
+    print("✓ Retry-After honored; status read from .response when missing")
+
+    for name in ('APIConnectionError', 'APITimeoutError', 'ConnectionError', 'ReadTimeout'):
+        assert _classify(type(name, (Exception,), {})())[0], name
+    assert not _classify(ValueError("bad json"))[0]
+    print("✓ Connection errors and timeouts retried, other exceptions not")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing LLM client")
+    print("=" * 60)
+    print()
+
+    test_llm_client_classify()
+
+    print()
+    print("=" * 60)
+    print("All LLM client tests passed!")
+    print("=" * 60)
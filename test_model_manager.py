@@ -0,0 +1,122 @@
+"""
+Behavior tests for shared model residency (model_manager.py)
+Uses a stand-in loader instead of SDXL; run with `python test_model_manager.py`
+(or pytest)
+"""
+
+import threading
+import time
+
+from model_manager import ModelManager
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Loader:
+    """Counts loads and returns a fresh stand-in pipeline each time"""
+
+    def __init__(self):
+        self.loads = 0
+
+    def __call__(self):
+        self.loads += 1
+        return object()
+
+
+def test_pipeline_is_shared_and_loaded_once():
+    """Every acquire() reuses the resident pipeline"""
+    _section("Test 1: One warm pipeline")
+
+    loader = _Loader()
+    manager = ModelManager(loader=loader, caching=True, idle_timeout=0)
+    with manager.acquire() as first:
+        pass
+    with manager.acquire() as second:
+        pass
+    assert first is second and loader.loads == 1 and manager.is_loaded
+    print("✓ Two generations, one load")
+
+    assert manager.unload() and not manager.is_loaded
+    with manager.acquire():
+        pass
+    assert loader.loads == 2
+    print("✓ Reloaded on demand after unload()")
+
+
+def test_acquire_is_exclusive():
+    """Only one thread holds the pipeline at a time"""
+    _section("Test 2: Serialized pipe() access")
+
+    manager = ModelManager(loader=_Loader(), caching=True, idle_timeout=0)
+    inside = []
+    overlaps = []
+
+    def generate():
+        with manager.acquire():
+            inside.append(1)
+            if len(inside) > 1:
+                overlaps.append(True)
+            time.sleep(0.02)
+            inside.pop()
+
+    threads = [threading.Thread(target=generate) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not overlaps
+    print("✓ Concurrent acquire() calls never overlapped")
+
+
+def test_idle_eviction_respects_holds():
+    """The idle watcher unloads after idle_timeout, but never while held"""
+    _section("Test 3: Idle eviction")
+
+    manager = ModelManager(loader=_Loader(), caching=True, idle_timeout=1)
+    with manager.hold():
+        with manager.acquire():
+            pass
+        time.sleep(2.5)
+        assert manager.is_loaded
+    print("✓ Held pipeline survived past the idle timeout")
+
+    deadline = time.time() + 5
+    while manager.stats()['events'][-1]['event'] != 'unload' and time.time() < deadline:
+        time.sleep(0.1)
+    assert not manager.is_loaded
+    assert manager.stats()['events'][-1]['reason'] == 'idle for 1s'
+    print("✓ Released pipeline was unloaded once idle")
+
+
+def test_caching_disabled_unloads_after_use():
+    """Without caching the pipeline is dropped when the last hold ends"""
+    _section("Test 4: Caching disabled")
+
+    manager = ModelManager(loader=_Loader(), caching=False)
+    with manager.hold():
+        with manager.acquire():
+            pass
+        assert manager.is_loaded
+    assert not manager.is_loaded
+    print("✓ Unloaded as soon as the last hold ended")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing model manager")
+    print("=" * 60)
+    print()
+
+    test_pipeline_is_shared_and_loaded_once()
+    test_acquire_is_exclusive()
+    test_idle_eviction_respects_holds()
+    test_caching_disabled_unloads_after_use()
+
+    print()
+    print("=" * 60)
+    print("All model manager tests passed!")
+    print("=" * 60)
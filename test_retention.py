@@ -0,0 +1,92 @@
+"""
+Behavior tests for generated file retention (retention.py)
+Run with `python test_retention.py` (or pytest); needs no API key or GPU
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import config
+from artifact_store import ArtifactStore
+from retention import RetentionCollector, RetentionPolicy
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def test_retention_keep_set_and_grace():
+    """Expired files go; referenced, pinned and young files stay"""
+    _section("Test 1: Retention keep-set and grace period")
+
+    # The collector deletes through the process-wide store for OUTPUT_DIR
+    with tempfile.TemporaryDirectory() as root, _Override(OUTPUT_DIR=Path(root)):
+        store = ArtifactStore(root, '/static/generated')
+        old = time.time() - 10 * 86400
+        artifacts = {}
+        for name in ('expired', 'referenced', 'pinned', 'young'):
+            artifacts[name] = store.put_bytes(name.encode() * 100, '.png', kind='frame')
+            if name != 'young':
+                os.utime(artifacts[name].path, (old, old))
+        # Companions are sized and removed together with their file
+        gz = artifacts['expired'].path.with_name(artifacts['expired'].path.name + '.gz')
+        gz.write_bytes(b'gz')
+        os.utime(gz, (old, old))
+
+        collector = RetentionCollector(
+            policies=[RetentionPolicy('generated', Path(root), max_age_days=7, max_bytes=10 ** 9)],
+            interval=3600, min_age=60, max_deletes=100
+        )
+        collector.add_reference_provider(lambda: [str(artifacts['referenced'].path)])
+
+        with collector.pinned([artifacts['pinned'].path]):
+            dry = collector.collect(dry_run=True)
+            assert dry['files_deleted'] == 1 and artifacts['expired'].path.exists()
+            report = collector.collect()
+
+        assert report['files_deleted'] == 1
+        assert not artifacts['expired'].path.exists() and not gz.exists()
+        for name in ('referenced', 'pinned', 'young'):
+            assert artifacts[name].path.exists(), name
+        print("✓ Only the unreferenced, unpinned expired file (and its companions) was removed")
+
+        collector.min_age = 30 * 86400
+        policy = collector.policies[0]
+        policy.max_bytes = 0
+        assert collector.collect()['files_deleted'] == 0
+        print("✓ Files inside the grace period survive even when over the size budget")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing retention")
+    print("=" * 60)
+    print()
+
+    test_retention_keep_set_and_grace()
+
+    print()
+    print("=" * 60)
+    print("All retention tests passed!")
+    print("=" * 60)
@@ -0,0 +1,62 @@
+"""
+Behavior tests for scene keyword matching (scene_rules.py)
+Run with `python test_scene_rules.py` (or pytest)
+"""
+
+import random
+
+import config
+from scene_rules import KeywordMatcher, SceneRules
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+def test_keyword_matcher_matches_substring_checks():
+    """find() returns exactly the keywords an `in` check would find"""
+    _section("Test 1: KeywordMatcher vs `keyword in text`")
+
+    keywords = ['he', 'she', 'his', 'hers', 'a', 'ab', 'bab', 'bc', 'bca', 'c', 'caa', 'yurt', 'юрта', '']
+    rng = random.Random(3)
+    for _ in range(500):
+        text = ''.join(rng.choice('abcehrsy юрта') for _ in range(rng.randint(0, 30)))
+        expected = {k for k in keywords if k and k in text}
+        assert KeywordMatcher(keywords).find(text) == expected, text
+    print("✓ 500 random texts match the substring checks")
+
+    rules = SceneRules.load(config.SCENE_RULES_PATH)
+    matcher_keywords = set()
+    for table in (rules.action, rules.setting):
+        for rule in table.get('rules', []):
+            matcher_keywords.update(rule['keywords'])
+    matcher_keywords.update(term for term, _ in rules.translations['terms'])
+    for words in rules.elements.get('categories', {}).values():
+        matcher_keywords.update(word.lower() for word in words)
+
+    samples = [
+        "Aldar Köse rides his horse across the steppe toward a yurt",
+        "The greedy bai counts gold coins at the crowded bazaar",
+        "Алдар Көсе смеётся у костра в юрте",
+        "",
+    ]
+    for text in samples:
+        lowered = text.lower()
+        assert rules.scan(text) == {k for k in matcher_keywords if k in lowered}, text
+    print(f"✓ scene_rules.json ({rules.keyword_count} keywords) scans match the substring checks")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing scene rules")
+    print("=" * 60)
+    print()
+
+    test_keyword_matcher_matches_substring_checks()
+
+    print()
+    print("=" * 60)
+    print("All scene rules tests passed!")
+    print("=" * 60)
@@ -0,0 +1,120 @@
+"""
+Behavior tests for generated file responses (static_server.py)
+Run with `python test_static_server.py` (or pytest); needs Flask
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+import config
+import static_server
+from artifact_store import ArtifactStore
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def test_static_etag_and_range():
+    """Strong ETags, 304 revalidation, byte ranges, no companion files"""
+    _section("Test 1: Static ETag / Range responses")
+
+    with tempfile.TemporaryDirectory() as root, _Override(SERVE_PRECOMPRESSED=True):
+        store = ArtifactStore(root, '/static/generated')
+        artifact = store.put_bytes(b'0123456789' * 100, '.svg')
+        artifact.path.with_name(artifact.path.name + '.gz').write_bytes(b'not really gzip')
+        Path(root, 'legacy.svg').write_bytes(b'<svg/>')
+
+        app = Flask(__name__)
+        app.add_url_rule('/static/generated/<path:filename>', 'generated',
+                         lambda filename: static_server.serve_static_file(root, filename))
+        client = app.test_client()
+        url = artifact.url
+
+        resp = client.get(url)
+        assert resp.status_code == 200 and resp.headers['ETag'] == f'"{artifact.sha256}"'
+        assert 'immutable' in resp.headers['Cache-Control']
+        print("✓ Content-addressed files: ETag is the sha256, cached as immutable")
+
+        assert client.get(url, headers={'If-None-Match': resp.headers['ETag']}).status_code == 304
+        legacy = client.get('/static/generated/legacy.svg')
+        assert 'must-revalidate' in legacy.headers['Cache-Control']
+        assert client.get('/static/generated/legacy.svg',
+                          headers={'If-None-Match': legacy.headers['ETag']}).status_code == 304
+        print("✓ If-None-Match answers 304")
+
+        resp = client.get(url, headers={'Range': 'bytes=10-19', 'Accept-Encoding': 'gzip'})
+        assert resp.status_code == 206 and resp.data == b'0123456789'
+        assert 'Content-Encoding' not in resp.headers
+        assert resp.headers['Content-Range'] == 'bytes 10-19/1000'
+        print("✓ Range requests get identity bytes (206) even when gzip is accepted")
+
+        resp = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers.get('Content-Encoding') == 'gzip' and resp.data == b'not really gzip'
+        assert resp.headers['ETag'] == f'"{artifact.sha256}-gzip"'
+        print("✓ Precompressed variant served with its own ETag")
+
+        for companion in ('.gz', '.json'):
+            assert client.get(url + companion).status_code == 404, companion
+        assert client.get('/static/generated/../secret').status_code == 404
+        print("✓ Sidecars, variants and paths outside the directory return 404")
+
+
+def test_etag_memo_is_bounded():
+    """Hashed ETags are kept for at most ETAG_CACHE_MAX_ENTRIES paths, newest first"""
+    _section("Test 2: Bounded ETag memo")
+
+    with tempfile.TemporaryDirectory() as root, _Override(ETAG_CACHE_MAX_ENTRIES=3):
+        static_server._etag_cache.clear()
+        paths = []
+        for i in range(5):
+            path = os.path.join(root, f'legacy_{i}.svg')
+            Path(path).write_bytes(f'<svg id="{i}"/>'.encode())
+            paths.append(path)
+            static_server.file_etag(path, os.path.basename(path))
+        static_server.file_etag(paths[2], 'legacy_2.svg')
+        assert list(static_server._etag_cache) == [paths[3], paths[4], paths[2]]
+        print("✓ 5 files hashed, only the 3 most recently used are memoized")
+
+        before = static_server.file_etag(paths[4], 'legacy_4.svg')
+        Path(paths[4]).write_bytes(b'<svg id="changed and longer"/>')
+        assert static_server.file_etag(paths[4], 'legacy_4.svg') != before
+        assert len(static_server._etag_cache) == 3
+        print("✓ A changed file replaces its entry instead of adding one")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing static file responses")
+    print("=" * 60)
+    print()
+
+    test_static_etag_and_range()
+    test_etag_memo_is_bounded()
+
+    print()
+    print("=" * 60)
+    print("All static file tests passed!")
+    print("=" * 60)
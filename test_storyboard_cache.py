@@ -0,0 +1,119 @@
+"""
+Behavior tests for the storyboard result cache (storyboard_cache.py)
+Run with `python test_storyboard_cache.py` (or pytest); needs no API key or GPU
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import config
+from storyboard_cache import StoryboardCache
+from storyboard_generator import StoryboardGenerator
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+class _Override:
+    """Temporarily replace config values"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.values.items():
+            self.saved[name] = getattr(config, name)
+            setattr(config, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+
+
+def test_key_normalizes_prompt_and_tracks_settings():
+    """Trivial prompt edits share a key; output-changing settings do not"""
+    _section("Test 1: Cache key")
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = StoryboardCache(root)
+        key = cache.make_key("Aldar  tricks the Greedy bai", use_local=True)
+        assert key == cache.make_key("  aldar tricks the greedy BAI ", use_local=True)
+        assert key != cache.make_key("Aldar tricks the greedy bai!", use_local=True)
+        assert key != cache.make_key("Aldar tricks the greedy bai", use_local=False)
+        with _Override(NUM_INFERENCE_STEPS=config.NUM_INFERENCE_STEPS + 1):
+            assert key != cache.make_key("Aldar tricks the greedy bai", use_local=True)
+        with _Override(IMAGE_FORMAT='webp_lossless' if config.IMAGE_FORMAT != 'webp_lossless' else 'png'):
+            assert key != cache.make_key("Aldar tricks the greedy bai", use_local=True)
+    print("✓ Case/whitespace ignored; backend, steps and image format change the key")
+
+
+def test_entries_need_their_images():
+    """A hit requires every referenced file; a missing one turns it into a miss"""
+    _section("Test 2: Entries and their images")
+
+    with tempfile.TemporaryDirectory() as root:
+        image = Path(root) / 'frame.png'
+        image.write_bytes(b'png' * 100)
+        cache = StoryboardCache(Path(root) / 'cache')
+        frames = [{'image_path': str(image), 'image_variant_paths': {}, 'frame_number': 1}]
+        cache.put('ab' * 32, frames, {'aldar_story': 'story'})
+
+        entry = cache.get('ab' * 32)
+        assert entry['storyboard'] == frames and entry['image_bytes'] == 300
+        assert cache.referenced_paths() == {os.path.abspath(image)}
+        os.remove(image)
+        assert cache.get('ab' * 32) is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1 and cache.stats()['entries'] == 0
+    print("✓ Hit while the image exists, miss (and entry dropped) once it is gone")
+
+
+def test_lru_eviction_survives_restart():
+    """Least recently used entries go first, also after rebuilding the index"""
+    _section("Test 3: LRU eviction")
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = StoryboardCache(root, max_entries=2, max_bytes=10 ** 9)
+        for key in ('a1', 'b2'):
+            cache.put(key * 32, [], {})
+        cache.get('a1' * 32)
+        cache.put('c3' * 32, [], {})
+        assert cache.get('b2' * 32) is None and cache.get('a1' * 32) and cache.get('c3' * 32)
+
+        reopened = StoryboardCache(root, max_entries=2, max_bytes=10 ** 9)
+        assert reopened.stats()['entries'] == 2
+    print("✓ Oldest unused entry evicted; index rebuilt from disk")
+
+
+def test_degraded_storyboards_are_not_cacheable():
+    """Template frames, placeholder images and truncated plans are never cached"""
+    _section("Test 4: Degraded storyboards")
+
+    ok = [{'frame_number': 1}, {'frame_number': 2}]
+    assert StoryboardGenerator._cacheable(ok)
+    assert not StoryboardGenerator._cacheable([])
+    assert not StoryboardGenerator._cacheable(ok + [{'frame_number': 3, 'fallback': True}])
+    assert not StoryboardGenerator._cacheable(ok + [{'frame_number': 3, 'placeholder': True}])
+    assert not StoryboardGenerator._cacheable(ok, truncated=True)
+    print("✓ Only complete, non-fallback storyboards are cacheable")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing storyboard cache")
+    print("=" * 60)
+    print()
+
+    test_key_normalizes_prompt_and_tracks_settings()
+    test_entries_need_their_images()
+    test_lru_eviction_survives_restart()
+    test_degraded_storyboards_are_not_cacheable()
+
+    print()
+    print("=" * 60)
+    print("All storyboard cache tests passed!")
+    print("=" * 60)
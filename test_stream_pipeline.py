@@ -0,0 +1,195 @@
+"""
+Behavior tests for stage-pipelined frame rendering (stream_pipeline.py)
+Stages are plain functions, so no model is needed; run with
+`python test_stream_pipeline.py` (or pytest)
+"""
+
+import threading
+import time
+
+from stream_pipeline import FramePipeline, Validated
+
+
+def _section(title):
+    print("-" * 60)
+    print(title)
+    print("-" * 60)
+
+
+def _frames(n):
+    return [{'description': f'frame {i}'} for i in range(n)]
+
+
+def test_frames_flow_through_every_stage_in_order():
+    """Each frame is prepared, rendered and saved; results come out by index"""
+    _section("Test 1: Prepare -> render -> save")
+
+    pipeline = FramePipeline(
+        prepare=lambda idx, frame: f"prompt {idx}",
+        render=lambda idx, frame, prompt: prompt.upper(),
+        save=lambda idx, frame, image: {**frame, 'image': image},
+        depth=2
+    )
+    results = list(pipeline.run(_frames(4)))
+    assert [kind for kind, _, _ in results] == ['frame'] * 4
+    assert [idx for _, idx, _ in results] == [0, 1, 2, 3]
+    assert results[2][2] == {'description': 'frame 2', 'image': 'PROMPT 2'}
+    print("✓ 4 frames saved in order with every stage applied")
+
+
+def test_stages_overlap():
+    """Frame N+1 renders while frame N is still being saved"""
+    _section("Test 2: Stages overlap")
+
+    events = []
+    lock = threading.Lock()
+
+    def log(entry):
+        with lock:
+            events.append(entry)
+
+    def render(idx, frame, prepared):
+        log(('render', idx))
+        time.sleep(0.05)
+        return idx
+
+    def save(idx, frame, rendered):
+        log(('save start', idx))
+        time.sleep(0.1)
+        log(('save end', idx))
+        return frame
+
+    list(FramePipeline(lambda idx, frame: None, render, save, depth=2).run(_frames(3)))
+    assert events.index(('render', 1)) < events.index(('save end', 0))
+    print("✓ Frame 2 started rendering before frame 1 finished saving")
+
+
+def test_streaming_input_and_side_events():
+    """A still-growing plan is consumed lazily; published events are interleaved"""
+    _section("Test 3: Streaming input and published events")
+
+    first_saved = threading.Event()
+    seen_before_second = []
+
+    def plan():
+        yield {'description': 'first'}
+        # The rest of the plan only "arrives" once frame 1 is out
+        first_saved.wait(5)
+        seen_before_second.append(True)
+        yield {'description': 'second'}
+
+    pipeline = None
+
+    def render(idx, frame, prepared):
+        pipeline.publish(idx, {'type': 'preview', 'index': idx})
+        return idx
+
+    def save(idx, frame, rendered):
+        first_saved.set()
+        return frame
+
+    pipeline = FramePipeline(lambda idx, frame: None, render, save, depth=1)
+    kinds = [(kind, idx) for kind, idx, _ in pipeline.run(plan())]
+    assert seen_before_second and ('frame', 0) in kinds and ('frame', 1) in kinds
+    assert kinds.index(('event', 0)) < kinds.index(('frame', 0))
+    print("✓ Frame 1 finished before the plan was complete; previews came first")
+
+
+def test_stage_errors_reach_the_consumer():
+    """An exception in any stage stops the pipeline and is re-raised"""
+    _section("Test 4: Stage errors")
+
+    def render(idx, frame, prepared):
+        if idx == 1:
+            raise RuntimeError("out of memory")
+        return idx
+
+    pipeline = FramePipeline(lambda idx, frame: None, render, lambda idx, frame, r: frame, depth=1)
+    got = []
+    try:
+        for kind, idx, _ in pipeline.run(_frames(5)):
+            got.append(idx)
+        raise AssertionError("run() should have raised")
+    except RuntimeError as e:
+        assert str(e) == "out of memory"
+    assert set(got) <= {0}
+    print("✓ Render error re-raised; no later frame was delivered")
+
+
+def test_failed_frame_regenerates_without_blocking_others():
+    """A frame that fails validation is re-rendered while later frames are saved"""
+    _section("Test 5: Regeneration does not hold back other frames")
+
+    saved = {}
+
+    def save(idx, frame, result):
+        saved[idx] = result
+        return frame
+
+    def validate(idx, frame, rendered, attempt):
+        if idx == 1 and attempt == 0:
+            time.sleep(0.1)  # Frames 2 and 3 finish rendering meanwhile
+            return False, 0.2
+        return True, 0.9
+
+    pipeline = FramePipeline(
+        prepare=lambda idx, frame: None,
+        render=lambda idx, frame, prepared: f"render {idx}",
+        save=save,
+        depth=2,
+        validate=validate,
+        regenerate=lambda idx, frame, attempt: f"render {idx} (attempt {attempt})",
+        max_regenerations=2
+    )
+    order = [idx for kind, idx, _ in pipeline.run(_frames(4)) if kind == 'frame']
+    assert sorted(order) == [0, 1, 2, 3]
+    assert order.index(2) < order.index(1) and order.index(3) < order.index(1)
+    print(f"✓ Frames 2 and 3 were saved while frame 1 regenerated (order {order})")
+
+    assert saved[1] == Validated('render 1 (attempt 1)', 0.9, True, 1)
+    assert all(saved[idx].regenerations == 0 and saved[idx].passed for idx in (0, 2, 3))
+    print("✓ Validated.regenerations counts the re-renders of each frame")
+
+
+def test_best_attempt_kept_when_none_pass():
+    """After max_regenerations failures the best-scoring render is saved"""
+    _section("Test 6: Best attempt when nothing passes")
+
+    scores = {0: 0.5, 1: 0.9, 2: 0.2}
+    saved = {}
+
+    def save(idx, frame, result):
+        saved[idx] = result
+        return frame
+
+    pipeline = FramePipeline(
+        prepare=lambda idx, frame: None,
+        render=lambda idx, frame, prepared: 'attempt 0',
+        save=save,
+        depth=1,
+        validate=lambda idx, frame, rendered, attempt: (False, scores[attempt]),
+        regenerate=lambda idx, frame, attempt: f'attempt {attempt}',
+        max_regenerations=2
+    )
+    list(pipeline.run(_frames(1)))
+    assert saved[0] == Validated('attempt 1', 0.9, False, 2)
+    print("✓ 3 failed attempts: the 0.9-scoring second render was kept, marked not passed")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Testing frame pipeline")
+    print("=" * 60)
+    print()
+
+    test_frames_flow_through_every_stage_in_order()
+    test_stages_overlap()
+    test_streaming_input_and_side_events()
+    test_stage_errors_reach_the_consumer()
+    test_failed_frame_regenerates_without_blocking_others()
+    test_best_attempt_kept_when_none_pass()
+
+    print()
+    print("=" * 60)
+    print("All frame pipeline tests passed!")
+    print("=" * 60)
@@ -0,0 +1,205 @@
+"""
+Per-Request Timeline
+Records where one storyboard request spent its time (LLM round trips with
+token counts, per-frame diffusion, save and validation, regenerations) and
+returns it as metadata.timings, a final "stats" stream event and a JSONL log line
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Union
+
+import config
+
+
+_log_lock = threading.Lock()
+
+
+def _usage_tokens(response) -> Dict[str, Optional[int]]:
+    """Token counts from an OpenAI response (None when the API didn't report usage)"""
+    usage = getattr(response, 'usage', None)
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None),
+        'total_tokens': getattr(usage, 'total_tokens', None),
+    }
+
+
+class RequestTimeline:
+    """
+    Structured timeline for one storyboard request
+
+    Stages (story, frame planning, images, ...) are recorded as spans with
+    their offset from the start of the request. Frame-level numbers are
+    keyed by frame index, so the streaming pipeline's stage threads can
+    record into the same timeline concurrently.
+    """
+
+    def __init__(self, request_id: Optional[str] = None, prompt: Optional[str] = None):
+        """
+        Start a timeline
+
+        Args:
+            request_id: ID to log the request under (e.g. the job ID)
+            prompt: User prompt, kept in the JSONL log only
+        """
+        self.request_id = request_id or uuid.uuid4().hex
+        self.prompt = prompt
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+        self.stages: List[Dict[str, Any]] = []
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.frames: Dict[int, Dict[str, Any]] = {}
+        self.backend: Optional[str] = None
+        self.cache_hit = False
+
+    def _offset(self) -> float:
+        return round(time.perf_counter() - self._t0, 3)
+
+    @contextmanager
+    def span(self, stage: str, **details) -> Iterator[Dict[str, Any]]:
+        """
+        Time a stage of the request
+
+        Usage:
+            with timeline.span('frame_planning') as span:
+                ...
+                span['frames'] = len(frames)
+        """
+        record = {'stage': stage, 'start_s': self._offset(), **details}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 3)
+            with self._lock:
+                self.stages.append(record)
+
+    def record_stage(self, stage: str, started: float, **details):
+        """Record a stage that was timed elsewhere (started = its time.time() start)"""
+        record = {
+            'stage': stage,
+            'start_s': round(started - self.started_at, 3),
+            'seconds': round(time.time() - started, 3),
+            **details
+        }
+        with self._lock:
+            self.stages.append(record)
+
+    def record_llm(self, stage: str, model: str, seconds: float, response=None, error: Optional[str] = None):
+        """Record one LLM round trip and the tokens it used (none for LLM cache hits)"""
+        call = {
+            'stage': stage,
+            'model': model,
+            'seconds': round(seconds, 3),
+            **_usage_tokens(response),
+        }
+        if getattr(response, 'cached', False):
+            call['cached'] = True
+        if error:
+            call['error'] = error
+        with self._lock:
+            self.llm_calls.append(call)
+
+    def record_frame(self, index: int, **fields):
+        """Set fields on a frame's entry (created on first use)"""
+        with self._lock:
+            entry = self.frames.setdefault(index, {'index': index})
+            entry.update(fields)
+
+    def add_frame_time(self, index: int, field: str, seconds: float):
+        """Accumulate seconds on a frame field (e.g. several regeneration attempts)"""
+        with self._lock:
+            entry = self.frames.setdefault(index, {'index': index})
+            entry[field] = round(entry.get(field, 0.0) + seconds, 3)
+
+    def record_diffusion(self, index: int, seconds: float, steps: Optional[int]):
+        """Diffusion time of a frame, with steps/sec when the step count is known"""
+        fields = {'diffusion_seconds': round(seconds, 3)}
+        if steps:
+            fields['steps'] = steps
+            fields['steps_per_second'] = round(steps / seconds, 2) if seconds > 0 else None
+        self.record_frame(index, **fields)
+
+    def record_save(self, index: int, saved):
+        """Write time and encode time of a SavedImage (see image_writer.py)"""
+        self.record_frame(
+            index,
+            save_seconds=round(saved.write_seconds, 3),
+            encode_seconds=round(saved.encode_seconds, 3),
+            size_bytes=saved.size_bytes
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-ready timeline (what ends up in metadata.timings)"""
+        with self._lock:
+            stages = [dict(s) for s in self.stages]
+            llm_calls = [dict(c) for c in self.llm_calls]
+            frames = [dict(self.frames[i]) for i in sorted(self.frames)]
+
+        def total(items, key):
+            return round(sum(item.get(key) or 0 for item in items), 3)
+
+        return {
+            'request_id': self.request_id,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'total_seconds': self._offset(),
+            'backend': self.backend,
+            'cache_hit': self.cache_hit,
+            'stages': sorted(stages, key=lambda s: s['start_s']),
+            'llm': {
+                'calls': llm_calls,
+                'seconds': total(llm_calls, 'seconds'),
+                'prompt_tokens': total(llm_calls, 'prompt_tokens'),
+                'completion_tokens': total(llm_calls, 'completion_tokens'),
+            },
+            'frames': frames,
+            'totals': {
+                'diffusion_seconds': total(frames, 'diffusion_seconds'),
+                'save_seconds': total(frames, 'save_seconds'),
+                'validation_seconds': total(frames, 'validation_seconds'),
+                'regeneration_attempts': int(total(frames, 'regeneration_attempts')),
+            },
+        }
+
+    def describe(self, summary: Optional[Dict[str, Any]] = None) -> str:
+        """One-line human summary for the console"""
+        summary = summary or self.summary()
+        parts = [f"{s['stage']} {s['seconds']:.1f}s" for s in summary['stages']]
+        return f"total {summary['total_seconds']:.1f}s" + (f" ({', '.join(parts)})" if parts else "")
+
+    def append_to_log(self, summary: Optional[Dict[str, Any]] = None, path: Union[str, Path, None] = None):
+        """
+        Append the timeline as one JSON line (rotated to <path>.1 past TIMINGS_LOG_MAX_BYTES)
+
+        Args:
+            summary: Precomputed summary() to log
+            path: Log file (default: config.TIMINGS_LOG_PATH)
+        """
+        path = Path(path or config.TIMINGS_LOG_PATH)
+        line = json.dumps({'prompt': self.prompt, **(summary or self.summary())}, ensure_ascii=False, default=str)
+        try:
+            with _log_lock:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if path.exists() and path.stat().st_size > config.TIMINGS_LOG_MAX_BYTES:
+                    os.replace(path, path.with_name(path.name + '.1'))
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            print(f"⚠️  Could not write timings log: {e}")
+
+    def finish(self) -> Dict[str, Any]:
+        """Summarize, print and (if enabled) log the request; returns the summary"""
+        summary = self.summary()
+        print(f"⏱️  Request {self.request_id[:8]}: {self.describe(summary)}")
+        if config.ENABLE_TIMINGS_LOG:
+            self.append_to_log(summary)
+        return summary
@@ -326,6 +326,8 @@ class LoRATrainer:
 def main():
     """Основная функция обучения"""
 
+    config.ensure_directories()
+
     print("=" * 70)
     print("РЕАЛЬНОЕ ОБУЧЕНИЕ LORA ДЛЯ АЛДАР КОСЕ")
     print("=" * 70)
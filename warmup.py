@@ -0,0 +1,109 @@
+"""
+Startup Warmup and Readiness
+Loads and warms the SDXL pipeline in the background so an instance only
+reports ready (and receives traffic) once the first request won't be cold
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import config
+
+
+class ModelWarmer:
+    """
+    Runs the local generator's warmup() on a background thread
+
+    The warmup loads the pipeline (and LoRA), runs one tiny generation and
+    loads IP-Adapter if identity lock is on. A failed warmup retries itself
+    after WARMUP_RETRY_INTERVAL, up to WARMUP_MAX_RUNS runs. Readiness
+    probes only read the state: re-warming a pipeline that was unloaded
+    after being idle would undo the idle eviction.
+    """
+
+    STATE_IDLE = 'idle'
+    STATE_RUNNING = 'running'
+    STATE_DONE = 'done'
+    STATE_SKIPPED = 'skipped'
+    STATE_FAILED = 'failed'
+
+    def __init__(self, generator):
+        """
+        Initialize the warmer
+
+        Args:
+            generator: StoryboardGenerator whose local generator should be warmed
+        """
+        self.generator = generator
+        self.state = self.STATE_IDLE
+        self.error: Optional[str] = None
+        self.runs = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.succeeded_at: Optional[float] = None  # Last successful warmup
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.state == self.STATE_RUNNING
+
+    def start(self) -> bool:
+        """Start a warmup in the background; returns False if one is already running"""
+        with self._lock:
+            if self.state == self.STATE_RUNNING:
+                return False
+            self.state = self.STATE_RUNNING
+            self.error = None
+            self.started_at = time.time()
+            self.finished_at = None
+            self.runs += 1
+        threading.Thread(target=self._run, name="model-warmup", daemon=True).start()
+        return True
+
+    @property
+    def warmed_once(self) -> bool:
+        """True once a warmup has succeeded"""
+        return self.succeeded_at is not None
+
+    def _run(self):
+        try:
+            # First access imports torch/diffusers and builds the generator
+            local_gen = self.generator.local_generator if self.generator.use_local else None
+            if local_gen is None or local_gen.colab_client is not None:
+                print("ℹ️  Warmup skipped (no local SDXL pipeline in this process)")
+                state = self.STATE_SKIPPED
+            else:
+                print("🔥 Warming up SDXL pipeline...")
+                seconds = local_gen.warmup()
+                print(f"✓ Warmup complete in {seconds:.1f}s, instance is ready")
+                state = self.STATE_DONE
+            error = None
+        except Exception as e:
+            print(f"❌ Warmup failed: {e}")
+            state, error = self.STATE_FAILED, str(e)
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.finished_at = time.time()
+            self.seconds = round(self.finished_at - self.started_at, 1)
+            if state == self.STATE_DONE:
+                self.succeeded_at = self.finished_at
+            retry = state == self.STATE_FAILED and self.runs < config.WARMUP_MAX_RUNS
+        if retry:
+            timer = threading.Timer(config.WARMUP_RETRY_INTERVAL, self.start)
+            timer.daemon = True
+            timer.start()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'enabled': config.ENABLE_STARTUP_WARMUP,
+            'state': self.state,
+            'runs': self.runs,
+            'seconds': self.seconds,
+            'error': self.error,
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+            'succeeded_at': datetime.fromtimestamp(self.succeeded_at).isoformat() if self.succeeded_at else None,
+        }